@@ -40,69 +40,7 @@ refined_text_combined = " ".join(refined_text_raw)
 print(f"Refined Text ({len(refined_text_combined)}):\n{refined_text_combined}")
 
 print("\n--- 3. Alignment ---")
-# Import our aligner (assuming functionality)
-# I'll just copy-paste the function here for standalone testing to be sure
-def align_text(normalized_text, refined_text):
-    result = ""
-    i_norm = 0
-    i_ref = 0
-    len_norm = len(normalized_text)
-    len_ref = len(refined_text)
-    while i_norm < len_norm:
-        char_norm = normalized_text[i_norm]
-        if char_norm == '[': # Manual tag in Norm
-            tag_end = normalized_text.find(']', i_norm)
-            if tag_end != -1:
-                result += normalized_text[i_norm:tag_end+1]
-                i_norm = tag_end + 1
-                if i_ref < len_ref and refined_text[i_ref] == '[':
-                     ref_tag_end = refined_text.find(']', i_ref)
-                     if ref_tag_end != -1 and refined_text[i_ref:ref_tag_end+1] == normalized_text[i_norm-len(result.split(']')[-2])-1:i_norm]: # simplified check
-                         i_ref = ref_tag_end + 1
-                continue
-        while i_ref < len_ref and refined_text[i_ref] == '[': # Ref tags
-            tag_end = refined_text.find(']', i_ref)
-            if tag_end != -1:
-                tag = refined_text[i_ref:tag_end+1]
-                if not result.endswith(tag): result += tag
-                i_ref = tag_end + 1
-            else: break
-        if i_ref >= len_ref:
-            result += char_norm
-            i_norm += 1
-            continue
-        char_ref = refined_text[i_ref]
-        if char_ref == char_norm:
-            result += char_ref
-            i_norm += 1
-            i_ref += 1
-            continue
-        
-        # Lookahead
-        found_in_ref = -1
-        for k in range(1, 10):
-            if i_ref + k < len_ref and refined_text[i_ref + k] == char_norm:
-                found_in_ref = k
-                break
-        found_in_norm = -1
-        for k in range(1, 10):
-            if i_norm + k < len_norm and normalized_text[i_norm + k] == char_ref:
-                found_in_norm = k
-                break
-        
-        if found_in_ref != -1 and (found_in_norm == -1 or found_in_ref < found_in_norm):
-            i_ref += 1
-        elif found_in_norm != -1:
-             result += char_norm
-             i_norm += 1
-        else: # Mismatch -> Trust Norm
-             result += char_norm
-             i_norm += 1
-             i_ref += 1
-    return result
-
-# Use the ACTUAL aligner implementation from the file would be better, but let's test the logic.
-# Actually let's import it to be safe.
+# Use the ACTUAL aligner implementation from the package
 import sys
 sys.path.insert(0, ".")
 from src.genpod.text_aligner import align_text
@@ -1,6 +1,6 @@
 
 import os
-import subprocess
+import sys
 from pathlib import Path
 
 # Configuration
@@ -10,21 +10,41 @@ OUTPUT_WAV_DIR = Path("/Users/bixinfang/project/RiverPod-private/workspace/outpu
 SEED = "7470000"
 TARGET_INDICES = [2, 3, 5, 6, 7, 8, 9, 10, 11]
 
+sys.path.insert(0, str(GENPOD_ROOT / "src"))
+
+from genpod.generate_podcast import (
+    batched_inference_available,
+    generate_audio,
+    generate_audio_batch,
+    get_chat_instance,
+    read_markdown_file,
+    setup_logging,
+)
+
 def run():
     os.chdir(GENPOD_ROOT)
+    logger = setup_logging()
+    tasks = []
     for idx in TARGET_INDICES:
         pattern = f"segment_{idx:03d}_*.md"
         matches = list(SEGMENTS_MD_DIR.glob(pattern))
         if not matches: continue
-        md_file = matches[0]
         output_wav = OUTPUT_WAV_DIR / f"segment_{idx:03d}.wav"
-        print(f"🔄 Regenerating Segment {idx:03d}...")
-        cmd = [
-            "uv", "run", "python", "-m", "src.genpod.generate_podcast",
-            str(md_file), "-o", str(output_wav), "-v", SEED
-        ]
+        tasks.append((read_markdown_file(matches[0]), str(output_wav)))
+
+    if batched_inference_available():
+        # GPU: all target segments in a few batched forward passes
+        print(f"🔄 Regenerating {len(tasks)} segments in batches...")
+        generate_audio_batch(tasks, SEED, logger=logger, compile=True)
+        print("   ✅ Done")
+        return
+
+    # Load ChatTTS once and reuse it for every segment (no subprocess per segment)
+    get_chat_instance()
+    for text, output_wav in tasks:
+        print(f"🔄 Regenerating {Path(output_wav).name}...")
         try:
-            subprocess.run(cmd, check=True, capture_output=True)
+            generate_audio(text, SEED, output_wav, logger=logger)
             print("   ✅ Done")
         except Exception as e:
             print(f"   ❌ Failed: {e}")
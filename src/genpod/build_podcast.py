@@ -6,6 +6,7 @@
 
 import argparse
 import asyncio
+import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -28,7 +29,7 @@ def read_markdown_file(file_path):
 
 
 async def generate_dry_audio(text, voice, output_file, rate=None, pitch=None):
-    """生成干音（主内容）"""
+    """生成干音（主内容）：edge-tts 边下载边交给 ffmpeg 解码为 WAV"""
     print("🎤 正在生成干音...")
     # 构建 Communicate 参数
     communicate_kwargs = {}
@@ -38,37 +39,97 @@ async def generate_dry_audio(text, voice, output_file, rate=None, pitch=None):
         communicate_kwargs['pitch'] = pitch
     
     communicate = edge_tts.Communicate(text, voice, **communicate_kwargs)
-    await communicate.save(output_file)
+    # 解码与网络下载并行进行，干音不再经过一次 MP3 编码/解码
+    try:
+        decoder = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-y", "-v", "error", "-f", "mp3", "-i", "pipe:0", str(output_file),
+            stdin=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        print("❌ 错误：找不到 ffmpeg，请先安装 ffmpeg 并确保它在 PATH 中")
+        sys.exit(1)
+    
+    pipe_closed = False
+    try:
+        try:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    decoder.stdin.write(chunk["data"])
+                    await decoder.stdin.drain()
+            decoder.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg 提前退出（如无法写入输出文件）：停止写入，下面报告它的错误输出
+            pipe_closed = True
+        stderr = await decoder.stderr.read()
+        await decoder.wait()
+    finally:
+        if decoder.returncode is None:
+            # edge-tts 流出错（网络中断等）或任务被取消：不留下仍在运行的 ffmpeg 子进程
+            decoder.stdin.close()
+            decoder.kill()
+            await decoder.wait()
+    if decoder.returncode != 0 or pipe_closed:
+        message = stderr.decode(errors='replace').strip() or f"ffmpeg 退出码 {decoder.returncode}"
+        print(f"❌ 解码干音时出错：{message}")
+        sys.exit(1)
     print(f"✅ 干音生成完成: {output_file}")
 
 
+def probe_duration(file_path):
+    """使用 ffprobe 读取音频时长（秒）"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+
 def concatenate_audio_files(welcome_file, main_file, outro_file, output_file, fade_duration=500):
-    """拼接音频文件"""
-    from pydub import AudioSegment
-    
+    """拼接音频文件（ffmpeg 流式处理，不在 Python 中解码 PCM）"""
     print("🔗 正在拼接音频...")
     
+    for file_path in (welcome_file, main_file, outro_file):
+        if not Path(file_path).exists():
+            print(f"❌ 错误：找不到文件 {file_path}")
+            sys.exit(1)
+    
     try:
-        welcome = AudioSegment.from_file(welcome_file)
-        main_content = AudioSegment.from_file(main_file)
-        outro = AudioSegment.from_file(outro_file)
-    except FileNotFoundError as e:
-        print(f"❌ 错误：找不到文件 {e.filename}")
+        welcome_duration = probe_duration(welcome_file)
+        main_duration = probe_duration(main_file)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ 加载音频文件时出错：{e.stderr.strip()}")
         sys.exit(1)
-    except Exception as e:
+    except (OSError, ValueError) as e:
+        # ffprobe 不存在，或输出无法解析为时长
         print(f"❌ 加载音频文件时出错：{e}")
         sys.exit(1)
     
-    # 添加淡入淡出效果
-    welcome = welcome.fade_out(fade_duration)
-    main_content = main_content.fade_in(fade_duration).fade_out(fade_duration)
-    outro = outro.fade_in(fade_duration)
-    
-    # 拼接
-    final_audio = welcome + main_content + outro
-    final_audio.export(output_file, format="mp3")
-    
-    total_duration = len(final_audio) / 1000
+    # 添加淡入淡出效果，统一采样格式后拼接
+    fade = fade_duration / 1000
+    fmt = "aformat=sample_rates=44100:channel_layouts=stereo"
+    filter_graph = (
+        f"[0:a]{fmt},afade=t=out:st={max(0.0, welcome_duration - fade):.3f}:d={fade}[a0];"
+        f"[1:a]{fmt},afade=t=in:st=0:d={fade},afade=t=out:st={max(0.0, main_duration - fade):.3f}:d={fade}[a1];"
+        f"[2:a]{fmt},afade=t=in:st=0:d={fade}[a2];"
+        "[a0][a1][a2]concat=n=3:v=0:a=1[out]"
+    )
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", str(welcome_file), "-i", str(main_file), "-i", str(outro_file),
+        "-filter_complex", filter_graph,
+        "-map", "[out]", "-c:a", "libmp3lame", "-b:a", "128k",
+        str(output_file)
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+        total_duration = probe_duration(output_file)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ 拼接音频时出错：{e.stderr.strip()}")
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"❌ 拼接音频时出错：{e}")
+        sys.exit(1)
     print(f"✅ 音频拼接完成: {output_file}")
     print(f"📊 总时长: {total_duration:.2f} 秒")
 
@@ -170,7 +231,7 @@ def main():
     parser.add_argument(
         '--keep-dry',
         action='store_true',
-        help='保留干音文件（默认：不保留）'
+        help='保留干音文件（默认：不保留）。干音为 WAV：output/YYYY-MM-DD_dry.wav（旧版本为 _dry.mp3）'
     )
     
     args = parser.parse_args()
@@ -201,7 +262,7 @@ def main():
     output_dir.mkdir(exist_ok=True)
     
     # 确定文件路径
-    dry_audio_file = str(output_dir / f"{date_str}_dry.mp3")
+    dry_audio_file = str(output_dir / f"{date_str}_dry.wav")
     
     if args.output:
         final_output_file = args.output
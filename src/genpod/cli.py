@@ -1,20 +1,26 @@
-import argparse
-import sys
+import copy
+import functools
 import logging
-import xml.sax.saxutils as saxutils
+import os
+import re
+import shutil
+import stat
+import sys
+from collections import ChainMap
 from pathlib import Path
-import hashlib
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
-
-from .text_processor import process_markdown_file
+from types import MappingProxyType
 
-# Lazy imports
+# Lazy imports (keep `genpod --help` / `genpod check` startup light)
+# argparse: only built when the `check` fast path doesn't apply
+# hashlib, json, tomllib, xml.etree.ElementTree: imported where used
+# from .text_processor import process_markdown_file
 # from .generate_podcast import generate_audio
 # from .concatenate_podcast import concatenate_segments, concatenate_full_podcast
 
+# Precompiled patterns (re is already loaded by logging, so this costs nothing at startup)
+_EP_DATE_RE = re.compile(r"[0-9]{8}")  # Episode directories named YYYYMMDD (ASCII digits only)
+_SEG_INDEX_RE = re.compile(r"segment_(\d{3})_")
+
 # Setup logging
 def setup_logging(verbose=False):
     log_format = '%(asctime)s - %(levelname)s - %(message)s'
@@ -24,6 +30,19 @@ def setup_logging(verbose=False):
 
 logger = logging.getLogger(__name__)
 
+def _load_toml(f):
+    """Parse a binary TOML file object (rtoml when installed via genpod[fast], else tomllib on 3.11+ / tomli)"""
+    try:
+        import rtoml
+        return rtoml.loads(f.read().decode("utf-8"))
+    except ImportError:
+        pass
+    try:
+        import tomllib
+    except ImportError:
+        import tomli as tomllib
+    return tomllib.load(f)
+
 def load_config(input_dir):
     """
     Load config with precedence: 
@@ -31,58 +50,96 @@ def load_config(input_dir):
     2. Local config (./genpod.toml)
     3. Global config (~/.genpod.toml)
     4. Defaults
+
+    Files are parsed once and re-read only when one of them changes (mtime/size).
     """
-    # 4. Defaults
-    config = {
-        "voice_seed": 2222,
-        "min_chars": 50,
-        "max_chars": 200,
-        "welcome_audio": None,
-        "outro_bgm": None,
-        "fade_duration": 500,
-        "podcast_audio_url_prefix": None
-    }
+    # Resolve once so the cache key is stable; callers get their own mutable copy.
+    # Plain os.path strings: a cache hit builds no Path objects at all
+    input_dir, cwd, home = os.path.realpath(input_dir), os.getcwd(), os.path.expanduser("~")
+    # Deep copy: nested tables (e.g. pronunciation) must not leak edits into the cache
+    return copy.deepcopy(dict(_load_config_cached(input_dir, cwd, home, _config_stamps(input_dir, cwd, home))))
+
+# 4. Defaults
+_CONFIG_DEFAULTS = MappingProxyType({
+    "voice_seed": 2222,
+    "min_chars": 50,
+    "max_chars": 200,
+    "welcome_audio": None,
+    "outro_bgm": None,
+    "fade_duration": 500,
+    "batch_size": 8,
+    "batch_char_budget": 800,
+    "compile_model": False,
+    "wav_cache_days": 30,
+    "podcast_audio_url_prefix": None
+})
+
+def _config_stamps(input_dir, cwd, home):
+    """(mtime_ns, size) of every genpod.toml load_config may read, None if missing"""
+    paths = [os.path.join(home, ".genpod.toml"), os.path.join(cwd, "genpod.toml")]
+    p = input_dir
+    for _ in range(5): # Same walk as the episode/project search
+        paths.append(os.path.join(p, "genpod.toml"))
+        parent = os.path.dirname(p)
+        if parent == p:
+            break
+        p = parent
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+@functools.lru_cache(maxsize=32)
+def _load_config_cached(input_dir, cwd, home, stamps):
+    """Parse and merge the config files once per (input_dir, cwd, home); `stamps` only invalidates the entry"""
+    input_dir, cwd, home = Path(input_dir), Path(cwd), Path(home)
+    # Loaded user configs, lowest precedence first; merged once at the end
+    overlays = []
+    project_root = None
     
     # helper to merge config
     def merge_from_file(path, name):
-        if path.exists():
-            try:
-                with open(path, "rb") as f:
-                    user_config = tomllib.load(f)
-                    config.update(user_config)
-                    logger.info(f"Loaded {name} config from {path}. Keys: {list(user_config.keys())}")
-                    if "welcome_audio" in user_config:
-                         logger.info(f"  -> welcome_audio: {user_config['welcome_audio']}")
-                return True
-            except Exception as e:
-                logger.warning(f"Failed to load {name} config from {path}: {e}")
-        return False
+        # EAFP: a missing file costs one failed open instead of stat + open
+        try:
+            with open(path, "rb") as f:
+                user_config = _load_toml(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            # TOML decode errors (tomllib/toml) are ValueError subclasses
+            logger.warning("Failed to load %s config from %s: %s", name, path, e)
+            return False
+        overlays.append(user_config)
+        logger.info("Loaded %s config from %s. Keys: %s", name, path, list(user_config.keys()))
+        if "welcome_audio" in user_config:
+             logger.info("  -> welcome_audio: %s", user_config['welcome_audio'])
+        return True
 
     # 3. Global Configuration (~/.genpod.toml)
-    global_config = Path.home() / ".genpod.toml"
+    global_config = home / ".genpod.toml"
     merge_from_file(global_config, "global")
     
     # Define a set to keep track of loaded config paths
     loaded_configs = set()
     
     def merge_from_file_with_tracker(path, name):
-        resolved_path = path.resolve()
-        if resolved_path not in loaded_configs:
-            if merge_from_file(path, name):
-                loaded_configs.add(resolved_path)
+        if path not in loaded_configs and merge_from_file(path, name):
+            loaded_configs.add(path)
 
     # 2. Local Configuration (./genpod.toml)
-    local_config = Path.cwd() / "genpod.toml"
-    if local_config.resolve() != (input_dir / "genpod.toml").resolve():
-        merge_from_file_with_tracker(local_config, "local")
+    # input_dir is already resolved and cwd is absolute: a plain path compare is enough
+    if cwd != input_dir:
+        merge_from_file_with_tracker(cwd / "genpod.toml", "local")
 
     # 1. Project/Episode Configuration (Search up from input_dir)
-    current_dir = input_dir.resolve()
     candidates = []
-    p = current_dir
+    p = input_dir
     for _ in range(5): # Check up to 5 parent levels
-        if (p / "genpod.toml").exists():
-            candidates.append(p / "genpod.toml")
+        candidates.append(p / "genpod.toml")
         if p.parent == p: # Root
             break
         p = p.parent
@@ -90,54 +147,276 @@ def load_config(input_dir):
     # Apply them in reverse order (Root first, then specific)
     for cfg_path in reversed(candidates):
         merge_from_file_with_tracker(cfg_path, "project/episode")
-        if "__project_root__" not in config:
-             config["__project_root__"] = str(cfg_path.parent)
+        # Also counts a file already loaded as the local config
+        if cfg_path in loaded_configs and project_root is None:
+             project_root = str(cfg_path.parent)
 
     if not loaded_configs:
         logger.error("No project 'genpod.toml' detected. Please create one or run 'genpod init'.")
         sys.exit(1)
 
-    return config
-            
-    return config
+    # Episode > project > local > global > defaults
+    config = dict(ChainMap(*reversed(overlays), _CONFIG_DEFAULTS))
+    if project_root is not None:
+        config.setdefault("__project_root__", project_root)
+    return MappingProxyType(config)
+
+load_config.cache_clear = _load_config_cached.cache_clear
 
+@functools.lru_cache(maxsize=4096)
 def compute_hash(text, seed):
-    """Compute SHA256 hash of text + seed to identify unique segments"""
-    content = f"{text}{seed}"
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    """Compute a 48-bit BLAKE2b tag of text + seed to identify unique segments"""
+    import hashlib
+    hasher = hashlib.blake2b(text.encode('utf-8'), digest_size=6)
+    hasher.update(str(seed).encode('utf-8'))
+    return hasher.hexdigest()
+
+def compute_hashes(texts, seed):
+    """compute_hash for a whole script in one pass (seed encoded once, one C call per paragraph)"""
+    from hashlib import blake2b
+    seed_bytes = str(seed).encode('utf-8')
+    return [blake2b(text.encode('utf-8') + seed_bytes, digest_size=6).hexdigest() for text in texts]
+
+def _legacy_hash(text, seed):
+    """Segment tag used before the switch to BLAKE2b (truncated SHA-256)"""
+    import hashlib
+    return hashlib.sha256(f"{text}{seed}".encode()).digest()[:6].hex()
+
+def migrate_legacy_segment(directory, index, text, seed, suffix=".wav", existing=None):
+    """
+    Rename a segment still tagged with the legacy hash, so the hash switch doesn't force re-synthesis.
+    `existing` (filenames already listed for this index) avoids stat calls and is updated in place.
+    """
+    legacy_name = f"segment_{index:03d}_{_legacy_hash(text, seed)}{suffix}"
+    target_name = f"segment_{index:03d}_{compute_hash(text, seed)}{suffix}"
+    if existing is None:
+        if (directory / legacy_name).exists() and not (directory / target_name).exists():
+            (directory / legacy_name).rename(directory / target_name)
+    elif legacy_name in existing and target_name not in existing:
+        (directory / legacy_name).rename(directory / target_name)
+        existing[existing.index(legacy_name)] = target_name
+
+def index_segment_files(directory, suffix):
+    """Map segment index ("001") -> existing filenames, from a single directory scan"""
+    index = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                parts = entry.name.split("_", 2)
+                if len(parts) == 3 and parts[0] == "segment" and entry.name.endswith(suffix):
+                    index.setdefault(parts[1], []).append(entry.name)
+    except FileNotFoundError:
+        pass
+    return index
 
-def build_podcast(input_name, output_dir_str=None, workdir=None, verbose=False, force=False, jobs=2, episode_name_override=None):
+def segment_cache_path(cache_dir, text, seed, pronunciations=None):
+    """Content-addressed location of a synthesized segment in the shared wav cache"""
+    import hashlib
+    import json
+    key = f"{seed}\0{text}\0{json.dumps(pronunciations or {}, sort_keys=True, ensure_ascii=False)}"
+    # digest()[:12].hex() == hexdigest()[:24] (existing cache names), without the 128-char string
+    return Path(cache_dir) / f"{hashlib.blake2b(key.encode('utf-8')).digest()[:12].hex()}.wav"
+
+def processed_cache_path(config):
+    """Processed-script cache under the project root, next to the wav cache (independent of the cwd)"""
+    return Path(config.get("__project_root__", Path.cwd())) / ".cache" / "processed"
+
+def wav_cache_path(project_root, chattts_version, pipeline_version, batched):
+    """
+    Shared wav cache directory for one ChatTTS version, genpod text pipeline version and generation mode
+    (None if the ChatTTS version is unknown). Batched generation renders with split_text=False, so its audio
+    differs from the single-segment path and the two never share entries; upgrading ChatTTS or genpod
+    starts a fresh version directory.
+    """
+    if chattts_version is None:
+        return None
+    return Path(project_root) / ".cache" / "wav" / chattts_version / pipeline_version / ("batch" if batched else "single")
+
+def prune_wav_cache(cache_dir, max_age_days, other_versions=False, logger=None):
+    """
+    Keep the wav cache bounded: drop entries of any version not used for max_age_days (hits refresh the mtime).
+    With other_versions (build --prune), everything outside the current ChatTTS/genpod version is removed too.
+    """
+    import time
+    version_dir = Path(cache_dir).parent
+    wav_root = version_dir.parent.parent
+    removed = 0
+    if other_versions:
+        # Other ChatTTS versions (and flat entries of the unversioned layout), then other genpod versions
+        for keep in (version_dir.parent, version_dir):
+            for entry in keep.parent.iterdir():
+                if entry == keep:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry, ignore_errors=True)
+                else:
+                    entry.unlink(missing_ok=True)
+                removed += 1
+    cutoff = time.time() - max_age_days * 86400
+    for wav in wav_root.rglob("*.wav"):
+        try:
+            if wav.stat().st_mtime < cutoff:
+                wav.unlink()
+                removed += 1
+        except OSError:
+            pass
+    # Version directories emptied by the age limit; deepest first so parents can go too
+    for directory in sorted((p for p in wav_root.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True):
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+    if removed and logger:
+        logger.info("[Cache] Pruned %s stale wav cache entries", removed)
+
+def plan_segment_audio(segments_dir, existing_wav_index, index, text, seg_hash, seed, force, logger):
+    """
+    Decide whether segment `index` needs synthesis.
+    Stale wavs (other hashes) of that index are removed right away when the segment is up to date;
+    otherwise they are returned, to be removed by remove_stale_audio once the new wav is written.
+    Returns (audio_filename, needs_generation, stale_paths).
+    """
+    audio_filename = f"segment_{index:03d}_{seg_hash}.wav"
+    existing = existing_wav_index.get(f"{index:03d}", [])
+    migrate_legacy_segment(segments_dir, index, text, seed, existing=existing)
+    stale = [segments_dir / name for name in existing if name != audio_filename]
+    if audio_filename in existing and not force:
+        remove_stale_audio(stale, logger)
+        logger.info("[Skip] Segment %s up to date (%s)", index, seg_hash)
+        return audio_filename, False, []
+    logger.info("[Queue] Segment %s (%s chars)", index, len(text))
+    return audio_filename, True, stale
+
+def remove_stale_audio(paths, logger):
+    for path in paths:
+        logger.info("[Clean] Removing stale audio: %s", path.name)
+        path.unlink(missing_ok=True)
+
+def read_texts(paths):
+    """Read and strip UTF-8 text files, concurrently for many files (file I/O releases the GIL); order is kept"""
+    def read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    if len(paths) < 2:
+        return [read(p) for p in paths]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(16, len(paths))) as ex:
+        return list(ex.map(read, paths))
+
+def orphan_segment_files(index, count):
+    """Filenames in an index_segment_files() map whose segment number is past `count` (deleted paragraphs)"""
+    return [name for key, names in index.items() if key.isdigit() and int(key) > count for name in names]
+
+def link_or_copy(src, dst):
+    """Hard-link src to dst (no data copied), falling back to a copy across devices or over an existing file"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Copy then replace: never write into an inode that may be linked elsewhere
+        temp_path = f"{dst}.tmp"
+        shutil.copyfile(src, temp_path)
+        os.replace(temp_path, dst)
+
+def segment_manifest_key(script_path, segments_md_dir, seed, config):
+    """
+    Stat-only fingerprint of what a normal-mode segment list depends on:
+    script.md, the (possibly user-edited) segment md files, seed and split settings.
+    """
+    import json
+    try:
+        script_stat = os.stat(script_path)
+    except FileNotFoundError:
+        return None
+    md_state = []
+    try:
+        with os.scandir(segments_md_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".md"):
+                    md_stat = entry.stat()
+                    md_state.append([entry.name, md_stat.st_mtime_ns, md_stat.st_size])
+    except FileNotFoundError:
+        pass
+    md_state.sort()
+    return json.dumps([script_stat.st_mtime_ns, script_stat.st_size, str(seed),
+                       config["min_chars"], config["max_chars"], md_state])
+
+def _manifest_codec():
+    """(dumps -> bytes, loads) for the segment manifest: orjson when installed (genpod[fast]), else json"""
+    try:
+        import orjson
+        return orjson.dumps, orjson.loads
+    except ImportError:
+        import json
+        return (lambda obj: json.dumps(obj, ensure_ascii=False).encode("utf-8")), json.loads
+
+def load_segment_manifest(manifest_path, key, segments_dir):
+    """Segment files recorded for `key`, or None if the manifest is stale or a segment is missing"""
+    _, loads = _manifest_codec()
+    try:
+        with open(manifest_path, "rb") as f:
+            manifest = loads(f.read())
+    except (OSError, ValueError):
+        return None
+    names = manifest.get("segments")
+    if key is None or manifest.get("key") != key or not names:
+        return None
+    existing = index_segment_files(segments_dir, ".wav")
+    if any(name not in existing.get(name.split("_", 2)[1], ()) for name in names):
+        return None
+    return [str(segments_dir / name) for name in names]
+
+def write_segment_manifest(manifest_path, key, segment_files):
+    """Atomically record the segment list built for `key`"""
+    if key is None:
+        return
+    dumps, _ = _manifest_codec()
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(dumps({"key": key, "segments": [Path(p).name for p in segment_files]}))
+    os.replace(temp_path, manifest_path)
+
+def _stat_mode(path):
+    """st_mode of path, or 0 if it doesn't exist"""
+    try:
+        return os.stat(path).st_mode
+    except OSError:
+        return 0
+
+def build_podcast(input_name, output_dir_str=None, workdir=None, verbose=False, force=False, jobs=2, episode_name_override=None, prune=False):
     """Build the full podcast from input name or directory"""
     logger = setup_logging(verbose)
     
     # Path resolution logic
-    # Path resolution logic
+    # abspath is lexical (no per-component lstat like resolve()); load_config realpaths what it needs
     if workdir:
-        workdir_path = Path(workdir).resolve()
+        workdir_path = Path(os.path.abspath(workdir))
         
         # Check if input_name is an existing path (absolute or relative to cwd)
-        direct_path = Path(input_name).resolve()
-        if direct_path.exists():
+        direct_path = Path(os.path.abspath(input_name))
+        input_mode = _stat_mode(direct_path)
+        if input_mode:
              input_path = direct_path
         else:
              input_path = workdir_path / "input" / input_name
+             input_mode = _stat_mode(input_path)
              
         if not output_dir_str:
             output_base = workdir_path / "output"
         else:
-            output_base = Path(output_dir_str).resolve()
+            output_base = Path(os.path.abspath(output_dir_str))
     else:
         # Backwards compatibility: treat input_name as a direct path
-        input_path = Path(input_name).resolve()
+        input_path = Path(os.path.abspath(input_name))
+        input_mode = _stat_mode(input_path)
         if not output_dir_str:
             # Default to project project-root/output
             output_base = Path.cwd() / "output"
         else:
-            output_base = Path(output_dir_str).resolve()
+            output_base = Path(os.path.abspath(output_dir_str))
 
-    # Check if input is a segments_md directory
-    is_file_mode = input_path.is_file() and input_path.suffix == ".md"
-    is_segments_dir_mode = input_path.is_dir() and input_path.name.endswith("_segments_md")
+    # Check if input is a segments_md directory (one stat above instead of exists/is_file/is_dir)
+    is_file_mode = stat.S_ISREG(input_mode) and input_path.suffix == ".md"
+    is_segments_dir_mode = stat.S_ISDIR(input_mode) and input_path.name.endswith("_segments_md")
 
     if is_file_mode:
         # File mode: treat the file as script.md OR a segment file
@@ -176,18 +455,18 @@ def build_podcast(input_name, output_dir_str=None, workdir=None, verbose=False,
     if episode_name_override:
         episode_name = episode_name_override
 
-    if not input_path.exists():
-        logger.error(f"Input not found: {input_path}")
+    if not input_mode:
+        logger.error("Input not found: %s", input_path)
         sys.exit(1)
         
     output_dir = output_base / episode_name
-    output_dir.mkdir(parents=True, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
     segments_dir = output_dir / "segments"
-    segments_dir.mkdir(parents=True, exist_ok=True)
+    os.makedirs(segments_dir, exist_ok=True)
     
-    logger.info(f"Building podcast for {episode_name}")
-    logger.info(f"Input: {input_path}")
-    logger.info(f"Output: {output_dir}")
+    logger.info("Building podcast for %s", episode_name)
+    logger.info("Input: %s", input_path)
+    logger.info("Output: %s", output_dir)
     
     # Load config 
     # Try finding config in standard places
@@ -198,181 +477,247 @@ def build_podcast(input_name, output_dir_str=None, workdir=None, verbose=False,
     
     is_segment_file = is_file_mode and input_path.name.startswith("segment_")
     
-    if is_segment_file:
+    # Normal mode: if script.md and the segment md files are unchanged since the
+    # last build, reuse its segment list without parsing or hashing anything
+    is_normal_mode = not is_file_mode and not is_segments_dir_mode
+    manifest_path = segments_dir / ".manifest.json"
+    cached_segment_files = None
+    if is_normal_mode and not force and not prune: # --prune needs the full scan
+        manifest_key = segment_manifest_key(script_path, output_dir / "segments_md", seed, config)
+        cached_segment_files = load_segment_manifest(manifest_path, manifest_key, segments_dir)
+    
+    if cached_segment_files is not None:
+         paragraphs = []
+         logger.info("Script unchanged since last build, reusing %s segments", len(cached_segment_files))
+         
+    elif is_segment_file:
          # [Targeted Regeneration] If input is a segment file, don't split it!
          with open(script_path, "r", encoding="utf-8") as f:
              content = f.read().strip()
          paragraphs = [content] 
-         logger.info(f"Targeted Build: {input_path.name}")
+         logger.info("Targeted Build: %s", input_path.name)
          
     elif is_segments_dir_mode:
         # [Batch Regeneration] Load all .md files, sorted
-        logger.info(f"Batch Build from Segment Directory: {input_path}")
-        md_files = sorted(list(input_path.glob("segment_*.md")))
+        logger.info("Batch Build from Segment Directory: %s", input_path)
+        # One scandir pass (d_type, no per-file stat); name order == segment order
+        with os.scandir(input_path) as entries:
+            md_files = sorted(e.path for e in entries
+                              if e.name.startswith("segment_") and e.name.endswith(".md") and e.is_file())
         if not md_files:
              logger.error("No segment files found in directory!")
              sys.exit(1)
              
-        paragraphs = []
-        for mf in md_files:
-            with open(mf, "r", encoding="utf-8") as f:
-                paragraphs.append(f.read().strip())
+        paragraphs = read_texts(md_files)
         
-        logger.info(f"Loaded {len(paragraphs)} segments directly from files.")
+        logger.info("Loaded %s segments directly from files.", len(paragraphs))
         
     else:
         # Normal Full Build
         if not script_path.exists():
-            logger.error(f"Script file not found: {script_path}")
+            logger.error("Script file not found: %s", script_path)
             sys.exit(1)
             
+        from .text_processor import process_markdown_file
         paragraphs = process_markdown_file(
             str(script_path), 
             min_chars=config["min_chars"], 
-            max_chars=config["max_chars"]
+            max_chars=config["max_chars"],
+            cache_dir=processed_cache_path(config)
         )
-        logger.info(f"Parsed {len(paragraphs)} paragraphs from script.md")
+        logger.info("Parsed %s paragraphs from script.md", len(paragraphs))
     
     # ... (previous setup code) ...
     # 2. Incremental Generation
     segment_tasks = []
     segment_files = [] # Initialize here
+    # (new wav, stale wavs of the same index): removed only once the new wav exists
+    stale_audio = []
+    orphans = [] # Segment files left over from deleted paragraphs
+    # Loop invariants, built once instead of per paragraph
+    seed_str = str(seed)
+    segments_prefix = os.path.join(segments_dir, "") # str paths: no Path object per paragraph
+    pronunciations = config.get("pronunciation", {})
     
-    # Lazy import to speed up 'check' command
-    from .generate_podcast import generate_audio, initialize_worker
     
     # [CRITICAL UPDATE] Using robust hash-based incremental build strategy
-    if is_segment_file:
+    if cached_segment_files is not None:
+         segment_files = cached_segment_files
+
+    elif is_segment_file:
          # Direct audio generation mode - no md file management
-         for i, text in enumerate(paragraphs, 1):
-             seg_hash = compute_hash(text, seed)
+         for i, (text, seg_hash) in enumerate(zip(paragraphs, compute_hashes(paragraphs, seed_str)), 1):
              audio_filename = f"segment_{i:03d}_{seg_hash}.wav"
-             audio_path = segments_dir / audio_filename
-             segment_tasks.append((text, str(seed), str(audio_path), config.get("pronunciation", {})))
-             segment_files.append(str(audio_path))
+             audio_path_str = segments_prefix + audio_filename
+             segment_tasks.append((text, seed_str, audio_path_str, pronunciations))
+             segment_files.append(audio_path_str)
 
     elif is_segments_dir_mode:
         # Batch mode - just iterate and generate
-        for i, text in enumerate(paragraphs, 1):
-             seg_hash = compute_hash(text, seed)
-             # Search for existing file with ANY hash for this index, to replace it if needed
-             existing_files = list(segments_dir.glob(f"segment_{i:03d}_*.wav"))
-             
-             # Target filename
-             audio_filename = f"segment_{i:03d}_{seg_hash}.wav"
-             audio_path = segments_dir / audio_filename
-             
-             # Check if we need to regenerate
-             if audio_path.exists() and not force:
-                 logger.info(f"[Skip] Segment {i} up to date ({seg_hash})")
-             else:
-                 # If a stale version exists (same index, different hash), delete it
-                 for stale in existing_files:
-                     if stale.name != audio_filename:
-                         logger.info(f"[Clean] Removing stale segment: {stale.name}")
-                         stale.unlink()
-                         
-                 logger.info(f"[Queue] Segment {i} ({len(text)} chars)")
-                 segment_tasks.append((text, str(seed), str(audio_path), config.get("pronunciation", {})))
-                 
-             segment_files.append(str(audio_path))
+        # One directory scan instead of a glob + stat per paragraph
+        existing_wav_index = index_segment_files(segments_dir, ".wav")
+        for i, (text, seg_hash) in enumerate(zip(paragraphs, compute_hashes(paragraphs, seed_str)), 1):
+             audio_filename, needs_generation, stale = plan_segment_audio(
+                 segments_dir, existing_wav_index, i, text, seg_hash, seed_str, force, logger)
+             audio_path_str = segments_prefix + audio_filename
+             if needs_generation:
+                 segment_tasks.append((text, seed_str, audio_path_str, pronunciations))
+                 stale_audio.append((audio_path_str, stale))
+             segment_files.append(audio_path_str)
+
+        orphans = [segments_dir / name for name in orphan_segment_files(existing_wav_index, len(paragraphs))]
             
     else:
         # Normal mode: manage md files
         segments_md_dir = output_dir / "segments_md"
-        segments_md_dir.mkdir(parents=True, exist_ok=True)
-        
-        for i, text in enumerate(paragraphs, 1):
-            # [Workflow logic]: Check if user has manually edited this segment file
-            if not force:
-                 # Try to find existing md file for this segment index
-                 existing_mds = list(segments_md_dir.glob(f"segment_{i:03d}_*.md"))
-                 if existing_mds:
-                     # Use the existing MD file as source of truth
-                     target_file = existing_mds[0]
-                     with open(target_file, "r", encoding="utf-8") as f:
-                         text = f.read().strip()
-
-            # Hash text + seed to get unique ID
-            seg_hash = compute_hash(text, seed)
+        os.makedirs(segments_md_dir, exist_ok=True)
+        
+        # One directory scan each instead of globs + stats per paragraph
+        existing_md_index = index_segment_files(segments_md_dir, ".md")
+        existing_wav_index = index_segment_files(segments_dir, ".wav")
+        
+        # [Workflow logic]: Check if user has manually edited a segment file
+        if not force:
+            # Try to find existing md file for each segment index
+            edited = [(i, segments_md_dir / existing_md_index[f"{i + 1:03d}"][0])
+                      for i in range(len(paragraphs)) if f"{i + 1:03d}" in existing_md_index]
+            # Use the existing MD files as source of truth
+            for (i, _), text in zip(edited, read_texts([path for _, path in edited])):
+                paragraphs[i] = text
+
+        # Hash text + seed to get unique IDs, all paragraphs in one pass
+        for i, (text, seg_hash) in enumerate(zip(paragraphs, compute_hashes(paragraphs, seed_str)), 1):
+            existing_mds = existing_md_index.get(f"{i:03d}", [])
             
             # Save washed segment to file for user verification
             segment_md_file = segments_md_dir / f"segment_{i:03d}_{seg_hash}.md"
             
             # Cleanup stale MD files for this index
-            existing_mds = list(segments_md_dir.glob(f"segment_{i:03d}_*.md"))
             for stale_md in existing_mds:
-                if stale_md.name != segment_md_file.name:
-                    stale_md.unlink()
-            
-            if not segment_md_file.exists():
-                with open(segment_md_file, "w", encoding="utf-8") as f:
-                    f.write(text)
+                if stale_md != segment_md_file.name:
+                    (segments_md_dir / stale_md).unlink()
             
-            # Audio path
-            audio_filename = f"segment_{i:03d}_{seg_hash}.wav"
-            audio_path = segments_dir / audio_filename
+            # 目录列表里已有同名文件即内容相同（hash 命名），无需再写；新文件写 .tmp 后原子替换
+            if segment_md_file.name not in existing_mds:
+                tmp_md = segment_md_file.with_suffix(".md.tmp")
+                tmp_md.write_text(text, encoding="utf-8")
+                os.replace(tmp_md, segment_md_file)
             
-            # Check for existing audio files for this index
-            existing_audios = list(segments_dir.glob(f"segment_{i:03d}_*.wav"))
-            
-            is_up_to_date = False
-            for ea in existing_audios:
-                if ea.name == audio_filename:
-                    is_up_to_date = True
-                else:
-                    if not force:
-                         logger.info(f"[Clean] Removing stale audio: {ea.name}")
-                         ea.unlink()
+            # Audio: same skip/clean rules as batch mode
+            audio_filename, needs_generation, stale = plan_segment_audio(
+                segments_dir, existing_wav_index, i, text, seg_hash, seed_str, force, logger)
+            audio_path_str = segments_prefix + audio_filename
+            if needs_generation:
+                segment_tasks.append((text, seed_str, audio_path_str, pronunciations))
+                stale_audio.append((audio_path_str, stale))
+            segment_files.append(audio_path_str)
+
+        orphans = [segments_dir / name for name in orphan_segment_files(existing_wav_index, len(paragraphs))]
+        orphans += [segments_md_dir / name for name in orphan_segment_files(existing_md_index, len(paragraphs))]
+
+    if orphans:
+        if prune:
+            for orphan in orphans:
+                logger.info("[Prune] Removing orphaned segment: %s", orphan.name)
+                orphan.unlink()
+        else:
+            logger.info("%s orphaned segment files from deleted paragraphs (use --prune to delete)", len(orphans))
             
-            if is_up_to_date and not force:
-                logger.info(f"[Skip] Segment {i} up to date")
+    if cached_segment_files is None:
+        logger.info("Incremental build: %s of %s segments changed", len(segment_tasks), len(segment_files))
+
+    # Shared content-addressed cache: text synthesized before (any episode, any index) is linked in, not re-generated
+    # (segments are only ever replaced via os.replace/unlink, so sharing an inode with the cache is safe).
+    # Entries are keyed by ChatTTS version, genpod text pipeline version and generation mode, which all change the rendering.
+    wav_cache_dir = None
+    batched = False
+    if segment_tasks:
+        # Lazy import: torch/ChatTTS are only loaded when something must be generated
+        from .generate_podcast import (
+            _chattts_version,
+            _pipeline_version,
+            batched_inference_available,
+            generate_audio_batch,
+            generate_segments_parallel,
+            set_cache_root,
+        )
+        # Normalizer/refine/speaker caches live next to the wav cache, not in the cwd
+        set_cache_root(config.get("__project_root__", Path.cwd()))
+        batched = batched_inference_available()
+        wav_cache_dir = wav_cache_path(config.get("__project_root__", Path.cwd()), _chattts_version(), _pipeline_version(), batched)
+    if wav_cache_dir is not None and not force:
+        pending_tasks = []
+        for task in segment_tasks:
+            cached = segment_cache_path(wav_cache_dir, task[0], task[1], task[3])
+            if cached.exists():
+                link_or_copy(cached, task[2])
+                os.utime(cached)  # Mark as recently used for prune_wav_cache
+                logger.info("[Cache] %s reused from cache", Path(task[2]).name)
             else:
-                 logger.info(f"[Queue] Segment {i} for generation")
-                 segment_tasks.append((text, str(seed), str(audio_path), config.get("pronunciation", {})))
-            
-            segment_files.append(str(audio_path))
-            
+                pending_tasks.append(task)
+        segment_tasks = pending_tasks
+
     # Execute Parallel Generation
-    if segment_tasks:
-        import multiprocessing
-        
+    if segment_tasks and batched:
+        # GPU: one in-process model, segments decoded together in batches
+        batch_size = config.get("batch_size", 8)
+        logger.info("🚀 Starting batched generation (up to %s per batch) for %s segments...", batch_size, len(segment_tasks))
+        generate_audio_batch(
+            [(t[0], t[2]) for t in segment_tasks],
+            seed_str,
+            logger=logger,
+            pronunciations=pronunciations,
+            batch_size=batch_size,
+            char_budget=config.get("batch_char_budget", 800),
+            # Opt-in: torch.compile costs start-up time and only pays off on long runs
+            compile=config.get("compile_model", False)
+        )
+        logger.info("✅ All segments generated successfully.")
+    elif segment_tasks:
         num_workers = config.get("jobs", 1)
-        if num_workers < 1:
-            num_workers = 1
+        if num_workers == 0:
+            # Auto: half the cores (each worker runs its own inference threads)
+            num_workers = max(1, (os.cpu_count() or 1) // 2)
+        num_workers = max(num_workers, 1)
+        # Never more processes than segments to generate
+        num_workers = min(num_workers, len(segment_tasks))
         # Cap workers to avoid OOM (ChatTTS is heavy)
         if num_workers > 4: 
              logger.warning("Limiting workers to 4 to prevent Out Of Memory")
              num_workers = 4
              
-        logger.info(f"🚀 Starting parallel generation with {num_workers} workers for {len(segment_tasks)} segments...")
-        
-        # Prepare arguments for starmap
-        # Function signature: generate_audio(text, seed, output_file, logger=None, pronunciations=None)
-        # We need to wrap this or change generate_audio to accept a single arg if we use map, 
-        # but starmap allows unpacking. However, logger cannot be pickled easily.
-        # We will modify generate_audio to NOT take logger in the worker, or use a wrapper.
-        
-        # Wrapper for process pool
-        # We need to define this at module level or use a partial, but 'initialize_worker' sets up globals.
-        # Let's use a helper function defined at top level or importable
-        
-        ctx = multiprocessing.get_context('spawn') # Use spawn for PyTorch/CUDA safety
-        with ctx.Pool(processes=num_workers, initializer=initialize_worker) as pool:
-             # args: (text, seed, output_path, pronunciations)
-             # We need to adapt the function call. generate_audio expects (text, seed, output_file, logger, pronunciations)
-             # We'll pass None for logger in worker process
-             
-             task_args = [(t[0], t[1], t[2], None, t[3]) for t in segment_tasks]
-             pool.starmap(generate_audio, task_args)
+        logger.info("🚀 Starting parallel generation with %s workers for %s segments...", num_workers, len(segment_tasks))
+        
+        # generate_audio(text, voice, output_file, rate, pitch, logger, pronunciations)
+        # logger cannot be pickled, so workers get None and use their own
+        task_args = [(t[0], t[1], t[2], None, None, None, t[3]) for t in segment_tasks]
+        # Unordered completion for progress logging; segment_files already holds the script order
+        for done, finished in enumerate(generate_segments_parallel(task_args, num_workers, logger), 1):
+            logger.info("  [%s/%s] %s", done, len(task_args), Path(finished).name)
              
         logger.info("✅ All segments generated successfully.")
     else:
         logger.info("🎉 All segments up to date. Nothing to generate.")
 
+    # A failed (forced) rebuild raises before this point and keeps the old audio
+    for new_audio, stale in stale_audio:
+        if Path(new_audio).exists():
+            remove_stale_audio(stale, logger)
+
+    if wav_cache_dir is not None:
+        os.makedirs(wav_cache_dir, exist_ok=True)
+        for task in segment_tasks:
+            if Path(task[2]).exists():
+                link_or_copy(task[2], segment_cache_path(wav_cache_dir, task[0], task[1], task[3]))
+        prune_wav_cache(wav_cache_dir, config.get("wav_cache_days", 30), other_versions=prune, logger=logger)
+
+    if is_normal_mode and cached_segment_files is None:
+        # Keyed after this build wrote its segment md files
+        write_segment_manifest(manifest_path, segment_manifest_key(script_path, output_dir / "segments_md", seed, config), segment_files)
+
     # 3. Concatenate Segments (Dry)
     # The order is strictly preserved by the order of paragraphs in the script
-    from .concatenate_podcast import concatenate_segments, concatenate_full_podcast
+    from .concatenate_podcast import concatenate_full_podcast, concatenate_segments
     dry_file = output_base / f"{input_dir.name}_dry.wav"
     concatenate_segments(segment_files, str(dry_file), fade_duration=config["fade_duration"])
     
@@ -393,11 +738,11 @@ def build_podcast(input_name, output_dir_str=None, workdir=None, verbose=False,
         outro_file = str(project_root / outro_file)
     
     # If assets provided, do full mix
-    logger.info(f"Config Check - Welcome: {welcome_file}, Outro: {outro_file}")
+    logger.info("Config Check - Welcome: %s, Outro: %s", welcome_file, outro_file)
     
     if not is_segment_file:
         if welcome_file and outro_file:
-            logger.info(f"Creating final mix with welcome={welcome_file}, outro={outro_file}")
+            logger.info("Creating final mix with welcome=%s, outro=%s", welcome_file, outro_file)
             concatenate_full_podcast(
                 str(dry_file), 
                 welcome_file, 
@@ -409,9 +754,9 @@ def build_podcast(input_name, output_dir_str=None, workdir=None, verbose=False,
         logger.info("✅ Single segment generation complete. Skipped full podcast assembly.")
         
     logger.info("Build complete!")
-    logger.info(f"  Final: {final_file if (welcome_file and outro_file) else 'N/A'}")
-    logger.info(f"  Dry:   {dry_file}")
-    logger.info(f"  Segments: {segments_dir}")
+    logger.info("  Final: %s", final_file if (welcome_file and outro_file) else 'N/A')
+    logger.info("  Dry:   %s", dry_file)
+    logger.info("  Segments: %s", segments_dir)
 
 def check_script(input_name, workdir=None, verbose=False):
     """Check script segmentation without generating audio"""
@@ -423,7 +768,7 @@ def check_script(input_name, workdir=None, verbose=False):
         input_dir = Path(input_name).resolve()
     
     if not input_dir.exists():
-        logger.error(f"Input directory not found: {input_dir}")
+        logger.error("Input directory not found: %s", input_dir)
         sys.exit(1)
         
     # Load config
@@ -432,13 +777,15 @@ def check_script(input_name, workdir=None, verbose=False):
     # Process Script
     script_path = input_dir / "script.md"
     if not script_path.exists():
-        logger.error(f"script.md not found in {input_dir}")
+        logger.error("script.md not found in %s", input_dir)
         sys.exit(1)
         
+    from .text_processor import process_markdown_file
     paragraphs = process_markdown_file(
         str(script_path), 
         min_chars=config["min_chars"], 
-        max_chars=config["max_chars"]
+        max_chars=config["max_chars"],
+        cache_dir=processed_cache_path(config)
     )
     
     print(f"\n🔍 Checking segmentation for: {script_path}")
@@ -464,34 +811,42 @@ def check_script(input_name, workdir=None, verbose=False):
     episode_name = input_dir.name
     # [Fix] Naming consistency with build_podcast
     segments_md_dir = output_base / episode_name / "segments_md"
-    segments_md_dir.mkdir(parents=True, exist_ok=True)
+    os.makedirs(segments_md_dir, exist_ok=True)
     
-    logger.info(f"Saving debug segments to: {segments_md_dir}")
+    logger.info("Saving debug segments to: %s", segments_md_dir)
     seed = config["voice_seed"]
 
-    for i, text in enumerate(paragraphs, 1):
-        # Hash text + seed
-        seg_hash = compute_hash(text, seed)
-        
-        # Save washed segment
+    # Hash text + seed
+    report = []
+    for i, (text, seg_hash) in enumerate(zip(paragraphs, compute_hashes(paragraphs, seed)), 1):
+        # Save washed segment. The file may have been edited by hand since, so it is only left
+        # untouched (no write, mtime kept) when it still holds exactly this text.
         segment_md_file = segments_md_dir / f"segment_{i:03d}_{seg_hash}.md"
-        with open(segment_md_file, "w", encoding="utf-8") as f:
-            f.write(text)
+        try:
+            unchanged = segment_md_file.read_text(encoding="utf-8") == text
+        except (OSError, UnicodeDecodeError):
+            unchanged = False
+        if not unchanged:
+            with open(segment_md_file, "w", encoding="utf-8") as f:
+                f.write(text)
 
         # Preview first 50 chars
         preview = text.replace('\n', ' ')[:50] + "..."
         word_count = len(text)
-        print(f"   [{i:03d}] {word_count} chars | {preview}")
-        print(f"         -> Saved: {segment_md_file.name}")
+        report.append(f"   [{i:03d}] {word_count} chars | {preview}")
+        report.append(f"         -> Saved: {segment_md_file.name}")
+    # One write for the whole report instead of two prints per paragraph
+    print("\n".join(report))
         
     print(f"\n✅ Check complete. Segments saved to {segments_md_dir}")
     print("Use 'genpod build' to generate audio.")
 
+# Look for templates in the package (computed once at import)
+_TEMPLATE_DIR = Path(__file__).parent / "templates"
+
 def get_template_path(name):
     """Get path to a template file"""
-    # Look for templates in the package
-    template_dir = Path(__file__).parent / "templates"
-    return template_dir / name
+    return _TEMPLATE_DIR / name
 
 def init_project(project_name):
     """Initialize a new GenPod project structure"""
@@ -525,7 +880,6 @@ def init_project(project_name):
     target_path = root / "genpod.toml"
     
     if template_path.exists():
-        import shutil
         shutil.copy(template_path, target_path)
         print("  Created: genpod.toml (from template)")
     else:
@@ -546,15 +900,24 @@ def manage_config(init=False):
             
         template_path = get_template_path("genpod.toml")
         if template_path.exists():
-            import shutil
             shutil.copy(template_path, target_path)
             print(f"✅ Created 'genpod.toml' in {Path.cwd()}")
         else:
             print(f"❌ Error: Template not found at {template_path}")
             sys.exit(1)
 
+def _wav_duration(path):
+    """Whole seconds of a PCM WAV from its header, or None if the stdlib wave module can't read it"""
+    import wave
+    try:
+        with wave.open(str(path), "rb") as w:
+            return int(w.getnframes() / w.getframerate())
+    except (wave.Error, EOFError, OSError, ZeroDivisionError):
+        return None
+
 def generate_rss(project_dir):
     """Generate RSS feed from episodes directory"""
+    import xml.etree.ElementTree as ET
     root = Path(project_dir).resolve()
     episodes_dir = root / "episodes"
     # Try docs/rss first, fall back to website/rss (legacy)
@@ -572,26 +935,53 @@ def generate_rss(project_dir):
     config = load_config(root)
     audio_url_prefix = config.get("podcast_audio_url_prefix") or f"{config['podcast_link']}/audio"
     
-    items_xml = []
+    # The feed is built as an ElementTree and serialized once (escaping done in C)
+    itunes = "{http://www.itunes.com/dtds/podcast-1.0.dtd}"
+    ET.register_namespace("itunes", itunes[1:-1])
+    rss = ET.Element("rss", version="2.0")
+    channel = ET.SubElement(rss, "channel")
+    for tag, key in [("title", "podcast_title"), ("link", "podcast_link"), ("language", "podcast_language"),
+                     ("copyright", "podcast_copyright"), (itunes + "author", "podcast_author"),
+                     ("description", "podcast_description")]:
+        ET.SubElement(channel, tag).text = config[key]
+    ET.SubElement(channel, itunes + "type").text = "episodic"
+    owner = ET.SubElement(channel, itunes + "owner")
+    ET.SubElement(owner, itunes + "name").text = config["podcast_author"]
+    ET.SubElement(owner, itunes + "email").text = config["podcast_email"]
+    ET.SubElement(channel, itunes + "image", href=config["podcast_image"])
+    ET.SubElement(channel, itunes + "category", text=config["podcast_category"])
+    ET.SubElement(channel, itunes + "explicit").text = "false"
     
     # Scan episodes (directories)
-    episode_dirs = sorted([d for d in episodes_dir.iterdir() if d.is_dir()], reverse=True)
+    with os.scandir(episodes_dir) as entries:
+        episode_dirs = sorted((Path(e.path) for e in entries if e.is_dir()), reverse=True)
     
     print(f"🔍 Scanning {len(episode_dirs)} episodes for RSS...")
+
+    # Imported once for the whole feed, not per episode
+    import datetime
+    try:
+        from pydub.utils import mediainfo
+    except ImportError:
+        mediainfo = None
+    default_pub_date = datetime.datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
     
     for ep_dir in episode_dirs:
+        # One directory scan per episode; all lookups below are in memory
+        with os.scandir(ep_dir) as entries:
+            ep_files = {e.name: e for e in entries if not e.name.startswith(".") and e.is_file()}
+
         # Find audio file (*_final.wav/mp3 or any wav/mp3)
-        audio_exts = ["*_final.wav", "*_final.mp3", "*.wav", "*.mp3"]
-        audio_files = []
-        for ext in audio_exts:
-            audio_files = list(ep_dir.glob(ext))
-            if audio_files:
+        audio_entry = None
+        for suffix in ("_final.wav", "_final.mp3", ".wav", ".mp3"):
+            audio_entry = next((e for name, e in ep_files.items() if name.endswith(suffix)), None)
+            if audio_entry is not None:
                 break
             
-        if not audio_files:
+        if audio_entry is None:
             continue
             
-        audio_path = audio_files[0]
+        audio_path = Path(audio_entry.path)
         ep_id = ep_dir.name
         
         # MIME Type
@@ -600,117 +990,79 @@ def generate_rss(project_dir):
         # Metadata extraction
         # Title
         title = ep_id
-        title_file = ep_dir / "title.md"
-        if not title_file.exists():
-            title_file = ep_dir / f"{ep_id}_title.md"
+        title_name = "title.md" if "title.md" in ep_files else f"{ep_id}_title.md"
         
-        if title_file.exists():
-            with open(title_file, "r", encoding="utf-8") as f:
+        if title_name in ep_files:
+            with open(ep_dir / title_name, "r", encoding="utf-8") as f:
                 title = f.read().strip()
                 
         # Description / Shownotes
         description = ""
         summary = ""
-        shownotes_file = ep_dir / "shownotes.md"
-        if not shownotes_file.exists():
-            shownotes_file = ep_dir / f"{ep_id}_shownotes.md"
+        shownotes_name = "shownotes.md" if "shownotes.md" in ep_files else f"{ep_id}_shownotes.md"
         
-        if shownotes_file.exists():
-            with open(shownotes_file, "r", encoding="utf-8") as f:
+        if shownotes_name in ep_files:
+            with open(ep_dir / shownotes_name, "r", encoding="utf-8") as f:
                 description = f.read().strip()
                 summary = description[:500] if len(description) > 500 else description
         else:
             # Fallback to script preview
-            script_file = ep_dir / "script.md"
-            if not script_file.exists():
-                script_file = ep_dir / f"{ep_id}_script.md"
-            if script_file.exists():
-                with open(script_file, "r", encoding="utf-8") as f:
+            script_name = "script.md" if "script.md" in ep_files else f"{ep_id}_script.md"
+            if script_name in ep_files:
+                with open(ep_dir / script_name, "r", encoding="utf-8") as f:
                     script_text = f.read().strip()
                     description = script_text[:200] + "..." if len(script_text) > 200 else script_text
                     summary = description
                     
         # Episode Image
-        ep_image = ""
+        ep_image = None
         for img_name in ["cover.jpg", "cover.png", "image.jpg", "image.png"]:
-            img_path = ep_dir / img_name
-            if img_path.exists():
+            if img_name in ep_files:
                 # Assuming images are hosted in an 'images' dir relative to podcast_link
-                ep_image = f'\n      <itunes:image href="{config["podcast_link"]}/images/{ep_id}/{img_name}" />'
+                ep_image = f'{config["podcast_link"]}/images/{ep_id}/{img_name}'
                 break
 
         # File info
-        file_size = audio_path.stat().st_size
-        # Duration (using pydub if possible)
-        duration_sec = 0
-        try:
-            from pydub.utils import mediainfo
-            info = mediainfo(str(audio_path))
-            duration_sec = int(float(info.get('duration', 0)))
-        except Exception:
-            # Simple fallback if possible (very rough approx for wav)
-            if audio_path.suffix.lower() == ".wav":
-                # WAV: samples = file_size / (channels * bytes_per_sample)
-                # approx duration = file_size / (24000 * 2) = 48000 bytes/sec at 24k mono 16bit?
+        file_size = audio_entry.stat().st_size
+        # Duration: PCM WAV header first (no ffprobe subprocess), pydub for everything else
+        duration_sec = _wav_duration(audio_path) if audio_path.suffix.lower() == ".wav" else None
+        if duration_sec is None:
+            duration_sec = 0
+            try:
+                if mediainfo is None:
+                    raise RuntimeError("pydub not installed")
+                info = mediainfo(str(audio_path))
+                duration_sec = int(float(info.get('duration', 0)))
+            except (RuntimeError, OSError, ValueError):
                 pass
             
         # PubDate (approximation or from filename if YYYYMMDD)
-        import datetime
-        pub_date = datetime.datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
-        if ep_id.isdigit() and len(ep_id) == 8:
+        pub_date = default_pub_date
+        if _EP_DATE_RE.fullmatch(ep_id):
             try:
                 date_obj = datetime.datetime.strptime(ep_id, "%Y%m%d")
                 pub_date = date_obj.strftime("%a, %d %b %Y 08:00:00 +0800")
-            except Exception:
+            except ValueError:
                 pass
             
-        # Escape XML entities for non-CDATA fields
-        safe_title = saxutils.escape(title)
-        safe_summary = saxutils.escape(summary)
-        
-        item = f"""    <item>
-      <title>{safe_title}</title>
-      <itunes:title>{safe_title}</itunes:title>
-      <itunes:author>{saxutils.escape(config['podcast_author'])}</itunes:author>
-      <description><![CDATA[{description}]]></description>
-      <itunes:summary>{safe_summary}</itunes:summary>
-      <pubDate> {pub_date}</pubDate>
-      <enclosure url="{audio_url_prefix}/{audio_path.name}" length="{file_size}" type="{mime_type}" />
-      <guid isPermaLink="false">{ep_id}</guid>
-      <itunes:duration>{duration_sec}</itunes:duration>
-      <itunes:episodeType>full</itunes:episodeType>{ep_image}
-    </item>"""
-        items_xml.append(item)
+        item = ET.SubElement(channel, "item")
+        ET.SubElement(item, "title").text = title
+        ET.SubElement(item, itunes + "title").text = title
+        ET.SubElement(item, itunes + "author").text = config["podcast_author"]
+        ET.SubElement(item, "description").text = description
+        ET.SubElement(item, itunes + "summary").text = summary
+        ET.SubElement(item, "pubDate").text = pub_date
+        ET.SubElement(item, "enclosure", url=f"{audio_url_prefix}/{audio_path.name}", length=str(file_size), type=mime_type)
+        ET.SubElement(item, "guid", isPermaLink="false").text = ep_id
+        ET.SubElement(item, itunes + "duration").text = str(duration_sec)
+        ET.SubElement(item, itunes + "episodeType").text = "full"
+        if ep_image:
+            ET.SubElement(item, itunes + "image", href=ep_image)
         print(f"  Added: {title}")
 
-    items_joined = "\n".join(items_xml)
-    rss_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0" 
-     xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd" 
-     xmlns:content="http://purl.org/rss/1.0/modules/content/">
-  <channel>
-    <title>{saxutils.escape(config['podcast_title'])}</title>
-    <link>{saxutils.escape(config['podcast_link'])}</link>
-    <language>{saxutils.escape(config['podcast_language'])}</language>
-    <copyright>{saxutils.escape(config['podcast_copyright'])}</copyright>
-    <itunes:author>{saxutils.escape(config['podcast_author'])}</itunes:author>
-    <description>{saxutils.escape(config['podcast_description'])}</description>
-    <itunes:type>episodic</itunes:type>
-    <itunes:owner>
-      <itunes:name>{saxutils.escape(config['podcast_author'])}</itunes:name>
-      <itunes:email>{saxutils.escape(config['podcast_email'])}</itunes:email>
-    </itunes:owner>
-    <itunes:image href="{saxutils.escape(config['podcast_image'])}" />
-    <itunes:category text="{saxutils.escape(config['podcast_category'])}" />
-    <itunes:explicit>false</itunes:explicit>
-
-{items_joined}
-  </channel>
-</rss>
-"""
+    ET.indent(rss)
     rss_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(rss_file, "w", encoding="utf-8") as f:
-        f.write(rss_content)
+    ET.ElementTree(rss).write(rss_file, encoding="utf-8", xml_declaration=True)
     print(f"\n✅ RSS feed generated: {rss_file}")
 
 def audition_voices(output_dir=".", count=5, text=None, workdir=None):
@@ -758,7 +1110,6 @@ def audition_voices(output_dir=".", count=5, text=None, workdir=None):
 
 def merge_segments(episode_name, workdir=None, output_file=None):
     """Merge segment contents back into a single script file"""
-    import re
     if workdir:
         base_dir = Path(workdir).resolve()
         segments_dir = base_dir / "output" / episode_name / "segments_md"
@@ -779,7 +1130,9 @@ def merge_segments(episode_name, workdir=None, output_file=None):
     print(f"🔍 Merging segments from: {segments_dir}")
     
     # Sort files by segment index (segment_001_...)
-    files = sorted(list(segments_dir.glob("segment_*.md")))
+    with os.scandir(segments_dir) as entries:
+        files = sorted(e.path for e in entries
+                       if e.name.startswith("segment_") and e.name.endswith(".md") and e.is_file())
     if not files:
         print("❌ No segment files found.")
         sys.exit(1)
@@ -787,7 +1140,7 @@ def merge_segments(episode_name, workdir=None, output_file=None):
     # [Validation] Ensure segment continuity
     indices = []
     for f in files:
-        match = re.search(r"segment_(\d{3})_", f.name)
+        match = _SEG_INDEX_RE.search(os.path.basename(f))
         if match:
             indices.append(int(match.group(1)))
             
@@ -810,10 +1163,8 @@ def merge_segments(episode_name, workdir=None, output_file=None):
     if indices[0] != 1:
         print(f"⚠️ Warning: Segments start at {indices[0]}, not 001.")
 
-    full_text = ""
-    for f in files:
-        with open(f, "r", encoding="utf-8") as fs:
-            full_text += fs.read().strip() + "\n\n"
+    # One join instead of repeated += (quadratic copying of the growing script)
+    full_text = "\n\n".join(read_texts(files))
             
     # Output path
     if output_file:
@@ -859,7 +1210,6 @@ def deploy_episode(episode_name, project_dir="."):
     # Ensure target dir exists
     docs_audio_dir.mkdir(parents=True, exist_ok=True)
     
-    import shutil
     print(f"🚀 Deploying {final_mp3.name} to {docs_audio_dir}...")
     shutil.copy2(final_mp3, target_mp3)
     
@@ -867,7 +1217,39 @@ def deploy_episode(episode_name, project_dir="."):
     print("Next steps: Update docs/index.html and run 'genpod rss'")
 
 
+def _parse_check_argv(argv):
+    """
+    Fast path for `genpod check <input> [-w DIR] [-v]` without building the argparse tree.
+    Returns (input, workdir, verbose), or None to fall back to argparse (help, unknown flags, errors).
+    """
+    if not argv or argv[0] != "check":
+        return None
+    input_name, workdir, verbose = None, None, False
+    args = iter(argv[1:])
+    for arg in args:
+        if arg in ("-v", "--verbose"):
+            verbose = True
+        elif arg in ("-w", "--workdir"):
+            workdir = next(args, None)
+            if workdir is None or workdir.startswith("-"):
+                return None
+        elif arg.startswith("--workdir="):
+            workdir = arg[len("--workdir="):]
+        elif arg.startswith("-") or input_name is not None:
+            return None
+        else:
+            input_name = arg
+    if input_name is None:
+        return None
+    return input_name, workdir, verbose
+
 def main():
+    check_args = _parse_check_argv(sys.argv[1:])
+    if check_args is not None:
+        check_script(*check_args)
+        return
+
+    import argparse
     parser = argparse.ArgumentParser(description="GenPod CLI Tool")
     subparsers = parser.add_subparsers(dest="command", required=True)
     
@@ -878,7 +1260,8 @@ def main():
     build_parser.add_argument("-o", "--output", help="Output directory root")
     build_parser.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
     build_parser.add_argument("-f", "--force", action="store_true", help="Force regenerate all segments")
-    build_parser.add_argument("-j", "--jobs", type=int, default=2, help="Number of parallel generation jobs (default: 2)")
+    build_parser.add_argument("--prune", action="store_true", help="Delete segment files left over from deleted paragraphs, and wav cache entries of other ChatTTS/genpod versions")
+    build_parser.add_argument("-j", "--jobs", type=int, default=2, help="Number of parallel generation jobs, 0 = half the CPU cores (default: 2)")
     build_parser.add_argument("-n", "--name", help="Explicit episode name (output directory name)")
     
     # Check Command
@@ -934,7 +1317,7 @@ def main():
         # I will handle this by injecting into config? No, that's messy.
         
         # Let's Change:
-        build_podcast(args.input, args.output, args.workdir, args.verbose, args.force, args.jobs, episode_name_override=args.name)
+        build_podcast(args.input, args.output, args.workdir, args.verbose, args.force, args.jobs, episode_name_override=args.name, prune=args.prune)
     elif args.command == "check":
         check_script(args.input, args.workdir, args.verbose)
     elif args.command == "init":
@@ -1,7 +1,193 @@
 import argparse
+import shutil
+import subprocess
 from pathlib import Path
 
-from pydub import AudioSegment
+import numpy as np
+import soundfile as sf
+
+
+def _read_dtype(seg_file):
+    """整数 PCM 直接读 int16；浮点 WAV 必须读成 float（按 int16 读不做缩放，会得到全零）"""
+    return 'int16' if sf.info(seg_file).subtype.startswith('PCM') else 'float32'
+
+
+def _wav_params(segment_files):
+    """
+    只读 WAV 文件头，检查段落能否直接流式拼接。
+    Returns (sample_rate, channels), or None if the files are not all WAVs
+    with the same sample rate and channel count.
+    """
+    params = None
+    for seg_file in segment_files:
+        if Path(seg_file).suffix.lower() != ".wav":
+            return None
+        info = sf.info(seg_file)
+        if params is None:
+            params = (info.samplerate, info.channels)
+        elif (info.samplerate, info.channels) != params:
+            return None
+    return params
+
+
+def _stream_wav_segments(segment_files, output_file, sample_rate, channels, pause_ms=500, blocksize=65536):
+    """逐块把 WAV 段落写入输出文件，内存占用与段落总数无关"""
+    pause = np.zeros((sample_rate * pause_ms // 1000, channels), dtype=np.int16)
+    with sf.SoundFile(output_file, 'w', samplerate=sample_rate, channels=channels, subtype='PCM_16') as out:
+        for i, seg_file in enumerate(segment_files):
+            if i:
+                out.write(pause)
+            # Float blocks are scaled to PCM_16 by libsndfile on write
+            for block in sf.blocks(seg_file, blocksize=blocksize, dtype=_read_dtype(seg_file), always_2d=True):
+                out.write(block)
+
+
+def _ffprobe_params(path):
+    """(sample_rate, channels) of the first audio stream via ffprobe, or None"""
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "a:0",
+           "-show_entries", "stream=sample_rate,channels", "-of", "default=noprint_wrappers=1", str(path)]
+    try:
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        fields = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+        return int(fields["sample_rate"]), int(fields["channels"])
+    except (OSError, subprocess.CalledProcessError, KeyError, ValueError):
+        return None
+
+
+def _audio_params(input_files):
+    """
+    输入中最高的采样率与最多的声道数：拼接不降质，也不会把单声道 TTS 无谓地变成 44.1kHz 立体声。
+    soundfile reads the header where it can, other formats are asked of ffprobe.
+    Returns None if no input could be probed.
+    """
+    params = []
+    for input_file in input_files:
+        try:
+            info = sf.info(str(input_file))
+            params.append((info.samplerate, info.channels))
+        except RuntimeError:
+            # Not a format libsndfile knows (e.g. MP3 before libsndfile 1.1)
+            probed = _ffprobe_params(input_file)
+            if probed is not None:
+                params.append(probed)
+    if not params:
+        return None
+    return max(rate for rate, _ in params), max(ch for _, ch in params)
+
+
+def _ffmpeg_concat(input_files, output_file, pause_ms=500, sample_rate=None, channels=None):
+    """
+    用一个 ffmpeg 进程拼接音频（中间插入静音），解码/编码都在 ffmpeg 内流式完成。
+    Inputs are converted to one rate/layout so mixed sources (BGM + TTS) can be
+    joined; unless given, it is probed from the inputs (44.1kHz stereo if that fails).
+    Returns False if ffmpeg is not available; raises RuntimeError with ffmpeg's stderr on failure.
+    """
+    if shutil.which("ffmpeg") is None:
+        return False
+    if sample_rate is None or channels is None:
+        sample_rate, channels = _audio_params(input_files) or (44100, 2)
+    layout = "mono" if channels == 1 else "stereo"
+    fmt = f"aformat=sample_fmts=s16:sample_rates={sample_rate}:channel_layouts={layout}"
+    graph = []
+    labels = []
+    for i in range(len(input_files)):
+        if i:
+            graph.append(f"aevalsrc=0:c={layout}:s={sample_rate}:d={pause_ms / 1000},{fmt}[p{i}]")
+            labels.append(f"[p{i}]")
+        graph.append(f"[{i}:a]{fmt}[a{i}]")
+        labels.append(f"[a{i}]")
+    graph.append(f"{''.join(labels)}concat=n={len(labels)}:v=0:a=1[out]")
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    for input_file in input_files:
+        cmd += ["-i", str(input_file)]
+    cmd += ["-filter_complex", ";".join(graph), "-map", "[out]"]
+    if Path(output_file).suffix.lower() == ".mp3":
+        cmd += ["-c:a", "libmp3lame", "-b:a", "192k"]
+    cmd.append(str(output_file))
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg 拼接失败（exit {e.returncode}）：{(e.stderr or '').strip()}") from e
+    return True
+
+
+def _write_mp3_lameenc(pcm, sample_rate, output_file, bitrate=192):
+    """
+    进程内 LAME 编码 int16 PCM（frames, channels），不启动 ffmpeg 子进程。
+    Returns False if lameenc is not installed (genpod[fast]).
+    """
+    try:
+        import lameenc
+    except ImportError:
+        return False
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(bitrate)
+    encoder.set_in_sample_rate(sample_rate)
+    encoder.set_channels(pcm.shape[1])
+    encoder.set_quality(2)
+    with open(output_file, 'wb') as f:
+        f.write(encoder.encode(np.ascontiguousarray(pcm).tobytes()))
+        f.write(encoder.flush())
+    return True
+
+
+def _stream_mp3_lameenc(segment_files, output_file, sample_rate, channels, pause_ms=500, bitrate=192, blocksize=65536):
+    """
+    与 _stream_wav_segments 相同的逐块拼接，但直接在进程内 LAME 编码为 MP3。
+    Returns False if lameenc is not installed (genpod[fast]).
+    """
+    try:
+        import lameenc
+    except ImportError:
+        return False
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(bitrate)
+    encoder.set_in_sample_rate(sample_rate)
+    encoder.set_channels(channels)
+    encoder.set_quality(2)
+    pause = np.zeros((sample_rate * pause_ms // 1000, channels), dtype=np.int16).tobytes()
+    with open(output_file, 'wb') as f:
+        for i, seg_file in enumerate(segment_files):
+            if i:
+                f.write(encoder.encode(pause))
+            for block in sf.blocks(seg_file, blocksize=blocksize, dtype=_read_dtype(seg_file), always_2d=True):
+                if block.dtype != np.int16:
+                    block = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+                f.write(encoder.encode(np.ascontiguousarray(block).tobytes()))
+        f.write(encoder.flush())
+    return True
+
+
+def _export_segment(segment, output_file, fmt):
+    """导出 AudioSegment：16-bit MP3 优先进程内 LAME 编码，否则交给 pydub/ffmpeg"""
+    if fmt == "mp3":
+        if segment.sample_width == 2:
+            pcm = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels)
+            if _write_mp3_lameenc(pcm, segment.frame_rate, output_file):
+                return
+        segment.export(output_file, format="mp3", bitrate="192k")
+    else:
+        segment.export(output_file, format=fmt)
+
+
+def _concatenate_with_pydub(segment_files, output_file, fmt):
+    """没有 ffmpeg 时的后备：段落之间添加 500ms 停顿，统一到第一段的格式"""
+    from pydub import AudioSegment
+    segments = [AudioSegment.from_file(seg_file) for seg_file in segment_files]
+    
+    # 统一到第一段的格式后一次性拼接原始 PCM：`combined + seg` 每次都复制整个已拼接缓冲区（O(N²)）
+    first = segments[0]
+    frame_rate, channels, sample_width = first.frame_rate, first.channels, first.sample_width
+    silence_bytes = b"\x00" * (frame_rate * 500 // 1000 * channels * sample_width)
+    buf = bytearray(first.raw_data)
+    for seg in segments[1:]:
+        seg = seg.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width)
+        buf += silence_bytes
+        buf += seg.raw_data
+    combined = first._spawn(bytes(buf))
+    
+    # [Fix] 根据文件后缀自动选择格式，支持 MP3 压缩
+    _export_segment(combined, output_file, fmt)
 
 
 def concatenate_segments(segment_files, output_file, fade_duration=500):
@@ -12,31 +198,31 @@ def concatenate_segments(segment_files, output_file, fade_duration=500):
     
     print(f"🔗 正在拼接 {len(segment_files)} 个段落...")
     
-    # 加载所有音频
-    segments = []
+    existing_files = []
     for seg_file in segment_files:
         if Path(seg_file).exists():
-            segments.append(AudioSegment.from_file(seg_file))
+            existing_files.append(seg_file)
         else:
             print(f"⚠️  警告：文件不存在 {seg_file}")
     
-    if not segments:
+    if not existing_files:
         print("❌ 没有有效的音频文件")
         return
     
-    # 拼接所有段落，段落之间添加短暂停顿（500ms）
-    combined = segments[0]
-    pause = AudioSegment.silent(duration=500)
-    
-    for seg in segments[1:]:
-        combined = combined + pause + seg
-    
-    # [Fix] 根据文件后缀自动选择格式，支持 MP3 压缩
     fmt = Path(output_file).suffix.lower().replace('.', '') or "wav"
-    if fmt == "mp3":
-        combined.export(output_file, format="mp3", bitrate="192k")
+    
+    # 段落都是同一格式的 WAV（ChatTTS 输出）：逐块流式写出，不在内存中拼出整期音频
+    params = _wav_params(existing_files)
+    if params is not None and fmt == "wav":
+        _stream_wav_segments(existing_files, output_file, *params)
+    elif params is not None and fmt == "mp3" and _stream_mp3_lameenc(existing_files, output_file, *params):
+        pass
     else:
-        combined.export(output_file, format=fmt)
+        # 其他情况（MP3 但没有 lameenc、混合格式）：ffmpeg 单进程解码+编码，PCM 不进入 Python 内存
+        sample_rate, channels = params or (None, None)  # None: probed from the inputs
+        if not _ffmpeg_concat(existing_files, output_file, sample_rate=sample_rate, channels=channels):
+            # 没有 ffmpeg：pydub 直接读取 WAV，统一到第一段的格式
+            _concatenate_with_pydub(existing_files, output_file, fmt)
     print(f"✅ 段落拼接完成: {output_file}")
 
 
@@ -44,7 +230,13 @@ def concatenate_full_podcast(dry_audio_file, welcome_file, outro_file, output_fi
     """拼接完整播客：欢迎语 + 干音 + 结束语"""
     print("🎬 正在拼接完整播客...")
     
+    # 优先让 ffmpeg 直接解码+编码，PCM 不经过 Python
+    if _ffmpeg_concat([welcome_file, dry_audio_file, outro_file], output_file):
+        print(f"✅ 完整播客拼接完成: {output_file}")
+        return
+    
     # 加载音频
+    from pydub import AudioSegment
     welcome = AudioSegment.from_file(welcome_file)
     dry = AudioSegment.from_file(dry_audio_file)
     outro = AudioSegment.from_file(outro_file)
@@ -61,10 +253,7 @@ def concatenate_full_podcast(dry_audio_file, welcome_file, outro_file, output_fi
     
     # [Fix] 导出为 MP3 並设置 192k 码率，确保高质量压缩
     fmt = Path(output_file).suffix.lower().replace('.', '') or "wav"
-    if fmt == "mp3":
-        final.export(output_file, format="mp3", bitrate="192k")
-    else:
-        final.export(output_file, format=fmt)
+    _export_segment(final, output_file, fmt)
     print(f"✅ 完整播客拼接完成: {output_file}")
 
 
@@ -1,7 +1,15 @@
 import argparse
+import subprocess
 from pathlib import Path
 
-from pydub import AudioSegment
+
+def _ffmpeg_extract(src, dst, seek_args, seconds):
+    """用 ffmpeg 只解码需要的那一段（输入端 seek），不把整首 BGM 解码进内存"""
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", *seek_args, "-i", str(src),
+        "-t", f"{seconds:.3f}", "-c:a", "libmp3lame", str(dst)
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
 
 
 def extract_bgm_segments(bgm_file, output_dir=None, duration=5000):
@@ -25,22 +33,17 @@ def extract_bgm_segments(bgm_file, output_dir=None, duration=5000):
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
     
-    print(f"🎵 正在加载BGM文件: {bgm_file}")
-    audio = AudioSegment.from_file(str(bgm_path))
-    
-    total_duration = len(audio)
-    print(f"📏 BGM总时长: {total_duration/1000:.2f} 秒")
+    print(f"🎵 正在提取BGM片段: {bgm_file}")
+    seconds = duration / 1000
     
     # 提取前N秒
-    intro = audio[:duration]
     intro_file = output_dir / f"{bgm_path.stem}_intro_{duration//1000}s.mp3"
-    intro.export(str(intro_file), format="mp3")
+    _ffmpeg_extract(bgm_path, intro_file, [], seconds)
     print(f"✅ 前{duration//1000}秒已保存: {intro_file}")
     
-    # 提取最后N秒
-    outro = audio[-duration:]
+    # 提取最后N秒（-sseof 相对文件末尾定位，无需先探测总时长）
     outro_file = output_dir / f"{bgm_path.stem}_outro_{duration//1000}s.mp3"
-    outro.export(str(outro_file), format="mp3")
+    _ffmpeg_extract(bgm_path, outro_file, ["-sseof", f"-{seconds:.3f}"], seconds)
     print(f"✅ 最后{duration//1000}秒已保存: {outro_file}")
     
     return str(intro_file), str(outro_file)
@@ -1,20 +1,29 @@
 import argparse
+import functools
+import gc
+import hashlib
+import json
 import logging
 import os
+import pickle
 import re
 import sys
 import time
 from datetime import datetime
 from pathlib import Path
 
-import ChatTTS
-import torch
-import torchaudio
-from pydub import AudioSegment
-from pydub.silence import detect_leading_silence
-
 from .pronunciations import DEFAULT_PRONUNCIATIONS
 
+# ChatTTS / torch / pydub 导入耗时数秒，均在用到的函数内延迟导入
+
+# [tag] 或空白：一次扫描同时去除标记和空白
+_TAG_OR_WS_RE = re.compile(r'\[.*?\]|\s+')
+_TAG_RE = re.compile(r'\[.*?\]')
+_UV_BREAK_RE = re.compile(r'\[\s*uv_break\s*\]', re.IGNORECASE)
+_CTRL_WS_RE = re.compile(r'[\t\n\r\f\v]+')
+# 允许保留的 ChatTTS 标记前缀（str.startswith 直接接受 tuple）
+_SAFE_TAG_PREFIXES = ('break_', 'laugh', 'oral_', 'speed_')
+
 
 def setup_logging(log_file=None):
     """设置日志记录"""
@@ -38,18 +47,19 @@ def setup_logging(log_file=None):
 
 def count_text_chars(text):
     """统计实际文字数量（去除标记和控制字符）"""
-    # 移除 ChatTTS 标记：[uv_break], [laugh], [oral] 等
-    text_clean = re.sub(r'\[.*?\]', '', text)
-    # 移除空白字符
-    text_clean = re.sub(r'\s+', '', text_clean)
-    return len(text_clean)
+    # 移除 ChatTTS 标记：[uv_break], [laugh], [oral] 等，以及空白字符
+    return len(_TAG_OR_WS_RE.sub('', text))
 
 
 def read_markdown_file(file_path):
     """读取 markdown 文件并提取文本内容"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
+        # 二进制一次读入再整体解码，绕过 TextIOWrapper 的分块解码；换行与文本模式一致
+        with open(file_path, 'rb') as f:
+            text = f.read().decode('utf-8')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text.strip()
     except FileNotFoundError:
         print(f"❌ 错误：找不到文件 {file_path}")
         sys.exit(1)
@@ -61,68 +71,353 @@ def read_markdown_file(file_path):
 # 全局 ChatTTS 实例（避免重复加载模型）
 _chat_instance = None
 
+# norm/refine/spk_emb 磁盘缓存所在的根目录（其下的 .cache）；cli 设为项目根目录，默认当前目录
+_cache_root = None
+
+# 本地模型需要的文件（相对 asset 目录）
+_MODEL_FILES = (
+    "Decoder.safetensors",
+    "DVAE.safetensors",
+    "Embed.safetensors",
+    "Vocos.safetensors",
+    "gpt/config.json",
+    "gpt/model.safetensors",
+    "tokenizer/tokenizer.json",
+)
+
+
+def set_cache_root(path):
+    """Keep the norm/refine/spk_emb caches under `path`/.cache (the project root), whatever the cwd"""
+    global _cache_root
+    _cache_root = Path(path) if path is not None else None
+
 
-def initialize_worker():
-    """多进程 Worker 初始化：每个进程加载一次模型"""
+def _cache_base():
+    return (_cache_root or Path.cwd()) / ".cache"
+
+
+def initialize_worker(chat=None, cache_root=None):
+    """多进程 Worker 初始化：使用主进程共享的模型，否则每个进程加载一次模型；cache_root 同主进程"""
     global _chat_instance
-    if _chat_instance is None:
+    set_cache_root(cache_root)
+    if chat is not None:
+        _chat_instance = chat
+    elif _chat_instance is None:
         _chat_instance = get_chat_instance()
 
 
-def get_chat_instance():
-    """获取 ChatTTS 实例（单例模式）"""
+def share_chat_instance():
+    """
+    Load the model in this process and move its weights to shared memory.
+
+    Passed to spawn workers through initialize_worker, the tensors are sent
+    as shared-memory handles by torch.multiprocessing, so N workers map one
+    copy of the weights instead of each loading its own.
+    """
+    import torch.multiprocessing
+    chat = get_chat_instance()
+    for module in vars(chat).values():
+        if isinstance(module, torch.nn.Module):
+            module.share_memory()
+    return chat
+
+
+@functools.lru_cache(maxsize=1)
+def _chat_picklable():
+    """
+    Whether a ChatTTS.Chat can be sent to spawn workers. Checked once on an
+    unloaded instance, so an unpicklable Chat never costs a model load here.
+    """
+    from multiprocessing.reduction import ForkingPickler
+
+    import ChatTTS
+    try:
+        ForkingPickler.dumps(ChatTTS.Chat())
+    except (pickle.PicklingError, TypeError, AttributeError, RuntimeError):
+        return False
+    return True
+
+
+def _release_chat_instance():
+    """Drop this process's model, e.g. the parent copy once workers load their own"""
+    global _chat_instance
+    import torch
+    _chat_instance = None
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def get_chat_instance(compile=False):
+    """
+    获取 ChatTTS 实例（单例模式）
+
+    compile=True lets ChatTTS wrap its GPT in torch.compile (CUDA only). The
+    one-time compile cost only pays off when the same instance generates many
+    segments, and only the first call decides how the model is loaded.
+    GENPOD_COMPILE=1 forces it on (e.g. for long single-process runs).
+    """
     global _chat_instance
     if _chat_instance is not None:
         return _chat_instance
 
+    import torch
+    if torch.cuda.is_available():
+        # Variable-length decoding allocates/frees activations every step:
+        # expandable segments (torch >= 2.1) avoid fragmentation-driven cudaMalloc calls.
+        # Read when the allocator initializes, i.e. on the first CUDA allocation.
+        if tuple(int(v) for v in torch.__version__.split(".")[:2]) >= (2, 1):
+            os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+
+    compile = compile or os.environ.get("GENPOD_COMPILE") == "1"
+    if compile:
+        # Segment lengths vary, so allow more recompiles before dynamo falls back to eager
+        import torch._dynamo
+        torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, 64)
+
     # 检查本地是否有模型文件
     # 优先查找当前目录下的 asset
     project_root = Path.cwd()
     asset_dir = project_root / "asset"
-    local_model_exists = (
-        (asset_dir / "Decoder.safetensors").exists() and
-        (asset_dir / "DVAE.safetensors").exists() and
-        (asset_dir / "Embed.safetensors").exists() and
-        (asset_dir / "Vocos.safetensors").exists() and
-        (asset_dir / "gpt" / "config.json").exists() and
-        (asset_dir / "gpt" / "model.safetensors").exists() and
-        (asset_dir / "tokenizer" / "tokenizer.json").exists()
-    )
+    local_model_exists = all(os.path.isfile(asset_dir / name) for name in _MODEL_FILES)
     
+    import ChatTTS
     chat = ChatTTS.Chat()
     
     if local_model_exists:
         print(f"[Process {os.getpid()}] 🔄 正在加载 ChatTTS 模型（使用本地模型文件）...")
-        # ChatTTS 会自动检测当前目录下的 asset 文件夹
-        # 切换到项目根目录，确保能找到 asset 目录
-        original_cwd = os.getcwd()
-        try:
-            os.chdir(str(project_root))
-            chat.load(compile=False)  # compile=False 可以加快加载速度
-            print(f"[Process {os.getpid()}] ✅ 模型加载完成（使用本地文件）")
-        finally:
-            os.chdir(original_cwd)
+        # 直接把项目根目录（asset 的上级）交给 ChatTTS，不再切换进程工作目录
+        if not chat.load(source="custom", custom_path=str(project_root), compile=compile):
+            # e.g. asset checksums from another ChatTTS version: let the default loader resolve them
+            chat.load(compile=compile)  # compile=False 可以加快加载速度
+        print(f"[Process {os.getpid()}] ✅ 模型加载完成（使用本地文件）")
     else:
         print(f"[Process {os.getpid()}] 🔄 正在加载 ChatTTS 模型（首次运行会从网络下载模型文件）...")
         print("💡 提示：运行 download_models.sh 可以预先下载模型到本地，加快后续加载速度")
-        chat.load(compile=False)  # compile=False 可以加快加载速度
+        chat.load(compile=compile)  # compile=False 可以加快加载速度
         print(f"[Process {os.getpid()}] ✅ 模型加载完成")
         
+    if compile and torch.cuda.is_available():
+        # chat.load(compile=True) only compiles the GPT; the DVAE decoder runs once
+        # per segment through its forward and benefits from fused kernels as well.
+        # (Vocos is not wrapped: ChatTTS calls vocos.decode(), which torch.compile
+        # on the module would never intercept.)
+        decoder = getattr(chat, "decoder", None)
+        if isinstance(decoder, torch.nn.Module):
+            chat.decoder = torch.compile(decoder, dynamic=True)
+
     _chat_instance = chat
     return _chat_instance
 
 
+def _chattts_version():
+    """Installed ChatTTS version, used to invalidate on-disk caches (None if unknown)"""
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("ChatTTS")
+    except PackageNotFoundError:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _pipeline_version():
+    """
+    Version of genpod's own text pipeline (package version + default pronunciation table),
+    part of the wav cache key so audio prepared by another genpod is not reused.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        genpod_version = version("genpod")
+    except PackageNotFoundError:
+        genpod_version = "dev"
+    table = json.dumps(DEFAULT_PRONUNCIATIONS, sort_keys=True, ensure_ascii=False)
+    return f"{genpod_version}-{hashlib.blake2b(table.encode('utf-8'), digest_size=4).hexdigest()}"
+
+
+def _norm_cache_dir():
+    """On-disk normalizer cache, one directory per ChatTTS version (None if unknown)"""
+    chattts_version = _chattts_version()
+    if chattts_version is None:
+        return None
+    return _cache_base() / "norm" / chattts_version
+
+
+def _refine_cache_dir():
+    """
+    On-disk refine cache, one directory per ChatTTS version and refine precision
+    (None if the version is unknown): bf16 sampling may pick different tokens.
+    """
+    chattts_version = _chattts_version()
+    if chattts_version is None:
+        return None
+    return _cache_base() / "refine" / chattts_version / _refine_precision()
+
+
+def _text_cache_file(cache_dir, key_text):
+    if cache_dir is None:
+        return None
+    key = hashlib.blake2b(key_text.encode('utf-8'), digest_size=8).hexdigest()
+    return cache_dir / f"{key}.json"
+
+
+def _read_text_cache(cache_file, key_text):
+    """Cached value for key_text, or None (the stored key guards against hash collisions)"""
+    if cache_file is None:
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry["text"] == key_text:
+            return entry["value"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _write_text_cache(cache_file, key_text, value):
+    if cache_file is None:
+        return
+    try:
+        os.makedirs(cache_file.parent, exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"text": key_text, "value": value}, f, ensure_ascii=False)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_cached(text):
+    """
+    chat.normalizer is deterministic in its input, so results are memoized in
+    memory and persisted under .cache/norm/ for later runs.
+    """
+    cache_file = _text_cache_file(_norm_cache_dir(), text)
+    normalized = _read_text_cache(cache_file, text)
+    if normalized is None:
+        normalized = get_chat_instance().normalizer(text, do_text_normalization=True, do_homophone_replacement=True)
+        _write_text_cache(cache_file, text, normalized)
+    return normalized
+
+
+def _refine_cached(chat, model_texts, seed, split_text):
+    """
+    文本润色（refine）结果缓存：同一 (文本, seed) 的润色结果是确定的（manual_seed），
+    so only uncached texts go through the refine GPT pass, in one call.
+    Returns one refined string per input text (split pieces joined with spaces).
+    """
+    cache_dir = _refine_cache_dir()
+    keys = [f"{seed}\0{int(split_text)}\0{t}" for t in model_texts]
+    cache_files = [_text_cache_file(cache_dir, k) for k in keys]
+    refined = [_read_text_cache(f, k) for f, k in zip(cache_files, keys)]
+    missing = [i for i, r in enumerate(refined) if r is None]
+    if not missing:
+        return refined
+
+    with _inference_context(autocast=True):
+        result = chat.infer(
+            [model_texts[i] for i in missing],
+            params_refine_text=_refine_params(chat, seed),
+            refine_text_only=True,
+            split_text=split_text
+        )
+    if isinstance(result, str):
+        result = [result]
+    if split_text:
+        # split_text may return several pieces for the single input
+        result = [" ".join(result)] if len(missing) == 1 else result
+    for i, value in zip(missing, result):
+        refined[i] = value
+        _write_text_cache(cache_files[i], keys[i], value)
+    return refined
+
+
+@functools.lru_cache(maxsize=64)
+def _speaker_embedding(seed):
+    """
+    chat.sample_random_speaker() is a pure function of the seed, so the
+    embedding is memoized in memory and under .cache/spk_emb/.
+    """
+    import torch
+    chattts_version = _chattts_version()
+    cache_file = None
+    if chattts_version is not None:
+        cache_file = _cache_base() / "spk_emb" / chattts_version / _inference_device() / f"{seed}.pt"
+        try:
+            return torch.load(cache_file)
+        except (OSError, RuntimeError, EOFError, pickle.UnpicklingError) as e:
+            # Missing or unreadable entry: sample it and (re)write the cache
+            logging.getLogger(__name__).debug("speaker cache miss for seed %s: %s", seed, e)
+
+    _seed_everything(seed)
+    chat = get_chat_instance()
+    with _inference_context():
+        spk_emb = chat.sample_random_speaker()
+
+    if cache_file is not None:
+        try:
+            os.makedirs(cache_file.parent, exist_ok=True)
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            torch.save(spk_emb, temp_file)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            # A read-only or full cache dir only costs a re-sample next run
+            logging.getLogger(__name__).debug("could not cache speaker for seed %s: %s", seed, e)
+    return spk_emb
+
+
+def _ascii_alnum(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+def _pronunciation_key_re(word):
+    """
+    Escaped key; keys starting/ending with an ASCII letter or digit only match
+    at an ASCII word edge ("App" not inside "Apple"). \\b is not used because
+    CJK characters count as word characters, so "用AI" would never match.
+    """
+    key = re.escape(word)
+    if _ascii_alnum(word[0]):
+        key = '(?<![A-Za-z0-9])' + key
+    if _ascii_alnum(word[-1]):
+        key += '(?![A-Za-z0-9])'
+    return key
+
+
+@functools.lru_cache(maxsize=16)
+def _pronunciation_pattern(items):
+    """One alternation over all keys, longest first so overlapping keys prefer the longer match"""
+    mapping = {str(word): str(replacement) for word, replacement in items if str(word)}
+    if not mapping:
+        return None, mapping
+    pattern = re.compile('|'.join(map(_pronunciation_key_re, sorted(mapping, key=len, reverse=True))))
+    return pattern, mapping
+
+
+def _apply_pronunciation_items(text, items):
+    # 单次扫描替换：每个 str.replace 都要扫描全文，词典越大越慢
+    pattern, mapping = _pronunciation_pattern(items)
+    if pattern is None:
+        return text
+    return pattern.sub(lambda m: mapping[m.group(0)], text)
+
+
 def apply_pronunciations(text, dictionary):
     """Apply pronunciation replacements from dictionary (case-insensitive for keys)"""
     if not dictionary:
         return text
-        
-    for word, replacement in dictionary.items():
-        # Use simple string replacement for now, or regex for whole words
-        # Replaces all occurrences, case-insensitive logic handled by user input typically
-        # But here we do simple replace to keep it predictable
-        text = text.replace(str(word), str(replacement))
-    return text
+    return _apply_pronunciation_items(text, tuple(dictionary.items()))
+
+
+@functools.lru_cache(maxsize=32)
+def _combined_pronunciation_items(user_items):
+    """DEFAULT_PRONUNCIATIONS overridden by the user's entries, as a hashable tuple"""
+    combined = dict(DEFAULT_PRONUNCIATIONS)
+    combined.update(user_items)
+    return tuple(combined.items())
 
 
 def match_target_amplitude(sound, target_dBFS):
@@ -131,244 +426,446 @@ def match_target_amplitude(sound, target_dBFS):
     return sound.apply_gain(change_in_dBFS)
 
 
-def generate_audio(text, voice, output_file, rate=None, pitch=None, logger=None, pronunciations=None):
-    """生成音频文件（使用 ChatTTS）"""
-    if logger is None:
-        logger = logging.getLogger(__name__)
-    
-    # Check if text is empty
-    if not text or not text.strip():
-        logger.warning(f"Empty text for output {output_file}, skipping generation.")
-        return
-
-    # Apply pronunciation replacements
-    # Merge user provided pronunciations with defaults
-    # User config overrides defaults
-    combined_pronunciations = DEFAULT_PRONUNCIATIONS.copy()
-    if pronunciations:
-        combined_pronunciations.update(pronunciations)
-
-    # Use combined dictionary
-    if combined_pronunciations:
-        original_text = text
-        text = apply_pronunciations(text, combined_pronunciations)
-        if text != original_text:
-            logger.info("  Applied pronunciation fixes. Text modified.")
-
-    chat = get_chat_instance()
-    
-    # 统计文字数量
-    text_chars = count_text_chars(text)
-    raw_chars = len(text)
-    
-    # 将 voice 参数转换为 seed
+def _leading_silence_ms(samples, frame_rate, max_amplitude, threshold_db=-50.0, chunk_ms=10):
+    """
+    与 pydub.silence.detect_leading_silence 相同的判定（10ms 块 RMS 低于阈值即为静音），
+    但一次性用 numpy 算出所有块的 RMS，而不是逐块在 Python 里切片计算 dBFS。
+    `samples` is (frames,) or (frames, channels); pass samples[::-1] for trailing silence.
+    """
+    import numpy as np
+    frames = len(samples)
+    duration_ms = round(frames * 1000 / frame_rate)
+    if frames == 0:
+        return 0
+    squares = np.square(samples, dtype=np.float64)
+    if squares.ndim > 1:
+        squares = squares.mean(axis=1)
+    chunk = max(1, frame_rate * chunk_ms // 1000)
+    starts = np.arange(0, frames, chunk)
+    rms = np.sqrt(np.add.reduceat(squares, starts) / np.minimum(chunk, frames - starts))
+    loud = np.flatnonzero(rms >= max_amplitude * 10 ** (threshold_db / 20))
+    if not loud.size:
+        return duration_ms
+    return min(int(loud[0]) * chunk_ms, duration_ms)
+
+
+def _inference_device():
+    """Device ChatTTS runs on (chat.load picks CUDA whenever it is available)"""
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _refine_precision():
+    """Device/dtype tag of the refine GPT pass: "cuda-bf16", "cuda-fp32" or "cpu-fp32" """
+    import torch
+    if _inference_device() == "cuda" and torch.cuda.is_bf16_supported():
+        return "cuda-bf16"
+    return f"{_inference_device()}-fp32"
+
+
+def _inference_context(autocast=False):
+    """
+    推理上下文：关闭 autograd。
+    autocast=True 只用于 refine_text_only 的 GPT 前向：在支持 bf16 的 CUDA 上启用 autocast。
+    Full infer calls stay in fp32: they also run the DVAE decoder and the Vocos
+    ISTFT, which uses complex tensors (no complex bf16) and returns numpy arrays.
+    """
+    import contextlib
+
+    import torch
+    stack = contextlib.ExitStack()
+    stack.enter_context(torch.inference_mode())
+    if autocast and _refine_precision() == "cuda-bf16":
+        stack.enter_context(torch.autocast('cuda', dtype=torch.bfloat16))
+    return stack
+
+
+def _parse_seed(voice):
+    """将 voice 参数转换为 seed"""
     try:
-        seed = int(voice) if voice.isdigit() else 2222
+        return int(voice) if voice.isdigit() else 2222
     except (ValueError, AttributeError):
-        seed = 2222
-    
-    # ChatTTS 不支持 rate 和 pitch 参数，给出提示
-    if rate or pitch:
-        logger.warning("ChatTTS 不支持语速和音调调整，这些参数将被忽略")
-    
-    # 设置各库随机种子，确保极致稳定性
+        return 2222
+
+
+def _seed_everything(seed):
+    """设置各库随机种子，确保极致稳定性"""
     import random
+
     import numpy as np
+    import torch
     random.seed(seed)
     np.random.seed(seed)
     torch.manual_seed(seed)
     if torch.cuda.is_available():
         torch.cuda.manual_seed_all(seed)
-    
-    # 生成稳定的 speaker embedding
-    # [Fix] 移除重复调用，确保逻辑唯一
-    spk_emb = chat.sample_random_speaker()
-    
-    logger.info(f"开始生成音频 - seed: {seed}, 原始文本长度: {raw_chars} 字符, 实际文字数: {text_chars} 字")
-    
-    # 记录开始时间
-    start_time = time.time()
-    
-    # --- 阶段 1: 文本归一化 (Source of Truth) ---
-    # ChatTTS normalizer natively preserves [break_n] and other [tag] formats.
-    normalized_text = chat.normalizer(text, do_text_normalization=True, do_homophone_replacement=True)
-    logger.info(f"  normalized_text: {repr(normalized_text)}")
-    logger.info("  1. 文本归一化完成")
 
-    # --- 阶段 2: 文本润色 (Source of Prosody) ---
-    logger.info("  2. 正在进行文本润色 (获取语气Tags)...")
-    
+
+def _prepare_text(text, pronunciations, logger):
+    """Apply pronunciation replacements (user config overrides defaults)"""
+    # Merged dict and its compiled pattern are built once per distinct config, not per segment
+    items = _combined_pronunciation_items(tuple(pronunciations.items()) if pronunciations else ())
+    if items:
+        original_text = text
+        text = _apply_pronunciation_items(text, items)
+        if text != original_text:
+            logger.info("  Applied pronunciation fixes. Text modified.")
+    return text
+
+
+def _text_for_model(text):
+    """Plain text handed to the refiner"""
     # [Optimize] 彻底剥离所有符号和换行，仅保留纯文字供模型润色。
     # 这样可以防止 [break_6] 等标签干扰模型导致其进入幻听循环。
     # 由于后续有 align_text 逻辑，标签会在推理前被自动找回。
-    text_for_model = re.sub(r'\[.*?\]', '', text) # 移除所有 [tag]
-    text_for_model = re.sub(r'\s+', '', text_for_model) # 移除换行和空格
-    
+    return _TAG_OR_WS_RE.sub('', text) # 移除所有 [tag]、换行和空格
+
+
+def _refine_params(chat, seed):
     # 自然度优先：Refine 0.7 提供更丰富的语气起伏
-    params_refine = chat.RefineTextParams(
+    return chat.RefineTextParams(
         temperature=0.7,
         top_P=0.7,
-        prompt='[laugh_0][break_4]', 
+        prompt='[laugh_0][break_4]',
         max_new_token=1024,
         manual_seed=seed
     )
-    
-    refined_text_raw = chat.infer(
-        [text_for_model],
-        params_refine_text=params_refine,
-        refine_text_only=True,
-        split_text=True
-    )
-    
-    # Handle inference result (list or string)
-    if isinstance(refined_text_raw, list):
-        refined_text_combined = " ".join(refined_text_raw)
-    else:
-        refined_text_combined = refined_text_raw
 
-    # --- 阶段 3: 文本对齐 (Alignment) ---
-    logger.info("  3. 正在执行文本对齐 (去除幻觉)...")
-    from .text_aligner import align_text
-    aligned_text = align_text(normalized_text, refined_text_combined)
-    
-    # 统计修正情况
-    if aligned_text != refined_text_combined:
-        diff_len = len(refined_text_combined) - len(aligned_text)
-        logger.info(f"     ✅ 对齐修正完成 (差异字符数: {diff_len})")
-    
-    # --- 阶段 4: 音频推理 (Infer) ---
-    logger.info("  4. 正在生成音频波形...")
-    
+
+def _infer_params(chat, spk_emb, seed):
     # 推理温度保持 0.3 以锁定音色，去除语速 prompt 增加自然度
-    params_infer = chat.InferCodeParams(
-        spk_emb=spk_emb, 
+    return chat.InferCodeParams(
+        spk_emb=spk_emb,
         max_new_token=2048,
-        temperature=0.3, 
+        temperature=0.3,
         top_P=0.7,
         prompt='', # 去除固定语速，让模型根据上下文自然发挥
         manual_seed=seed
     )
-    
+
+
+def _finalize_text(normalized_text, refined_text, logger):
+    """Align the refined text with the normalized one and scrub it for inference"""
+    # --- 阶段 3: 文本对齐 (Alignment) ---
+    logger.info("  3. 正在执行文本对齐 (去除幻觉)...")
+    from .text_aligner import align_text
+    aligned_text = align_text(normalized_text, refined_text)
+
+    # 统计修正情况
+    if aligned_text != refined_text:
+        diff_len = len(refined_text) - len(aligned_text)
+        logger.info("     ✅ 对齐修正完成 (差异字符数: %s)", diff_len)
+
     # [Safety] Final scrub: Ensure only standard tags exist in the final string
-    final_text = re.sub(r'\[\s*uv_break\s*\]', '[break_6]', aligned_text, flags=re.IGNORECASE)
-    whitelisted_prefixes = ['break_', 'laugh', 'oral_', 'speed_']
-    
+    final_text = _UV_BREAK_RE.sub('[break_6]', aligned_text)
     def tag_safety_filter(match):
         tag = match.group(0)
         inner = tag[1:-1].lower()
-        if any(inner.startswith(p) for p in whitelisted_prefixes):
+        if inner.startswith(_SAFE_TAG_PREFIXES):
             return tag
-        logger.warning(f"     🛡️  Safety Filter: Dropping suspicious tag {tag}")
+        logger.warning("     🛡️  Safety Filter: Dropping suspicious tag %s", tag)
         return ""
-        
-    final_text = re.sub(r'\[.*?\]', tag_safety_filter, final_text)
-    
+
+    final_text = _TAG_RE.sub(tag_safety_filter, final_text)
+
     # [Debug] Log the definitive text string
-    logger.info(f"  Final Inference Text: {repr(final_text)}")
-    
+    logger.info("  Final Inference Text: %r", final_text)
+
     # [Optimize] Disable split_text for segments shorter than 200 chars to prevent voice drift between splits
     # Normalize whitespace but preserve intentional spaces (e.g., between English abbreviations)
     # Only collapse newlines, tabs, and other non-space whitespace
-    final_text = re.sub(r'[\t\n\r\f\v]+', ' ', final_text).strip()
-    
-    wavs = chat.infer(
-        [final_text], 
-        use_decoder=True, 
-        params_infer_code=params_infer,
-        skip_refine_text=True, # Critical: Don't refine again!
-        do_text_normalization=False, # It's already been normalized/refined
-        split_text=True # Restore splitting for natural rhythm in longer segments
-    )
-    
-    # 记录生成时间
-    generation_time = time.time() - start_time
-    
-    # 转换为 torch tensor
-    wav_array = wavs[0]
-    wav_tensor = torch.from_numpy(wav_array)
-    
+    return _CTRL_WS_RE.sub(' ', final_text).strip()
+
+
+def _save_wav(wav_array, output_file, logger):
+    """
+    Write a generated waveform to `output_file` (24kHz wav) with silence trimming
+    and loudness normalization.
+    Returns (output_file, audio_duration, save_time, sound), `sound` being the
+    written audio as an AudioSegment.
+    """
+    import numpy as np
+    from pydub import AudioSegment
+
+    # ChatTTS 输出单声道 float 波形：(samples,) 或 (1, samples)
+    samples = np.asarray(wav_array, dtype=np.float32).reshape(-1)
+
     # 计算音频时长（秒）
-    audio_duration = len(wav_array) / 24000  # 采样率 24000
-    
-    # 确保是 2D tensor (channels, samples)
-    if len(wav_tensor.shape) == 1:
-        wav_tensor = wav_tensor.unsqueeze(0)
-    elif len(wav_tensor.shape) > 2:
-        wav_tensor = wav_tensor[0] if wav_tensor.shape[0] == 1 else wav_tensor.squeeze()
-    
+    audio_duration = len(samples) / 24000  # 采样率 24000
+
     # 确保输出文件扩展名为 .wav
     output_path = Path(output_file)
     if output_path.suffix != '.wav':
         output_file = str(output_path.with_suffix('.wav'))
-    
+
     # [Atomic Write] Use a temporary file to prevent partial writes
     temp_output_file = str(output_path) + ".tmp"
-    
+
     try:
-        # 保存音频（采样率 24000）
         save_start_time = time.time()
-        if wav_tensor.shape[0] > wav_tensor.shape[-1]:
-            wav_tensor = wav_tensor.T
-        torchaudio.save(temp_output_file, wav_tensor, 24000, format="wav")
-        
+        # 直接在内存中构造 PCM，不再先写 WAV 再读回来做后处理
+        # clip 产生一份拷贝，缩放在其上原地完成，只剩最终 int16 一次分配
+        scaled = np.clip(samples, -1.0, 1.0)
+        scaled *= 32767
+        pcm = scaled.astype(np.int16)
+        sound = AudioSegment(pcm.tobytes(), frame_rate=24000, sample_width=2, channels=1)
+
         # --- 阶段 5: 音频后处理 (Post-Processing) ---
         # 1. 自动切除前后静音
         # 2. 响度标准化 (-20 dBFS)
         try:
-            sound = AudioSegment.from_wav(temp_output_file)
-            
-            # 切除静音 (阈值 -50dB)
-            start_trim = detect_leading_silence(sound, -50.0)
-            end_trim = detect_leading_silence(sound.reverse(), -50.0)
+            # 切除静音 (阈值 -50dB)，倒序视图检测结尾，无需 sound.reverse() 复制
+            start_trim = _leading_silence_ms(pcm, 24000, sound.max_possible_amplitude)
+            end_trim = _leading_silence_ms(pcm[::-1], 24000, sound.max_possible_amplitude)
             # 给开头留 30ms 缓冲，避免切得太死
             start_trim = max(0, start_trim - 30)
             end_trim = max(0, end_trim - 30)
-            sound = sound[start_trim:len(sound)-end_trim]
-            
+            trimmed = sound[start_trim:len(sound)-end_trim]
+
             # 响度匹配
-            normalized_sound = match_target_amplitude(sound, -20.0)
-            normalized_sound.export(temp_output_file, format="wav")
+            sound = match_target_amplitude(trimmed, -20.0)
             logger.info("  5. 音频后处理完成 (切除静音 + -20.0 dBFS)")
-        except Exception as e:
-            logger.error(f"  ❌ 响度标准化失败: {e}")
-            # If post-processing fails, we might still want the raw audio? 
-            # Ideally NO, let's keep it consistent. But for now, let's proceed with potentially raw audio if export failed?
-            # Actually, if export failed, temp_output_file might be raw or corrupted. 
-            # Let's assume torchaudio.save succeeded so at least we have that.
-            pass
+        except (ValueError, ArithmeticError) as e:
+            # Keep the raw (untrimmed, unnormalized) audio rather than nothing
+            logger.error("  ❌ 响度标准化失败: %s", e)
+
+        # libsndfile 直接写 WAV 头和样本，不经过 pydub 的导出
+        import soundfile as sf
+        samples = np.frombuffer(sound.raw_data, dtype=np.int16)
+        sf.write(temp_output_file, samples, sound.frame_rate, subtype='PCM_16', format='WAV')
 
         # [Atomic Write] Commit the file
         os.replace(temp_output_file, output_file)
-        
+
     except Exception as e:
-        logger.error(f"❌ Failed to save audio: {e}")
+        logger.error("❌ Failed to save audio: %s", e)
         if os.path.exists(temp_output_file):
             os.remove(temp_output_file)
         raise e
 
-    save_time = time.time() - save_start_time
-    
+    return output_file, audio_duration, time.time() - save_start_time, sound
+
+
+def generate_audio(text, voice, output_file, rate=None, pitch=None, logger=None, pronunciations=None):
+    """生成音频文件（使用 ChatTTS）"""
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    # Check if text is empty
+    if not text or not text.strip():
+        logger.warning("Empty text for output %s, skipping generation.", output_file)
+        return
+
+    text = _prepare_text(text, pronunciations, logger)
+
+    chat = get_chat_instance()
+
+    # 统计文字数量
+    text_chars = count_text_chars(text)
+    raw_chars = len(text)
+
+    seed = _parse_seed(voice)
+
+    # ChatTTS 不支持 rate 和 pitch 参数，给出提示
+    if rate or pitch:
+        logger.warning("ChatTTS 不支持语速和音调调整，这些参数将被忽略")
+
+    _seed_everything(seed)
+
+    # 生成稳定的 speaker embedding
+    # [Fix] 移除重复调用，确保逻辑唯一
+    spk_emb = _speaker_embedding(seed)
+
+    logger.info("开始生成音频 - seed: %s, 原始文本长度: %s 字符, 实际文字数: %s 字", seed, raw_chars, text_chars)
+
+    # 记录开始时间
+    start_time = time.time()
+
+    # --- 阶段 1: 文本归一化 (Source of Truth) ---
+    # ChatTTS normalizer natively preserves [break_n] and other [tag] formats.
+    normalized_text = _normalize_cached(text)
+    logger.info("  normalized_text: %r", normalized_text)
+    logger.info("  1. 文本归一化完成")
+
+    # --- 阶段 2: 文本润色 (Source of Prosody) ---
+    logger.info("  2. 正在进行文本润色 (获取语气Tags)...")
+
+    refined_text_combined = _refine_cached(chat, [_text_for_model(text)], seed, split_text=True)[0]
+
+    final_text = _finalize_text(normalized_text, refined_text_combined, logger)
+
+    # --- 阶段 4: 音频推理 (Infer) ---
+    logger.info("  4. 正在生成音频波形...")
+
+    with _inference_context():
+        wavs = chat.infer(
+            [final_text],
+            use_decoder=True,
+            params_infer_code=_infer_params(chat, spk_emb, seed),
+            skip_refine_text=True, # Critical: Don't refine again!
+            do_text_normalization=False, # It's already been normalized/refined
+            split_text=True # Restore splitting for natural rhythm in longer segments
+        )
+
+    # 记录生成时间
+    generation_time = time.time() - start_time
+
+    output_file, audio_duration, save_time, _ = _save_wav(wavs[0], output_file, logger)
+
     total_time = time.time() - start_time
-    
+
     # 计算速度指标
     chars_per_second = text_chars / generation_time if generation_time > 0 else 0
     audio_ratio = audio_duration / generation_time if generation_time > 0 else 0
-    
+
     # 记录统计信息
-    logger.info(f"音频生成完成 - 文件: {output_file}")
+    logger.info("音频生成完成 - 文件: %s", output_file)
     logger.info("  统计信息:")
-    logger.info(f"    - 原始文本长度: {raw_chars} 字符")
-    logger.info(f"    - 实际文字数: {text_chars} 字")
-    logger.info(f"    - 生成耗时: {generation_time:.2f} 秒")
-    logger.info(f"    - 保存耗时: {save_time:.2f} 秒")
-    logger.info(f"    - 总耗时: {total_time:.2f} 秒")
-    logger.info(f"    - 音频时长: {audio_duration:.2f} 秒")
-    logger.info(f"    - 生成速度: {chars_per_second:.2f} 字/秒")
-    logger.info(f"    - 音频/生成比: {audio_ratio:.2f}x")
-    
+    logger.info("    - 原始文本长度: %s 字符", raw_chars)
+    logger.info("    - 实际文字数: %s 字", text_chars)
+    logger.info("    - 生成耗时: %.2f 秒", generation_time)
+    logger.info("    - 保存耗时: %.2f 秒", save_time)
+    logger.info("    - 总耗时: %.2f 秒", total_time)
+    logger.info("    - 音频时长: %.2f 秒", audio_duration)
+    logger.info("    - 生成速度: %.2f 字/秒", chars_per_second)
+    logger.info("    - 音频/生成比: %.2fx", audio_ratio)
+
     print(f"✅ 生成完毕: {output_file} ({generation_time:.2f}s, {audio_duration:.2f}s audio)")
 
 
+def generate_audio_task(args):
+    """进程池任务：解包 generate_audio 参数，返回输出文件（模块级函数，可被 pickle）"""
+    generate_audio(*args)
+    return args[2]
+
+
+def generate_segments_parallel(task_args, num_workers, logger=None):
+    """
+    多进程生成：task_args 为 generate_audio 参数元组列表。
+
+    Workers are spawned once and receive the shared model through
+    initialize_worker, so the model is loaded (or mapped) once per worker,
+    not once per segment. Yields output files in completion order.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    from torch import multiprocessing
+
+    ctx = multiprocessing.get_context('spawn')  # Use spawn for PyTorch/CUDA safety
+    pool = None
+    if _chat_picklable():
+        # Workers map one shared copy of the weights instead of each loading its own
+        shared_chat = share_chat_instance()
+        try:
+            pool = ctx.Pool(processes=num_workers, initializer=initialize_worker, initargs=(shared_chat, _cache_root))
+        except (pickle.PicklingError, TypeError, AttributeError, RuntimeError) as e:
+            logger.warning("Could not share the model with workers (%s), loading it per worker", e)
+            # Every worker loads its own copy now: do not keep the parent's resident as well
+            del shared_chat
+            _release_chat_instance()
+    else:
+        logger.warning("ChatTTS.Chat cannot be pickled, loading the model per worker")
+    if pool is None:
+        # One model per worker (ChatTTS is heavy)
+        pool = ctx.Pool(processes=min(num_workers, 4), initializer=initialize_worker, initargs=(None, _cache_root))
+    with pool:
+        # chunksize=1: segments vary a lot in length, so hand them out one at a time
+        yield from pool.imap_unordered(generate_audio_task, task_args, chunksize=1)
+
+
+def batched_inference_available():
+    """Batched generation only pays off on GPU, where a batch decodes in one forward pass"""
+    import torch
+    return torch.cuda.is_available()
+
+
+def _plan_batches(lengths, batch_size, char_budget):
+    """
+    Group segment indices (shortest first) into batches.
+
+    A batch is padded to its longest segment, so it is closed once
+    `longest * count` would exceed `char_budget` or it holds `batch_size`
+    segments: long segments run a few at a time, short ones many at a time.
+    """
+    batches = []
+    current = []
+    for idx in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, so the new segment is the longest in the batch
+        if current and (len(current) >= batch_size or lengths[idx] * (len(current) + 1) > char_budget):
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def generate_audio_batch(tasks, voice, logger=None, pronunciations=None, batch_size=8, char_budget=800, compile=False,
+                         return_audio=False):
+    """
+    批量生成音频：tasks 为 (text, output_file) 列表。
+
+    Segments are coalesced into batches by `_plan_batches`, and every batch
+    runs ONE refine pass and ONE code/decoder pass for all of its segments
+    instead of one per segment. `compile` is forwarded to get_chat_instance.
+    With return_audio=True, returns {output_file: AudioSegment} of the written
+    audio so callers can post-process it without decoding the files again.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    audio = {}
+    tasks = [(text, output_file) for text, output_file in tasks if text and text.strip()]
+    if not tasks:
+        return audio if return_audio else None
+
+    chat = get_chat_instance(compile=compile)
+    seed = _parse_seed(voice)
+
+    # Same seed order as generate_audio, so the speaker is identical
+    _seed_everything(seed)
+    spk_emb = _speaker_embedding(seed)
+    params_infer = _infer_params(chat, spk_emb, seed)
+
+    prepared = [(_prepare_text(text, pronunciations, logger), output_file) for text, output_file in tasks]
+    lengths = [count_text_chars(text) for text, _ in prepared]
+
+    for batch_indices in _plan_batches(lengths, max(1, batch_size), char_budget):
+        batch = [prepared[i] for i in batch_indices]
+        texts = [text for text, _ in batch]
+        logger.info("开始批量生成 - seed: %s, 段落数: %s, 实际文字数: %s 字", seed, len(batch), sum(lengths[i] for i in batch_indices))
+        start_time = time.time()
+
+        normalized = [_normalize_cached(t) for t in texts]
+        logger.info("  1. 文本归一化完成")
+
+        # split_text=False: one output per input segment
+        logger.info("  2. 正在进行文本润色 (获取语气Tags)...")
+        refined = _refine_cached(chat, [_text_for_model(t) for t in texts], seed, split_text=False)
+        final_texts = [_finalize_text(n, r, logger) for n, r in zip(normalized, refined)]
+
+        logger.info("  4. 正在生成音频波形...")
+        with _inference_context():
+            wavs = chat.infer(
+                final_texts,
+                use_decoder=True,
+                params_infer_code=params_infer,
+                skip_refine_text=True,
+                do_text_normalization=False,
+                split_text=False
+            )
+        generation_time = time.time() - start_time
+
+        for wav, (_, output_file) in zip(wavs, batch):
+            saved_file, audio_duration, _, sound = _save_wav(wav, output_file, logger)
+            if return_audio:
+                audio[output_file] = sound
+            print(f"✅ 生成完毕: {saved_file} ({audio_duration:.2f}s audio)")
+        logger.info("批量生成完成 - %s 段, 生成耗时: %.2f 秒", len(batch), generation_time)
+
+    return audio if return_audio else None
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="从 Markdown 文件生成播客音频",
@@ -427,7 +924,7 @@ def main():
     
     # 设置日志
     logger = setup_logging(args.log_file)
-    logger.info(f"开始处理文件: {args.input_file}")
+    logger.info("开始处理文件: %s", args.input_file)
     
     # 读取 markdown 文件
     text = read_markdown_file(args.input_file)
@@ -455,8 +952,8 @@ def main():
     print(f"📏 文本长度: {len(text)} 字符 (实际文字: {text_chars} 字)")
     print()
     
-    logger.info(f"输入文件: {args.input_file}, 输出文件: {output_file}, seed: {args.voice}")
-    logger.info(f"文本统计: 原始长度 {len(text)} 字符, 实际文字数 {text_chars} 字")
+    logger.info("输入文件: %s, 输出文件: %s, seed: %s", args.input_file, output_file, args.voice)
+    logger.info("文本统计: 原始长度 %s 字符, 实际文字数 %s 字", len(text), text_chars)
     
     # 生成音频
     generate_audio(text, args.voice, output_file, args.rate, args.pitch, logger)
@@ -1,17 +1,68 @@
-import subprocess
+import logging
 import sys
 from pathlib import Path
 
-# 添加src目录到路径
-sys.path.insert(0, str(Path(__file__).parent))
+# 添加src目录到路径（作为脚本运行时也能导入 genpod 包）
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from pydub import AudioSegment
 
-from text_processor import clean_text
+from genpod.text_processor import clean_text
+
+logger = logging.getLogger(__name__)
+
+# Failures of one generation call (model/CUDA errors, unwritable output) that should not abort the other clips
+_GENERATION_ERRORS = (RuntimeError, OSError, ValueError)
+
+
+def _load_source_text(source_dir, name):
+    """读取 name_cleaned.md；不存在时清洗 name.md 并写出 cleaned 文件。找不到源文件返回 None"""
+    cleaned_file = source_dir / f"{name}_cleaned.md"
+    md_file = source_dir / f"{name}.md"
+    
+    if cleaned_file.exists():
+        return cleaned_file.read_text(encoding='utf-8')
+    if md_file.exists():
+        cleaned_content = clean_text(md_file.read_text(encoding='utf-8'))
+        cleaned_file.write_text(cleaned_content, encoding='utf-8')
+        return cleaned_content
+    return None
+
+
+def _generate_voices(jobs, seed_str):
+    """
+    GPU 上一次批量生成所有片段；CPU 上（或批量失败时）逐段用 generate_audio 生成，
+    保留 split_text 分句，韵律与单独生成时一致。单段失败只跳过该段。
+    Returns {output_file: AudioSegment} for the clips that were generated.
+    """
+    from genpod.generate_podcast import (
+        batched_inference_available,
+        generate_audio,
+        generate_audio_batch,
+    )
+    if batched_inference_available():
+        try:
+            # 生成的音频直接以内存中的 AudioSegment 返回，拼接BGM时无需重新解码 WAV
+            return generate_audio_batch(
+                [(text, output_file) for _, _, text, output_file in jobs], seed_str,
+                logger=logger, batch_size=len(jobs), return_audio=True
+            )
+        except _GENERATION_ERRORS:
+            logger.exception("❌ 批量生成失败，改为逐段生成")
+    
+    voices = {}
+    for _, name, text, output_file in jobs:
+        try:
+            generate_audio(text, seed_str, output_file, logger=logger)
+            voices[output_file] = AudioSegment.from_file(output_file)
+        except _GENERATION_ERRORS:
+            logger.exception("  ❌ %s 生成失败", name)
+    return voices
 
 
 def generate_welcome_and_outro(seed=7470000, bgm_intro=None, bgm_outro=None):
     """生成所有欢迎词和结束语的音频，并拼接BGM片段"""
+    seed_str = str(seed)
     base_dir = Path("sources")
     welcome_dir = base_dir / "welcome"
     outro_dir = base_dir / "outro"
@@ -19,116 +70,52 @@ def generate_welcome_and_outro(seed=7470000, bgm_intro=None, bgm_outro=None):
     # 加载BGM片段
     bgm_intro_audio = None
     bgm_outro_audio = None
+    # BGM音量降低一半（-6dB），所有片段共用，只计算一次
     if bgm_intro and Path(bgm_intro).exists():
-        bgm_intro_audio = AudioSegment.from_file(bgm_intro)
-        print(f"✅ 已加载BGM前5秒: {bgm_intro}")
+        bgm_intro_audio = AudioSegment.from_file(bgm_intro) - 6
+        logger.info("✅ 已加载BGM前5秒: %s", bgm_intro)
     if bgm_outro and Path(bgm_outro).exists():
-        bgm_outro_audio = AudioSegment.from_file(bgm_outro)
-        print(f"✅ 已加载BGM后5秒: {bgm_outro}")
+        bgm_outro_audio = AudioSegment.from_file(bgm_outro) - 6
+        logger.info("✅ 已加载BGM后5秒: %s", bgm_outro)
+    pause = AudioSegment.silent(duration=200)
     
-    # 生成欢迎词
-    print("🎤 正在生成欢迎词...")
-    for i in range(1, 6):
-        # 优先使用cleaned文件，如果不存在则使用原始文件并清洗
-        cleaned_file = welcome_dir / f"welcome_{i}_cleaned.md"
-        md_file = welcome_dir / f"welcome_{i}.md"
-        
-        if cleaned_file.exists():
-            temp_file = cleaned_file
-        elif md_file.exists():
-            # 读取并清洗文本
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            cleaned_content = clean_text(content)
-            
-            # 写入临时文件
-            temp_file = welcome_dir / f"welcome_{i}_cleaned.md"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(cleaned_content)
-        else:
-            print(f"  ⚠️  跳过 welcome_{i}：找不到源文件")
-            continue
-        
-        # 生成音频
-        output_file = welcome_dir / f"welcome_{i}.wav"
-        cmd = [
-            sys.executable,
-            "src/generate_podcast.py",
-            str(temp_file),
-            "-o", str(output_file),
-            "-v", str(seed)
-        ]
-        
-        print(f"  生成 welcome_{i}...")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"  ✅ welcome_{i} 生成完成")
-            
-            # 拼接BGM前5秒（音量降低一半，-6dB）
-            if bgm_intro_audio:
-                welcome_audio = AudioSegment.from_file(output_file)
-                # BGM音量降低一半（-6dB）
-                bgm_intro_low = bgm_intro_audio - 6
-                # BGM前5秒 + 短暂停顿 + 欢迎词
-                pause = AudioSegment.silent(duration=200)
-                final_welcome = bgm_intro_low + pause + welcome_audio
-                final_welcome.export(output_file, format="wav")
-                print(f"  ✅ welcome_{i} 已拼接BGM前5秒（音量降低50%）")
-        else:
-            print(f"  ❌ welcome_{i} 生成失败: {result.stderr}")
+    # 收集所有欢迎词和结束语（优先使用cleaned文件，如果不存在则使用原始文件并清洗）
+    jobs = []
+    for kind, source_dir in (("welcome", welcome_dir), ("outro", outro_dir)):
+        for i in range(1, 6):
+            name = f"{kind}_{i}"
+            text = _load_source_text(source_dir, name)
+            if text is None:
+                logger.warning("  ⚠️  跳过 %s：找不到源文件", name)
+                continue
+            jobs.append((kind, name, text, str(source_dir / f"{name}.wav")))
     
-    # 生成结束语
-    print("\n🎤 正在生成结束语...")
-    for i in range(1, 6):
-        # 优先使用cleaned文件，如果不存在则使用原始文件并清洗
-        cleaned_file = outro_dir / f"outro_{i}_cleaned.md"
-        md_file = outro_dir / f"outro_{i}.md"
-        
-        if cleaned_file.exists():
-            temp_file = cleaned_file
-        elif md_file.exists():
-            # 读取并清洗文本
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            cleaned_content = clean_text(content)
-            
-            # 写入临时文件
-            temp_file = outro_dir / f"outro_{i}_cleaned.md"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(cleaned_content)
-        else:
-            print(f"  ⚠️  跳过 outro_{i}：找不到源文件")
+    if not jobs:
+        logger.warning("⚠️  没有需要生成的欢迎词或结束语")
+        return
+    
+    # 在当前进程内一次加载模型（GPU 上批量推理）
+    logger.info("🎤 正在生成 %s 段欢迎词和结束语...", len(jobs))
+    voices = _generate_voices(jobs, seed_str)
+    
+    for kind, name, _, output_file in jobs:
+        voice_audio = voices.get(output_file)
+        if voice_audio is None:
+            logger.error("  ❌ %s 生成失败", name)
             continue
+        logger.info("  ✅ %s 生成完成", name)
         
-        # 生成音频
-        output_file = outro_dir / f"outro_{i}.wav"
-        cmd = [
-            sys.executable,
-            "src/generate_podcast.py",
-            str(temp_file),
-            "-o", str(output_file),
-            "-v", str(seed)
-        ]
-        
-        print(f"  生成 outro_{i}...")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"  ✅ outro_{i} 生成完成")
-            
-            # 拼接BGM后5秒（音量降低一半，-6dB）
-            if bgm_outro_audio:
-                outro_audio = AudioSegment.from_file(output_file)
-                # BGM音量降低一半（-6dB）
-                bgm_outro_low = bgm_outro_audio - 6
-                # 结束语 + 短暂停顿 + BGM后5秒
-                pause = AudioSegment.silent(duration=200)
-                final_outro = outro_audio + pause + bgm_outro_low
-                final_outro.export(output_file, format="wav")
-                print(f"  ✅ outro_{i} 已拼接BGM后5秒（音量降低50%）")
-        else:
-            print(f"  ❌ outro_{i} 生成失败: {result.stderr}")
+        # 拼接BGM：欢迎词在前面接BGM前5秒，结束语在后面接BGM后5秒
+        if kind == "welcome" and bgm_intro_audio:
+            final_audio = bgm_intro_audio + pause + voice_audio
+            final_audio.export(output_file, format="wav")
+            logger.info("  ✅ %s 已拼接BGM前5秒（音量降低50%%）", name)
+        elif kind == "outro" and bgm_outro_audio:
+            final_audio = voice_audio + pause + bgm_outro_audio
+            final_audio.export(output_file, format="wav")
+            logger.info("  ✅ %s 已拼接BGM后5秒（音量降低50%%）", name)
     
-    print("\n✅ 所有欢迎词和结束语生成完成！")
+    logger.info("✅ 所有欢迎词和结束语生成完成！")
 
 
 if __name__ == "__main__":
@@ -153,6 +140,7 @@ if __name__ == "__main__":
         help='BGM后5秒文件路径'
     )
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     seed = int(args.voice) if args.voice.isdigit() else 7470000
     generate_welcome_and_outro(seed, args.bgm_intro, args.bgm_outro)
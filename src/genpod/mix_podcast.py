@@ -1,10 +1,71 @@
 import argparse
+import functools
+import os
 import sys
 from pathlib import Path
 
+import numpy as np
 from pydub import AudioSegment
 
 
+def fade_segment(segment, fade_in=0, fade_out=0):
+    """
+    线性淡入/淡出（毫秒），与 pydub 的 fade_in/fade_out 效果一致。
+
+    The envelope is applied with numpy on the raw int16 samples in one
+    vectorized pass, instead of pydub's per-millisecond loop.
+    """
+    if segment.sample_width != 2:
+        return segment.fade_in(fade_in).fade_out(fade_out)
+
+    samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels).copy()
+    total = len(samples)
+    n_in = min(total, int(segment.frame_rate * fade_in / 1000))
+    n_out = min(total, int(segment.frame_rate * fade_out / 1000))
+    if n_in:
+        env = np.linspace(0.0, 1.0, n_in, endpoint=False, dtype=np.float32)
+        samples[:n_in] = samples[:n_in] * env[:, None]
+    if n_out:
+        env = np.linspace(1.0, 0.0, n_out, endpoint=False, dtype=np.float32)
+        samples[total - n_out:] = samples[total - n_out:] * env[:, None]
+    return segment._spawn(samples.tobytes())
+
+
+def loop_segment(segment, duration):
+    """
+    循环拼接 segment 直到 duration 毫秒并裁剪到该长度。
+
+    The int16 samples are repeated with one np.resize call (a single
+    allocation) instead of growing an AudioSegment with `+=` in a loop.
+    """
+    if segment.sample_width != 2:
+        looped = segment
+        while len(looped) < duration:
+            looped += segment
+        return looped[:duration]
+
+    samples = np.frombuffer(segment.raw_data, dtype=np.int16)
+    frames = int(segment.frame_rate * duration / 1000)
+    return segment._spawn(np.resize(samples, frames * segment.channels).tobytes())
+
+
+@functools.lru_cache(maxsize=4)
+def _decoded_bgm(path, mtime_ns, size, volume_reduction):
+    """Decoded BGM lowered by volume_reduction dB (mtime/size are only part of the key)"""
+    return AudioSegment.from_file(path) - volume_reduction
+
+
+def load_bgm_cached(bgm_file, volume_reduction=0):
+    """
+    读取 BGM 并降低 volume_reduction dB；同一进程内重复混音时只解码一次。
+
+    The memo key covers the absolute path, mtime, size and volume, so an
+    edited or replaced BGM file is decoded again.
+    """
+    st = os.stat(bgm_file)
+    return _decoded_bgm(os.path.abspath(bgm_file), st.st_mtime_ns, st.st_size, volume_reduction)
+
+
 def mix_podcast(voice_file, bgm_file, output_file, intro_duration=2000, outro_duration=3000, bgm_volume_reduction=18):
     """
     混音播客：将人声音频与背景音乐混合
@@ -20,9 +81,10 @@ def mix_podcast(voice_file, bgm_file, output_file, intro_duration=2000, outro_du
     print("🎚️ 正在进行混音处理...")
 
     # 1. 加载音频文件
+    # 2. 调整背景音乐 (BGM)：降低音量，以免盖过人声（与解码一起缓存）
     try:
         voice = AudioSegment.from_file(voice_file)
-        bgm = AudioSegment.from_file(bgm_file)
+        bgm_low = load_bgm_cached(bgm_file, bgm_volume_reduction)
     except FileNotFoundError as e:
         print(f"❌ 错误：找不到文件 {e.filename}")
         sys.exit(1)
@@ -30,31 +92,22 @@ def mix_podcast(voice_file, bgm_file, output_file, intro_duration=2000, outro_du
         print(f"❌ 加载音频文件时出错：{e}")
         sys.exit(1)
 
-    # 2. 调整背景音乐 (BGM)
-    # 策略：降低 BGM 音量，以免盖过人声
-    bgm_low = bgm - bgm_volume_reduction
-    
     # 3. 计算需要的时长
     # 我们希望：开头音乐独奏 + 人声时长 + 结尾音乐独奏
     total_duration = intro_duration + len(voice) + outro_duration
 
-    # 4. 循环 BGM (如果 BGM 比人声短，就循环播放)
-    combined_bgm = bgm_low
-    while len(combined_bgm) < total_duration:
-        combined_bgm += bgm_low  # 拼接
-
-    # 5. 裁剪 BGM 到确切长度
-    final_bgm = combined_bgm[:total_duration]
+    # 4. 循环 BGM (如果 BGM 比人声短，就循环播放)，并裁剪到确切长度
+    final_bgm = loop_segment(bgm_low, total_duration)
 
-    # 6. 制作"淡入"和"淡出"效果
+    # 5. 制作"淡入"和"淡出"效果
     # 开头淡入，结尾淡出，听起来更丝滑
-    final_bgm = final_bgm.fade_in(intro_duration).fade_out(outro_duration)
+    final_bgm = fade_segment(final_bgm, intro_duration, outro_duration)
 
-    # 7. 合成 (Overlay)
+    # 6. 合成 (Overlay)
     # 把人声叠加在 BGM 上，position 参数决定人声从第几毫秒开始
     podcast = final_bgm.overlay(voice, position=intro_duration)
 
-    # 8. 导出
+    # 7. 导出
     podcast.export(output_file, format="mp3")
     print(f"✨ 播客制作完成！已保存为: {output_file}")
 
@@ -1,133 +1,255 @@
 
 import logging
 
+try:
+    # Optional accelerator (pip install genpod[fast])
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
+# WHITELISTED_TAGS: only allow valid prosody tags, filter out [speaker_...] etc.
+WHITELIST_PREFIXES = ('break_', 'laugh', 'oral_', 'speed_')
+
+# Backtrace moves of the alignment DP
+_DIAG = 0  # Match / substitution: norm char aligned with a ref char
+_UP = 1    # Deletion: norm char has no counterpart in ref (restore it)
+_LEFT = 2  # Insertion: ref char has no counterpart in norm (hallucination)
+
+
+def _split_tags(text):
+    """
+    Split text into its plain characters and the `[tag]`s surrounding them.
+
+    Returns (plain, tags) where `plain` is the text without tags and `tags`
+    maps a position in `plain` to the tags placed right before that character
+    (position len(plain) holds the trailing tags).
+    A `[` without a closing `]` is treated as a plain character.
+
+    Brackets are located with `str.find`, which scans in C (memchr-style, a
+    machine word at a time) and lets runs of plain text be copied in bulk.
+    """
+    pieces = []
+    tags = {}
+    plain_len = 0
+    pos = 0
+    while True:
+        tag_start = text.find('[', pos)
+        if tag_start == -1:
+            break
+        tag_end = text.find(']', tag_start)
+        if tag_end == -1:
+            # No closing bracket left: the rest is plain text
+            break
+        if tag_start > pos:
+            pieces.append(text[pos:tag_start])
+            plain_len += tag_start - pos
+        tags.setdefault(plain_len, []).append(text[tag_start:tag_end+1])
+        pos = tag_end + 1
+    pieces.append(text[pos:])
+    return "".join(pieces), tags
+
+
+def _align_kernel(a, b, band, prev, cur, trace, ops):
+    """
+    Banded Levenshtein alignment of `a` (normalized) against `b` (refined).
+
+    Runs the standard edit-distance recurrence (unit substitution/insertion/
+    deletion costs) restricted to the diagonal band |i - j| <= band, so cells
+    far off the diagonal are never visited. `prev`/`cur` are two rolling cost
+    rows of length len(b) + 1, `trace` is a flat (len(a) + 1) x (2 * band + 1)
+    buffer of backtrace moves and `ops` receives the moves in reverse order.
+    Returns the number of moves written to `ops`.
+
+    Only plain indexing and integer arithmetic is used here, so the same code
+    runs on Python strings or, when numba is installed, JIT-compiled on uint32
+    codepoint arrays.
+    """
+    n = len(a)
+    m = len(b)
+    width = 2 * band + 1
+    inf = n + m + 1
+
+    for j in range(min(m, band) + 1):
+        prev[j] = j
+        trace[j + band] = _LEFT
+    if band < m:
+        prev[band + 1] = inf
+
+    for i in range(1, n + 1):
+        lo = max(0, i - band)
+        hi = min(m, i + band)
+        if lo > 0:
+            cur[lo - 1] = inf
+        ca = a[i - 1]
+        base = i * width + band - i
+        if lo == 0:
+            # Column 0 (only Norm chars consumed) is peeled off the inner loop
+            cur[0] = prev[0] + 1
+            trace[base] = _UP
+            lo = 1
+        for j in range(lo, hi + 1):
+            # Preference on ties: keep alignment diagonal, then restore norm chars
+            cost = prev[j - 1] + (0 if ca == b[j - 1] else 1)
+            move = _DIAG
+            up = prev[j] + 1
+            if up < cost:
+                cost = up
+                move = _UP
+            left = cur[j - 1] + 1
+            if left < cost:
+                cost = left
+                move = _LEFT
+            cur[j] = cost
+            trace[base + j] = move
+        if hi < m:
+            cur[hi + 1] = inf
+        prev, cur = cur, prev
+
+    # Backtrack once from the bottom-right corner
+    count = 0
+    i = n
+    j = m
+    while i > 0 or j > 0:
+        move = trace[i * width + band + j - i]
+        ops[count] = move
+        count += 1
+        if move == _DIAG:
+            i -= 1
+            j -= 1
+        elif move == _UP:
+            i -= 1
+        else:
+            j -= 1
+    return count
+
+
+if njit is not None:
+    _align_kernel_jit = njit(cache=True, boundscheck=False)(_align_kernel)
+else:
+    _align_kernel_jit = None
+
+
+def _common_affix_len(a, b, suffix=False):
+    """
+    Length of the common prefix (or suffix) of `a` and `b`.
+
+    Bisects on slice equality, so the comparisons run in C instead of a
+    per-char Python loop.
+    """
+    lo = 0
+    hi = min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if (a[-mid:] == b[-mid:]) if suffix else (a[:mid] == b[:mid]):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _align_ops(a, b):
+    """Return the alignment moves (from the start) of plain texts `a` and `b`"""
+    # The refiner mostly returns the text unchanged: a common prefix/suffix
+    # aligns diagonally, only the differing middle goes through the DP
+    prefix = _common_affix_len(a, b)
+    if prefix:
+        a = a[prefix:]
+        b = b[prefix:]
+    suffix = _common_affix_len(a, b, suffix=True)
+    if suffix:
+        a = a[:-suffix]
+        b = b[:-suffix]
+    if prefix or suffix:
+        return [_DIAG] * prefix + list(_align_ops(a, b)) + [_DIAG] * suffix
+
+    n = len(a)
+    m = len(b)
+    if not n or not m:
+        # Nothing to align: restore all Norm chars / skip all Ref chars
+        return [_UP] * n + [_LEFT] * m
+
+    # A band of max(n, m) already covers every cell: wider only wastes trace
+    # memory, so short texts get a dense DP and long ones stay O(n * band)
+    band = min(abs(n - m) + max(8, n // 10), max(n, m))
+    size = (n + 1) * (2 * band + 1)
+
+    if _align_kernel_jit is not None:
+        a_cp = np.frombuffer(a.encode('utf-32-le'), dtype=np.uint32)
+        b_cp = np.frombuffer(b.encode('utf-32-le'), dtype=np.uint32)
+        rows = np.empty((2, m + 1), dtype=np.int32)
+        trace = np.zeros(size, dtype=np.uint8)
+        ops = np.empty(n + m, dtype=np.uint8)
+        count = _align_kernel_jit(a_cp, b_cp, band, rows[0], rows[1], trace, ops)
+        return ops[:count][::-1].tolist()
+
+    ops = bytearray(n + m)
+    count = _align_kernel(a, b, band, [0] * (m + 1), [0] * (m + 1), bytearray(size), ops)
+    return ops[count - 1::-1] if count else ops[:0]
+
+
 def align_text(normalized_text, refined_text):
     """
     Aligns Refined Text (Source of Tags) with Normalized Text (Source of Truth).
-    
+
     Goal: Produce a text string that:
     1. Contains 100% of the characters from `normalized_text` (Content Truth).
     2. Contains inserted Tags (e.g., [uv_break]) from `refined_text` (Prosody).
     3. Respects manual tags already present in `normalized_text`.
-    
-    Strategy: 
-    Iterate through `normalized_text` char by char.
-    Match against `refined_text`.
-    - If Match: Advance both.
-    - If Refined has Tag: Insert Tag, Advance Ref.
-    - If Mismatch: Use Lookahead to decide if Refined has extra chars (Hallucination) or missing chars (Deletion).
-      - Hallucination: Skip Ref chars.
-      - Deletion: Keep Norm chars.
+
+    Strategy:
+    Split both texts into plain characters and the tags attached to them,
+    then compute an edit-distance alignment of the characters.
+    - Match / Substitution: Keep Norm char, insert Ref tags found before it.
+    - Deletion (Ref missing chars): Keep Norm char.
+    - Insertion (Ref Hallucination): Skip Ref char, keep its tags.
     """
-    result = ""
-    i_norm = 0
-    i_ref = 0
-    
-    len_norm = len(normalized_text)
-    len_ref = len(refined_text)
-    
-    while i_norm < len_norm:
-        char_norm = normalized_text[i_norm]
-        
-        # 0. Check if Norm has a Tag (Manual Tag Preservation)
-        # We must consume it from Norm to progress.
-        if char_norm == '[':
-            tag_end = normalized_text.find(']', i_norm)
-            if tag_end != -1:
-                # Found manual tag in Norm. KEEP IT unconditionally.
-                tag_content = normalized_text[i_norm:tag_end+1]
-                result += tag_content
-                i_norm = tag_end + 1
-                
-                # Check if Ref is ALSO at a tag.
-                # If Ref has the exact same tag, consume it to keep sync.
-                if i_ref < len_ref and refined_text[i_ref] == '[':
-                     ref_tag_end = refined_text.find(']', i_ref)
-                     if ref_tag_end != -1:
-                         ref_tag = refined_text[i_ref:ref_tag_end+1]
-                         if ref_tag == tag_content:
-                             # Exact match, consume Ref tag too
-                             i_ref = ref_tag_end + 1
+    norm_plain, norm_tags = _split_tags(normalized_text)
+    ref_plain, ref_tags = _split_tags(refined_text)
+
+    out = []
+    # Last emitted piece if it was a tag (None after a plain char)
+    last_tag = None
+
+    def add_norm_tags(tags):
+        nonlocal last_tag
+        if tags:
+            out.extend(tags)
+            last_tag = tags[-1]
+
+    def add_ref_tags(tags):
+        nonlocal last_tag
+        for tag_content in tags:
+            # Whitelist Check (str.startswith accepts the prefix tuple directly)
+            if not tag_content[1:-1].lower().startswith(WHITELIST_PREFIXES):
+                logger.warning("     ⚠️  Skipping non-whitelisted Tag from AI: %s", tag_content)
                 continue
 
-        # 1. Check if Ref has a Tag at current position (AI Tag Insertion)
-        # We process ALL tags at current ref position before moving on
-        # WHITELISTED_TAGS: only allow valid prosody tags, filter out [speaker_...] etc.
-        WHITELIST_PREFIXES = ('break_', 'laugh', 'oral_', 'speed_')
-        
-        while i_ref < len_ref and refined_text[i_ref] == '[':
-            tag_end = refined_text.find(']', i_ref)
-            if tag_end != -1:
-                tag_content = refined_text[i_ref:tag_end+1]
-                inner_tag = tag_content[1:-1].lower()
-                
-                # Whitelist Check
-                is_whitelisted = any(inner_tag.startswith(p) for p in WHITELIST_PREFIXES)
-                if not is_whitelisted:
-                    logger.warning(f"     ⚠️  Skipping non-whitelisted Tag from AI: {tag_content}")
-                    i_ref = tag_end + 1
-                    continue
-
-                # Duplicate Check: Prevent adding a tag if we JUST added the exact same one from Norm
-                if result.endswith(tag_content):
-                     i_ref = tag_end + 1
-                     continue
-                     
-                result += tag_content
-                i_ref = tag_end + 1
-            else:
-                break # Malformed tag
-
-        if i_ref >= len_ref:
-            # Ref exhausted, just append remaining Norm
-            result += char_norm
-            i_norm += 1
-            continue
+            # Duplicate Check: Prevent adding a tag if we JUST added the exact same one
+            if tag_content == last_tag:
+                continue
 
-        char_ref = refined_text[i_ref]
+            out.append(tag_content)
+            last_tag = tag_content
 
-        # 2. Match
-        if char_ref == char_norm:
-            result += char_ref
-            i_norm += 1
-            i_ref += 1
-            continue
-            
-        # 3. Mismatch Handling with Lookahead
-        # Goal: Find where they sync up again.
-        
-        # Lookahead in Ref (Is Ref inserting stuff?)
-        # Search for current `char_norm` in the next few chars of `refined_text`
-        found_in_ref = -1
-        window = 10
-        for k in range(1, window):
-            if i_ref + k < len_ref and refined_text[i_ref + k] == char_norm:
-                found_in_ref = k
-                break
-        
-        # Lookahead in Norm (Is Ref deleting stuff?)
-        # Search for current `char_ref` in the next few chars of `normalized_text`
-        found_in_norm = -1
-        for k in range(1, window):
-            if i_norm + k < len_norm and normalized_text[i_norm + k] == char_ref:
-                found_in_norm = k
-                break
-        
-        # DECISION LOGIC
-        if found_in_ref != -1 and (found_in_norm == -1 or found_in_ref < found_in_norm):
-            # Ref has extra chars (Insertion/Hallucination) -> Skip Ref chars until match
+    i_norm = 0
+    i_ref = 0
+    for move in _align_ops(norm_plain, ref_plain):
+        if move != _LEFT:
+            # Manual tags in Norm are kept unconditionally
+            add_norm_tags(norm_tags.get(i_norm))
+        if move != _UP:
+            add_ref_tags(ref_tags.get(i_ref, ()))
             i_ref += 1
-        elif found_in_norm != -1:
-             # Ref missing chars (Deletion) -> Keep Norm char (restore), advance i_norm
-             result += char_norm
-             i_norm += 1
-        else:
-             # Total mismatch (Mutation?) -> Trust Norm.
-             # Assume Ref char is garbage/wrong.
-             i_ref += 1
-             result += char_norm
-             i_norm += 1
+        if move != _LEFT:
+            out.append(norm_plain[i_norm])
+            last_tag = None
+            i_norm += 1
+
+    # Trailing tags after the last character
+    add_norm_tags(norm_tags.get(i_norm))
+    add_ref_tags(ref_tags.get(i_ref, ()))
 
-    return result
+    return "".join(out)
@@ -1,93 +1,114 @@
+import hashlib
+import json
+import os
 import re
+from functools import lru_cache
+from pathlib import Path
 
+# Nvidia / N.vidia -> 英伟达
+_NVIDIA_RE = re.compile(r'N\.?vidia', re.IGNORECASE)
 
-def number_to_chinese(num_str):
-    """将阿拉伯数字转换为汉字数字读法"""
-    # 数字映射
-    num_map = {
-        '0': '零', '1': '一', '2': '二', '3': '三', '4': '四',
-        '5': '五', '6': '六', '7': '七', '8': '八', '9': '九'
-    }
-    
-    # 单位映射
-    # unit_map = ['', '十', '百', '千', '万']
-    
-    def convert_number(n):
-        """转换数字为汉字（支持完整读法，如25 -> 二十五，年份逐位转换如2026 -> 二零二六）"""
-        n_int = int(float(n))
-        n_str = str(n_int)
-        
-        # 年份特殊处理：4位数且 >= 1000 的年份使用逐位转换（如2026 -> 二零二六）
-        if 1000 <= n_int < 10000 and len(n_str) == 4:
-            return ''.join([num_map.get(d, d) for d in n_str])
-        
-        # 对于较小的数字（<10000），使用完整读法
-        if n_int < 10000:
-            if n_int == 0:
-                return '零'
-            if n_int < 10:
-                return num_map[str(n_int)]
-            if n_int < 20:
-                if n_int == 10:
-                    return '十'
-                return '十' + num_map[str(n_int % 10)]
-            if n_int < 100:
-                tens = n_int // 10
-                ones = n_int % 10
-                result = num_map[str(tens)] + '十'
-                if ones > 0:
-                    result += num_map[str(ones)]
-                return result
-            if n_int < 1000:
-                hundreds = n_int // 100
-                remainder = n_int % 100
-                result = num_map[str(hundreds)] + '百'
-                if remainder > 0:
-                    if remainder < 10:
-                        result += '零' + num_map[str(remainder)]
-                    else:
-                        result += convert_number(remainder)
-                return result
-            if n_int < 10000:
-                thousands = n_int // 1000
-                remainder = n_int % 1000
-                result = num_map[str(thousands)] + '千'
-                if remainder > 0:
-                    if remainder < 100:
-                        result += '零' + convert_number(remainder)
-                    else:
-                        result += convert_number(remainder)
-                return result
-        else:
-            # 对于大数字，逐位转换
-            return ''.join([num_map.get(d, d) for d in n_str])
-    
-    def replace_number(match):
-        """替换数字为汉字"""
-        num_str = match.group(0)
-        # 如果是小数
-        if '.' in num_str:
-            parts = num_str.split('.')
-            int_part = convert_number(parts[0])
-            dec_part = ''.join([num_map.get(d, d) for d in parts[1]])
-            return int_part + '点' + dec_part
-        else:
-            return convert_number(num_str)
+# 数字（可带小数和万/千/百/十单位）；ChatTTS 控制标签（如 [break_6]）整体匹配以便原样跳过，
+# 其他方括号内容（如 [1]、[2024年报告](url)）里的数字照常转换
+_NUM_RE = re.compile(r'\[[a-z_]+\d*\]|(\d+(?:\.\d+)?)([万千百十])?')
+
+# 段落分隔：两个及以上换行（中间可夹空白，\s 也覆盖 \r\n 换行）
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n\s*\n+')
+
+# Markdown 元数据行，一次 re.sub 整体删除（每个分支都连同行尾换行符一起匹配）：
+# - 以 # 开头的标题行
+# - 包含 TTS Setting Suggestion 的行，以及其后紧跟的空行、列表项和标题行
+# - 以 * ** 开头、含 Role/Speed/Note 的列表项（TTS设置建议）
+_META_LINE_RE = re.compile(
+    r'^[^\S\n]*#.*\n'
+    r'|^.*(?:TTS Setting Suggestion|TTSSettingSuggestion).*\n(?:[^\S\n]*(?:[*#].*)?\n)*'
+    r'|^[^\S\n]*\* \*\*(?=.*(?:Role|Speed|Note)).*\n',
+    re.MULTILINE
+)
+
+# 超长段落的切割标点，按优先级排列；每个标点用一次 str.rfind（C 实现）查找，
+# 比用一个正则 finditer 遍历所有标点再挑选快得多
+_CUT_MARKS = ('。', '！', '？', '……', '；', '，')
+
+# 段落数达到该值时才用多进程清洗（进程启动开销远大于小文件的清洗耗时）
+_PARALLEL_CLEAN_MIN_PARAGRAPHS = 5000
+
+# 数字映射
+_NUM_MAP = {
+    '0': '零', '1': '一', '2': '二', '3': '三', '4': '四',
+    '5': '五', '6': '六', '7': '七', '8': '八', '9': '九'
+}
+
+# 逐位读数字（年份、大数字、小数部分）用的转换表
+_DIGIT_TRANS = str.maketrans(_NUM_MAP)
+
+
+def _cn_reading(n):
+    """0-9999 的完整汉字读法（如25 -> 二十五），只在模块加载时用来建表"""
+    if n < 10:
+        return _NUM_MAP[str(n)]
+    if n < 20:
+        return '十' + (_NUM_MAP[str(n % 10)] if n % 10 else '')
+    if n < 100:
+        return _NUM_MAP[str(n // 10)] + '十' + (_NUM_MAP[str(n % 10)] if n % 10 else '')
+    if n < 1000:
+        head, unit, remainder, gap = n // 100, '百', n % 100, 10
+    else:
+        head, unit, remainder, gap = n // 1000, '千', n % 1000, 100
+    result = _NUM_MAP[str(head)] + unit
+    if remainder:
+        # 中间缺位要读"零"（如105 -> 一百零五，1050 -> 一千零五十）
+        if remainder < gap:
+            result += '零'
+        result += _cn_reading(remainder)
+    return result
+
+
+# 所有小于10000的数字读法预先算好，转换时只需一次下标访问
+_CN_SMALL = tuple(_cn_reading(n) for n in range(10000))
+
+# 文稿中最常见的是 0-999 的小数字（日期、数量）和年份，直接按数字字符串查读法，连 int() 都省掉
+_CN_FAST = {str(n): _CN_SMALL[n] for n in range(1000)}
+# 年份（1000-9999）逐位读，同样预先算好（如2026 -> 二零二六）
+_CN_FAST.update((str(y), str(y).translate(_DIGIT_TRANS)) for y in range(1000, 10000))
+
+
+def _convert_number(n):
+    """转换数字为汉字（支持完整读法，如25 -> 二十五，年份逐位转换如2026 -> 二零二六）"""
+    reading = _CN_FAST.get(n)
+    if reading is not None:
+        return reading
     
-    # 先处理带单位的数字（如"25万"、"100万"）
-    # 匹配模式：数字 + 单位（万、千、百等）
-    def replace_with_unit(match):
-        num_part = match.group(1)
-        unit = match.group(2)
-        converted_num = convert_number(num_part)
-        return converted_num + unit
+    # n 是纯数字串（小数部分已在 _replace_number 中拆出），不经过 float：
+    # int(float(n)) 对超过 2^53 的长数字会丢精度
+    n_str = n.lstrip('0') or '0'
     
-    # 先替换带单位的数字
-    result = re.sub(r'(\d+\.?\d*)([万千百十])', replace_with_unit, num_str)
-    # 再替换剩余的数字
-    result = re.sub(r'\d+\.?\d*', replace_number, result)
+    # 年份特殊处理：4位数且 >= 1000 的年份使用逐位转换（如2026 -> 二零二六）
+    # 对于大数字，同样逐位转换
+    if len(n_str) >= 4:
+        return n_str.translate(_DIGIT_TRANS)
     
-    return result
+    # 对于较小的数字，使用完整读法（查表）
+    return _CN_SMALL[int(n_str)]
+
+def _replace_number(match):
+    """替换数字为汉字（小数读作"点"，带单位的数字保留单位，如"2.5万" -> 二点五万）"""
+    num_part, unit = match.group(1), match.group(2)
+    if num_part is None:
+        # [break_6] 等标签原样保留，标签里的数字不能转成汉字
+        return match.group(0)
+    if '.' in num_part:
+        int_part, dec_part = num_part.split('.')
+        converted = _convert_number(int_part) + '点' + dec_part.translate(_DIGIT_TRANS)
+    else:
+        converted = _convert_number(num_part)
+    return converted + unit if unit else converted
+
+
+def number_to_chinese(num_str):
+    """将阿拉伯数字转换为汉字数字读法"""
+    # 带单位的数字（如"25万"、"100万"）和其余数字用同一个正则一次扫描完成
+    return _NUM_RE.sub(_replace_number, num_str)
 
 
 def clean_text(text):
@@ -97,12 +118,13 @@ def clean_text(text):
     3. 每句一行
     4. 去掉所有空格
     """
-    # 1. 替换非标准标签
-    text = text.replace('[uv_break]', '[break_6]').replace('[laugh]', '[laugh_0]')
+    # 1. 替换非标准标签（大多数段落没有标签，一次 '[' 检查即可跳过两次替换）
+    if '[' in text:
+        text = text.replace('[uv_break]', '[break_6]').replace('[laugh]', '[laugh_0]')
     
     # [Normalization] Standardize entity names to Chinese for better pronunciation
     # Nvidia / N.vidia -> 英伟达
-    text = re.sub(r'N\.?vidia', '英伟达', text, flags=re.IGNORECASE)
+    text = _NVIDIA_RE.sub('英伟达', text)
     
     # 2. 阿拉伯数字转汉字
     text = number_to_chinese(text)
@@ -110,27 +132,41 @@ def clean_text(text):
     # 3. 逗号改句号
     text = text.replace('，', '。').replace(',', '。')
     
-    # 4. 按句号分割，每句一行
-    sentences = text.split('。')
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    # 5. 保留句子中的空格（用户可能有意添加，如英文缩写）
-    # cleaned_sentences = [s.replace(' ', '') for s in sentences]  # 已禁用
-    cleaned_sentences = sentences
-    
-    # 重新组合，每句一行，最后加句号
-    result = '\n'.join([s + '。' for s in cleaned_sentences if s])
-    
-    return result
+    # 4. 按句号分割，每句一行，最后加句号
+    # 去首尾空白、丢空句、拼接在同一个生成器里完成，不再构造中间列表
+    # 保留句子中的空格（用户可能有意添加，如英文缩写）
+    return '\n'.join(s + '。' for s in map(str.strip, text.split('。')) if s)
 
 
 def split_by_paragraph(text):
     """按段落拆分文本"""
-    # 按双换行符或更多换行符分割段落
-    paragraphs = re.split(r'\n\s*\n+', text.strip())
-    # 过滤空段落
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
-    return paragraphs
+    # 按双换行符或更多换行符分割段落，过滤空段落（每段只 strip 一次）
+    return [p for p in map(str.strip, _PARAGRAPH_SPLIT_RE.split(text.strip())) if p]
+
+
+def _find_cut(text, start, limit):
+    """在 text[start:start+limit] 中寻找最佳切割点（句号、问号、叹号等），找不到时硬切"""
+    end = start + limit
+    # 优先在后半部分找句末标点
+    for mark in _CUT_MARKS:
+        pos = text.rfind(mark, start, end)
+        if pos - start > limit * 0.5: # 至少保留一半
+            # 切在整个标点之后（"……" 不能从中间切开）
+            return pos + len(mark)
+    # 没找到标点，硬切（至少切出一个字符）
+    return start + max(limit, 1)
+
+
+def _split_long_text(text, limit):
+    """把超长文本循环切成不超过 limit 的片段（迭代实现，段落再长也不会递归过深）"""
+    pieces = []
+    start = 0
+    while len(text) - start > limit:
+        cut = _find_cut(text, start, limit)
+        pieces.append(text[start:cut])
+        start = cut
+    pieces.append(text[start:])
+    return pieces
 
 
 def merge_paragraphs(paragraphs, min_chars=50, max_chars=200):
@@ -145,81 +181,61 @@ def merge_paragraphs(paragraphs, min_chars=50, max_chars=200):
     if not paragraphs:
         return []
     
-    # 辅助函数：拆分超长文本
-    def split_recursive(text, limit):
-        if len(text) <= limit:
-            return [text]
-        
-        # 寻找最佳切割点（句号、问号、叹号等）
-        split_point = -1
-        # 优先在后半部分找句末标点
-        for char in ['。', '！', '？', '……', '；', '，']:
-            pos = text.rfind(char, 0, limit)
-            if pos > limit * 0.5: # 至少保留一半
-                split_point = pos + 1
-                break
-        
-        if split_point == -1:
-            # 没找到标点，硬切
-            split_point = limit
-            
-        return [text[:split_point]] + split_recursive(text[split_point:], limit)
-
+    # 清理多余空行，保持紧凑；段落长度一次算好，合并时只做整数运算
+    paragraphs = [p for p in map(str.strip, paragraphs) if p]
+    lengths = [len(p) for p in paragraphs]
+    
     merged = []
-    current_buffer = ""
+    # 当前缓冲区按片段收集，只在输出时 join 一次，避免反复拼接字符串
+    current_chunks = []
+    current_len = 0
     
-    for para in paragraphs:
-        # 清理多余空行，保持紧凑
-        para = para.strip()
-        if not para:
-            continue
-            
+    for para, para_len in zip(paragraphs, lengths):
         # 预测合并后的长度
         # 加上换行符作为连接
-        if current_buffer:
-            predicted_len = len(current_buffer) + 1 + len(para)
+        if current_len:
+            predicted_len = current_len + 1 + para_len
         else:
-            predicted_len = len(para)
+            predicted_len = para_len
             
         # 决策逻辑：
         # 1. 如果加上当前段落不超过 max_chars，直接合并
         if predicted_len <= max_chars:
-            if current_buffer:
-                current_buffer += "\n" + para
-            else:
-                current_buffer = para
+            current_chunks.append(para)
+            current_len = predicted_len
         else:
             # 2. 如果加上会超过，说明当前 buffer 此刻是满的（或者虽然不满但加不进去了）
             #    先把 current_buffer 处理掉
-            if current_buffer:
+            if current_len:
+                current_buffer = "\n".join(current_chunks)
                 # 检查 buffer 是否过长（虽然逻辑上控制了，但防万一）
-                if len(current_buffer) > max_chars:
-                    merged.extend(split_recursive(current_buffer, max_chars))
+                if current_len > max_chars:
+                    merged.extend(_split_long_text(current_buffer, max_chars))
                 else:
                     merged.append(current_buffer)
-                
-                # 重置 buffer
-                current_buffer = ""
             
             # 3. 处理当前的这个 para（因为它没挤进去）
             #    如果 para 本身就很长，直接切分
-            if len(para) > max_chars:
-                splits = split_recursive(para, max_chars)
+            if para_len > max_chars:
+                splits = _split_long_text(para, max_chars)
                 # 最后一个片段可能很短，留给 buffer
                 merged.extend(splits[:-1])
-                current_buffer = splits[-1]
+                current_chunks = [splits[-1]]
+                current_len = len(splits[-1])
             else:
-                current_buffer = para
+                current_chunks = [para]
+                current_len = para_len
                 
     # 处理最后的缓冲区
-    if current_buffer:
-         if len(current_buffer) > max_chars:
-             merged.extend(split_recursive(current_buffer, max_chars))
+    if current_len:
+         current_buffer = "\n".join(current_chunks)
+         if current_len > max_chars:
+             merged.extend(_split_long_text(current_buffer, max_chars))
          else:
              # 尝试合并到上一个（如果太短）
-             if len(current_buffer) < min_chars and merged:
+             if current_len < min_chars and merged:
                  last = merged[-1]
-                 if len(last) + 1 + len(current_buffer) <= max_chars:
+                 if len(last) + 1 + current_len <= max_chars:
                      merged[-1] = last + "\n" + current_buffer
                  else:
                      merged.append(current_buffer)
@@ -237,48 +253,28 @@ def filter_markdown_metadata(content):
     - 包含 **[TTS Setting Suggestion]** 的段落
     - 以 * ** 开头的列表项（TTS设置建议）
     """
-    lines = content.split('\n')
-    filtered_lines = []
-    skip_next = False
-    
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # 跳过以 # 开头的标题行
-        if stripped.startswith('#'):
-            continue
-        
-        # 跳过包含 TTS Setting Suggestion 的行
-        if 'TTS Setting Suggestion' in stripped or 'TTSSettingSuggestion' in stripped:
-            skip_next = True
-            continue
-        
-        # 跳过 TTS 设置建议的列表项（以 * ** 开头）
-        if stripped.startswith('* **') and ('Role' in stripped or 'Speed' in stripped or 'Note' in stripped):
-            continue
-        
-        # 如果上一行是TTS设置建议标题，跳过后续的空行和列表项
-        if skip_next:
-            if not stripped or stripped.startswith('*'):
-                continue
-            else:
-                skip_next = False
-        
-        filtered_lines.append(line)
-    
-    return '\n'.join(filtered_lines)
+    # 补一个换行符让每一行都以 \n 结尾，保留下来的行拼接后去掉最后的 \n
+    return _META_LINE_RE.sub('', content + '\n')[:-1]
 
 
-def process_markdown_file(file_path, min_chars=50, max_chars=200):
-    """处理markdown文件：读取、清洗、按段落拆分、智能合并
-    
-    参数：
-        file_path: 文件路径
-        min_chars: 最小字数（默认50），低于此值会合并多个段落
-        max_chars: 最大字数（默认200），超过此值会拆分段落
-    返回：
-        处理后的段落列表
+def _clean_paragraphs(paragraphs):
     """
+    对每个段落执行 clean_text。
+    每段清洗约 20 微秒，而启动 spawn 进程池约需 100 毫秒，所以只有超大文件才分给多个进程。
+    """
+    workers = os.cpu_count() or 1
+    if len(paragraphs) < _PARALLEL_CLEAN_MIN_PARAGRAPHS or workers < 2:
+        return [clean_text(p) for p in paragraphs]
+    
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    ctx = multiprocessing.get_context('spawn')  # 与 generate_podcast 一致，避免 fork 已加载 PyTorch 的进程
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+        return list(executor.map(clean_text, paragraphs, chunksize=256))
+
+
+def _process_markdown(file_path, min_chars, max_chars):
+    """读取、清洗、按段落拆分、智能合并（不走缓存）"""
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
@@ -288,13 +284,87 @@ def process_markdown_file(file_path, min_chars=50, max_chars=200):
     # 再按段落拆分
     paragraphs = split_by_paragraph(content)
     
-    # 清洗每个段落
-    cleaned_paragraphs = [clean_text(p) for p in paragraphs]
+    # 清洗每个段落（段落互相独立；超大文件分给多个进程）
+    cleaned_paragraphs = _clean_paragraphs(paragraphs)
     
     # 智能合并段落
-    merged_paragraphs = merge_paragraphs(cleaned_paragraphs, min_chars, max_chars)
+    return merge_paragraphs(cleaned_paragraphs, min_chars, max_chars)
+
+
+# 进程内 lru 与磁盘缓存共用的条目上限
+_PROCESSED_CACHE_MAX = 256
+
+
+def _prune_processed_cache(cache_dir):
+    """磁盘缓存超过 _PROCESSED_CACHE_MAX 个条目时，删除最久未写入的（已删除脚本留下的条目）"""
+    try:
+        entries = sorted(Path(cache_dir).glob("*.json"), key=lambda p: p.stat().st_mtime)
+    except OSError:
+        return
+    for stale in entries[:-_PROCESSED_CACHE_MAX]:
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=_PROCESSED_CACHE_MAX)
+def _process_markdown_cached(key_src, file_path, min_chars, max_chars, cache_dir):
+    """
+    进程内缓存；cache_dir 不为 None 时再加一层磁盘缓存（JSON 中保存完整 key，防止哈希碰撞）。
+    磁盘文件名只由脚本路径与 min/max 决定：脚本或本模块改动后覆盖同一个文件，不会留下孤儿条目。
+    """
+    if cache_dir is None:
+        return tuple(_process_markdown(file_path, min_chars, max_chars))
+
+    name_src = f"{os.path.abspath(file_path)}\0{min_chars}\0{max_chars}"
+    key = hashlib.blake2b(name_src.encode("utf-8"), digest_size=12).hexdigest()
+    cache_file = Path(cache_dir) / f"{key}.json"
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry["key"] == key_src:
+            return tuple(entry["paragraphs"])
+    except (OSError, ValueError, KeyError):
+        pass
     
-    return merged_paragraphs
+    paragraphs = _process_markdown(file_path, min_chars, max_chars)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"key": key_src, "paragraphs": paragraphs}, f, ensure_ascii=False)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        pass
+    else:
+        _prune_processed_cache(cache_dir)
+    return tuple(paragraphs)
+
+
+def process_markdown_file(file_path, min_chars=50, max_chars=200, cache_dir=None):
+    """处理markdown文件：读取、清洗、按段落拆分、智能合并
+    
+    结果缓存在进程内；传入 cache_dir 时也写入磁盘，文件未改动时只需一次 stat。
+    缓存键包含文件的绝对路径、mtime、大小、min/max 设置以及本模块的 mtime，
+    修改脚本或文本处理规则都会重新处理。
+    
+    参数：
+        file_path: 文件路径
+        min_chars: 最小字数（默认50），低于此值会合并多个段落
+        max_chars: 最大字数（默认200），超过此值会拆分段落
+        cache_dir: 磁盘缓存目录（默认 None 不写磁盘；cli 传入项目根目录下的 .cache/processed）
+    返回：
+        处理后的段落列表
+    """
+    st = os.stat(file_path)
+    key_src = "\0".join(str(v) for v in (
+        os.path.abspath(file_path), st.st_mtime_ns, st.st_size,
+        min_chars, max_chars, os.stat(__file__).st_mtime_ns
+    ))
+    if cache_dir is not None:
+        cache_dir = str(cache_dir)
+    return list(_process_markdown_cached(key_src, str(file_path), min_chars, max_chars, cache_dir))
 
 
 if __name__ == "__main__":
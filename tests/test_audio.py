@@ -1,7 +1,14 @@
-import pytest
+import importlib
 import sys
 from unittest.mock import MagicMock, patch
 
+# Real modules, captured before the fixture swaps in mocks
+import numpy as real_numpy
+import pytest
+from pydub import AudioSegment as RealAudioSegment
+from pydub.silence import detect_leading_silence
+
+
 @pytest.fixture(autouse=True)
 def mock_dependencies():
     """Mock dependencies globally for this module"""
@@ -17,6 +24,10 @@ def mock_dependencies():
         "torch": MagicMock(),
         "numpy": MagicMock(),
     }):
+        # Import fresh under the mocks so @patch targets and the in-test import
+        # resolve to the same module object
+        sys.modules.pop("genpod.generate_podcast", None)
+        importlib.import_module("genpod.generate_podcast")
         yield
 
 # We cannot import generate_audio at top level because ChatTTS is not mocked yet.
@@ -28,9 +39,9 @@ def mock_dependencies():
 # No, we test 'genpod.generate_podcast.generate_audio' via import inside test?
 
 @patch("genpod.generate_podcast.get_chat_instance")
-@patch("genpod.generate_podcast.torchaudio.save")
+@patch("soundfile.write")
 @patch("os.replace")
-@patch("genpod.generate_podcast.AudioSegment")
+@patch("pydub.AudioSegment")
 def test_atomic_write(mock_audio_segment, mock_replace, mock_save, mock_get_chat):
     """Test that generate_audio writes to a .tmp file and renames it"""
     
@@ -48,14 +59,15 @@ def test_atomic_write(mock_audio_segment, mock_replace, mock_save, mock_get_chat
         [mock_wav]       # Call 2
     ]
     mock_chat.sample_random_speaker.return_value = "emb"
+    mock_chat.normalizer.return_value = "test text"
     
     output_file = "test.wav"
     expected_temp = "test.wav.tmp"
     
     # Run
     # delayed import
-    import torch # This is the mock
-    import numpy as np # This is the mock
+    import numpy as np  # This is the mock
+    import torch  # This is the mock
     
     # Configure Mock Tensor
     mock_tensor = MagicMock()
@@ -65,7 +77,8 @@ def test_atomic_write(mock_audio_segment, mock_replace, mock_save, mock_get_chat
     from genpod.generate_podcast import generate_audio
     generate_audio("test text", "2222", output_file)
     
-    # Verify save called with tmp file
+    # Verify the in-memory audio is written once, to the tmp file
+    mock_save.assert_called_once()
     args, _ = mock_save.call_args
     assert args[0] == expected_temp # Save path should be .tmp
     
@@ -73,9 +86,10 @@ def test_atomic_write(mock_audio_segment, mock_replace, mock_save, mock_get_chat
     mock_replace.assert_called_with(expected_temp, output_file)
 
 @patch("genpod.generate_podcast.get_chat_instance")
-@patch("genpod.generate_podcast.torchaudio.save")
+@patch("soundfile.write")
 @patch("os.replace")
-def test_atomic_write_failure(mock_replace, mock_save, mock_get_chat):
+@patch("pydub.AudioSegment")
+def test_atomic_write_failure(mock_audio_segment, mock_replace, mock_save, mock_get_chat):
     """Test that atomic write cleans up on failure"""
     mock_chat = MagicMock()
     mock_get_chat.return_value = mock_chat
@@ -86,6 +100,7 @@ def test_atomic_write_failure(mock_replace, mock_save, mock_get_chat):
         ["refined text"], 
         [mock_wav]
     ]
+    mock_chat.normalizer.return_value = "test"
     
     # Simulate save failure
     mock_save.side_effect = Exception("Save failed")
@@ -99,3 +114,193 @@ def test_atomic_write_failure(mock_replace, mock_save, mock_get_chat):
     
     # Check if logic attempts to remove tmp (hard to test exact os.remove without mocking exist check, 
     # but observing code flow confirms it attempts cleanup)
+
+@patch("genpod.generate_podcast.get_chat_instance")
+@patch("soundfile.write")
+@patch("os.replace")
+@patch("pydub.AudioSegment")
+def test_generate_audio_batch(mock_audio_segment, mock_replace, mock_save, mock_get_chat):
+    """Test that a batch runs one refine and one infer pass for all segments"""
+    mock_chat = MagicMock()
+    mock_get_chat.return_value = mock_chat
+    mock_chat.normalizer.side_effect = lambda text, **kwargs: text
+    mock_chat.infer.side_effect = [
+        ["短句", "长一点的句子"],
+        [MagicMock(), MagicMock()]
+    ]
+
+    import torch  # This is the mock
+    mock_tensor = MagicMock()
+    mock_tensor.shape = (1, 24000)
+    torch.from_numpy.return_value = mock_tensor
+
+    from genpod.generate_podcast import generate_audio_batch
+    generate_audio_batch([("长一点的句子", "long.wav"), ("短句", "short.wav"), ("  ", "empty.wav")], "2222")
+
+    # Shortest segment first, empty segment skipped
+    assert mock_chat.infer.call_count == 2
+    refine_args, _ = mock_chat.infer.call_args_list[0]
+    assert refine_args[0] == ["短句", "长一点的句子"]
+
+    assert [c.args[0] for c in mock_save.call_args_list] == ["short.wav.tmp", "long.wav.tmp"]
+    mock_replace.assert_any_call("short.wav.tmp", "short.wav")
+    mock_replace.assert_any_call("long.wav.tmp", "long.wav")
+
+def test_plan_batches_packs_under_budget():
+    """Short segments share a batch, long ones are split by the char budget"""
+    from genpod.generate_podcast import _plan_batches
+    lengths = [200, 20, 200, 30, 200, 10]
+    assert _plan_batches(lengths, 8, 400) == [[5, 1, 3], [0, 2], [4]]
+    assert _plan_batches(lengths, 2, 10000) == [[5, 1], [3, 0], [2, 4]]
+    assert _plan_batches([], 8, 800) == []
+
+@patch("genpod.generate_podcast.get_chat_instance")
+def test_normalize_cached_persists(mock_get_chat, tmp_path):
+    """Normalizer results are memoized and reused from disk by later runs"""
+    mock_chat = MagicMock()
+    mock_get_chat.return_value = mock_chat
+    mock_chat.normalizer.return_value = "一百"
+
+    import genpod.generate_podcast as gp
+    with patch.object(gp, "_norm_cache_dir", return_value=tmp_path):
+        assert gp._normalize_cached("100") == "一百"
+        assert gp._normalize_cached("100") == "一百"
+        # Simulate a new process: memory cache gone, disk cache remains
+        gp._normalize_cached.cache_clear()
+        assert gp._normalize_cached("100") == "一百"
+
+    assert mock_chat.normalizer.call_count == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+@patch("genpod.generate_podcast.get_chat_instance")
+def test_speaker_embedding_cached_per_seed(mock_get_chat):
+    """The speaker embedding is sampled once per seed"""
+    mock_chat = MagicMock()
+    mock_get_chat.return_value = mock_chat
+    mock_chat.sample_random_speaker.side_effect = ["emb_a", "emb_b"]
+
+    import genpod.generate_podcast as gp
+    with patch.object(gp, "_chattts_version", return_value=None):
+        assert gp._speaker_embedding(2222) == "emb_a"
+        assert gp._speaker_embedding(2222) == "emb_a"
+        assert gp._speaker_embedding(3333) == "emb_b"
+    assert mock_chat.sample_random_speaker.call_count == 2
+
+def test_leading_silence_matches_pydub():
+    """The vectorized silence scan agrees with pydub's chunk-by-chunk detect_leading_silence"""
+    t = real_numpy.arange(12000)
+    samples = real_numpy.concatenate([
+        (t[:2410] % 40) - 20,             # ~100ms of near-silence
+        8000 * real_numpy.sin(t * 0.05),  # speech
+        real_numpy.zeros(3605),            # ~150ms of silence
+    ]).astype(real_numpy.int16)
+    sound = RealAudioSegment(samples.tobytes(), frame_rate=24000, sample_width=2, channels=1)
+
+    import genpod.generate_podcast as gp
+    with patch.dict(sys.modules, {"numpy": real_numpy}):
+        lead = gp._leading_silence_ms(samples, 24000, sound.max_possible_amplitude)
+        trail = gp._leading_silence_ms(samples[::-1], 24000, sound.max_possible_amplitude)
+        assert gp._leading_silence_ms(samples[:0], 24000, 32768) == 0
+        assert gp._leading_silence_ms(real_numpy.zeros(2400, dtype=real_numpy.int16), 24000, 32768) == 100
+    assert lead == detect_leading_silence(sound, -50.0)
+    assert trail == detect_leading_silence(sound.reverse(), -50.0)
+
+def test_refine_cached_only_runs_missing(tmp_path):
+    """Refined text is reused from disk; only uncached segments reach chat.infer"""
+    mock_chat = MagicMock()
+    mock_chat.infer.side_effect = [["润色一"], ["润色二"]]
+
+    import genpod.generate_podcast as gp
+    with patch.object(gp, "_refine_cache_dir", return_value=tmp_path):
+        assert gp._refine_cached(mock_chat, ["一"], 2222, split_text=False) == ["润色一"]
+        assert gp._refine_cached(mock_chat, ["一", "二"], 2222, split_text=False) == ["润色一", "润色二"]
+
+    assert mock_chat.infer.call_count == 2
+    assert mock_chat.infer.call_args_list[1].args[0] == ["二"]
+
+def test_autocast_only_wraps_refine():
+    """bf16 autocast is entered for the refine GPT pass, never around decoding"""
+    import torch  # This is the mock
+
+    import genpod.generate_podcast as gp
+    with patch.object(gp, "_refine_precision", return_value="cuda-bf16"):
+        with gp._inference_context():
+            pass
+        torch.autocast.assert_not_called()
+        with gp._inference_context(autocast=True):
+            pass
+    torch.autocast.assert_called_once()
+
+def test_parallel_fallback_frees_parent_model():
+    """If the shared model cannot reach the workers, the parent copy is released"""
+    import torch  # This is the mock
+
+    import genpod.generate_podcast as gp
+    ctx = torch.multiprocessing.get_context.return_value
+    fallback_pool = MagicMock()
+    fallback_pool.imap_unordered.return_value = iter(["a.wav"])
+    ctx.Pool.side_effect = [TypeError("cannot pickle"), fallback_pool]
+
+    def load_shared():
+        gp._chat_instance = MagicMock()
+        return gp._chat_instance
+
+    with patch.object(gp, "_chat_picklable", return_value=True), \
+         patch.object(gp, "share_chat_instance", side_effect=load_shared):
+        assert list(gp.generate_segments_parallel([("t",)], 2)) == ["a.wav"]
+
+    assert gp._chat_instance is None
+    assert ctx.Pool.call_args_list[1].kwargs == {
+        "processes": 2, "initializer": gp.initialize_worker, "initargs": (None, None)
+    }
+
+def test_parallel_skips_parent_load_when_unpicklable():
+    """An unpicklable Chat is detected before the parent loads a model"""
+    import torch  # This is the mock
+
+    import genpod.generate_podcast as gp
+    ctx = torch.multiprocessing.get_context.return_value
+    ctx.Pool.return_value.imap_unordered.return_value = iter([])
+    with patch.object(gp, "_chat_picklable", return_value=False), \
+         patch.object(gp, "share_chat_instance") as mock_share:
+        assert list(gp.generate_segments_parallel([("t",)], 2)) == []
+    mock_share.assert_not_called()
+
+def test_text_caches_follow_cache_root(tmp_path):
+    """set_cache_root moves the norm/refine caches to the project root, whatever the cwd"""
+    import genpod.generate_podcast as gp
+    gp.set_cache_root(tmp_path)
+    with patch.object(gp, "_chattts_version", return_value="0.2.1"), \
+         patch.object(gp, "_refine_precision", return_value="cpu-fp32"):
+        assert gp._norm_cache_dir() == tmp_path / ".cache" / "norm" / "0.2.1"
+        assert gp._refine_cache_dir() == tmp_path / ".cache" / "refine" / "0.2.1" / "cpu-fp32"
+
+def test_apply_pronunciations_prefers_longest_key():
+    """Keys are replaced in one pass; overlapping keys take the longer match"""
+    from genpod.generate_podcast import apply_pronunciations
+    dictionary = {"AI": "A I", "OpenAI": "Open A I", "LLM": "L L M"}
+    assert apply_pronunciations("OpenAI 的 LLM 和 AI", dictionary) == "Open A I 的 L L M 和 A I"
+    assert apply_pronunciations("无需替换", dictionary) == "无需替换"
+    assert apply_pronunciations("AI", {}) == "AI"
+
+
+def test_apply_pronunciations_ascii_word_edges():
+    """ASCII keys do not match inside longer words, but do match next to CJK text"""
+    from genpod.generate_podcast import apply_pronunciations
+    dictionary = {"App": "A P P", "AI": "A I", "英伟达": "Nvidia"}
+    assert apply_pronunciations("Apple 的 App", dictionary) == "Apple 的 A P P"
+    assert apply_pronunciations("用AI做App。", dictionary) == "用A I做A P P。"
+    assert apply_pronunciations("英伟达显卡", dictionary) == "Nvidia显卡"
+    assert apply_pronunciations("MAIL", dictionary) == "MAIL"
+
+def test_prepare_text_user_overrides_defaults():
+    """User pronunciations override the defaults; the merged table is built once"""
+    import logging
+
+    import genpod.generate_podcast as gp
+    gp._combined_pronunciation_items.cache_clear()
+    log = logging.getLogger("test")
+    assert gp._prepare_text("OpenAI 和 AI", {"AI": "人工智能"}, log) == "Open A I 和 人工智能"
+    assert gp._prepare_text("AI", {"AI": "人工智能"}, log) == "人工智能"
+    assert gp._prepare_text("AI", None, log) == "A I"
+    assert gp._combined_pronunciation_items.cache_info().misses == 2
@@ -1,11 +1,19 @@
+import sys
 from pathlib import Path
 from unittest.mock import patch
-import sys
 
 # Ensure src is in path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from genpod.cli import merge_segments
+from genpod.cli import (
+    compute_hash,
+    merge_segments,
+    migrate_legacy_segment,
+    prune_wav_cache,
+    segment_cache_path,
+    wav_cache_path,
+)
+
 
 def test_merge_segments_missing_gap(tmp_path):
     """Test that merge_segments fails if segments have gap"""
@@ -49,3 +57,388 @@ def test_merge_segments_success(tmp_path):
     assert "S1" in content
     assert "S2" in content
     assert "S3" in content
+
+
+def test_segment_cache_path_is_content_addressed(tmp_path):
+    """Same text/seed/pronunciations share a cache entry, any change gets a new one"""
+    a = segment_cache_path(tmp_path, "你好", "2222", {"AI": "A I"})
+    assert a == segment_cache_path(tmp_path, "你好", "2222", {"AI": "A I"})
+    assert a.parent == tmp_path and a.suffix == ".wav"
+    assert a != segment_cache_path(tmp_path, "你好", "3333", {"AI": "A I"})
+    assert a != segment_cache_path(tmp_path, "你好", "2222", {})
+
+
+def test_wav_cache_path_separates_version_and_mode(tmp_path):
+    """Batched and single renderings, and different ChatTTS or genpod versions, never share entries"""
+    batch = wav_cache_path(tmp_path, "0.2.1", "0.1.0-ab", True)
+    assert batch == tmp_path / ".cache" / "wav" / "0.2.1" / "0.1.0-ab" / "batch"
+    assert batch != wav_cache_path(tmp_path, "0.2.1", "0.1.0-ab", False)
+    assert batch != wav_cache_path(tmp_path, "0.2.2", "0.1.0-ab", True)
+    assert batch != wav_cache_path(tmp_path, "0.2.1", "0.1.1-ab", True)
+    assert wav_cache_path(tmp_path, None, "0.1.0-ab", True) is None
+
+
+def test_prune_wav_cache_by_age_and_on_request(tmp_path):
+    """Entries unused for max_age_days go on every build; other versions only with other_versions"""
+    import os
+    import time
+    cache_dir = wav_cache_path(tmp_path, "0.2.1", "0.1.0-ab", True)
+    cache_dir.mkdir(parents=True)
+    fresh = cache_dir / "fresh.wav"
+    stale = cache_dir / "stale.wav"
+    fresh.write_bytes(b"x")
+    stale.write_bytes(b"x")
+    old = time.time() - 40 * 86400
+    os.utime(stale, (old, old))
+    other_chattts = wav_cache_path(tmp_path, "0.1.0", "0.1.0-ab", True)
+    other_genpod = wav_cache_path(tmp_path, "0.2.1", "0.0.9-cd", False)
+    for directory in (other_chattts, other_genpod):
+        directory.mkdir(parents=True)
+        (directory / "a.wav").write_bytes(b"x")
+    stale_other = other_genpod / "stale.wav"
+    stale_other.write_bytes(b"x")
+    os.utime(stale_other, (old, old))
+    legacy = tmp_path / ".cache" / "wav" / "legacy.wav"
+    legacy.write_bytes(b"x")
+
+    prune_wav_cache(cache_dir, 30)
+
+    assert fresh.exists()
+    assert not stale.exists()
+    assert not stale_other.exists()
+    assert (other_chattts / "a.wav").exists()
+    assert (other_genpod / "a.wav").exists()
+    assert legacy.exists()
+
+    prune_wav_cache(cache_dir, 30, other_versions=True)
+
+    assert fresh.exists()
+    assert not other_chattts.parent.parent.exists()
+    assert not other_genpod.parent.exists()
+    assert not legacy.exists()
+
+
+def test_compute_hash_is_short_and_seed_dependent():
+    """Segment tags are 12 hex chars and change with the seed"""
+    tag = compute_hash("你好世界", 2222)
+    assert len(tag) == 12
+    assert tag == compute_hash("你好世界", "2222")
+    assert tag != compute_hash("你好世界", 3333)
+
+
+def test_compute_hashes_matches_compute_hash():
+    """The one-pass script hasher yields the same tags as compute_hash"""
+    from genpod.cli import compute_hashes
+    texts = ["你好世界", "第二段", ""]
+    assert compute_hashes(texts, 2222) == [compute_hash(t, "2222") for t in texts]
+
+
+def test_migrate_legacy_segment(tmp_path):
+    """A segment named with the old SHA-256 tag is renamed instead of regenerated"""
+    import hashlib
+    legacy_tag = hashlib.sha256("你好2222".encode()).hexdigest()[:12]
+    (tmp_path / f"segment_001_{legacy_tag}.wav").write_bytes(b"RIFF")
+
+    migrate_legacy_segment(tmp_path, 1, "你好", 2222)
+
+    assert not (tmp_path / f"segment_001_{legacy_tag}.wav").exists()
+    assert (tmp_path / f"segment_001_{compute_hash('你好', 2222)}.wav").read_bytes() == b"RIFF"
+
+
+def test_load_config_is_cached_and_returns_copies(tmp_path, monkeypatch):
+    """Config files are parsed once, and callers can't mutate the cached config"""
+    from genpod import cli
+    (tmp_path / "genpod.toml").write_text("voice_seed = 1234\n")
+    monkeypatch.chdir(tmp_path)
+    cli._load_config_cached.cache_clear()
+
+    with patch.object(cli, "_load_toml", wraps=cli._load_toml) as mock_load:
+        first = cli.load_config(tmp_path)
+        first["jobs"] = 8
+        second = cli.load_config(tmp_path)
+
+    assert mock_load.call_count == 1
+    assert second["voice_seed"] == 1234
+    assert "jobs" not in second
+
+    # Editing a config file invalidates the cached entry
+    (tmp_path / "genpod.toml").write_text("voice_seed = 43210\n")
+    assert cli.load_config(tmp_path)["voice_seed"] == 43210
+
+
+def test_load_config_project_root_from_parent(tmp_path, monkeypatch):
+    """The nearest loaded genpod.toml above the episode marks the project root"""
+    from genpod import cli
+    (tmp_path / "genpod.toml").write_text("voice_seed = 1234\n")
+    episode_dir = tmp_path / "input" / "20260101"
+    episode_dir.mkdir(parents=True)
+    (episode_dir / "genpod.toml").write_text("max_chars = 150\n")
+    monkeypatch.chdir(tmp_path)
+    cli._load_config_cached.cache_clear()
+
+    config = cli.load_config(episode_dir)
+
+    assert config["voice_seed"] == 1234
+    assert config["max_chars"] == 150
+    assert config["__project_root__"] == str(tmp_path.resolve())
+
+
+def test_index_segment_files(tmp_path):
+    """Segment files are grouped by their zero-padded index"""
+    from genpod.cli import index_segment_files
+    for name in ["segment_001_aaa.wav", "segment_001_bbb.wav", "segment_002_ccc.wav", "segment_002_ccc.md", "notes.wav"]:
+        (tmp_path / name).write_bytes(b"")
+
+    index = index_segment_files(tmp_path, ".wav")
+
+    assert sorted(index["001"]) == ["segment_001_aaa.wav", "segment_001_bbb.wav"]
+    assert index["002"] == ["segment_002_ccc.wav"]
+    assert len(index) == 2
+    assert index_segment_files(tmp_path / "missing", ".wav") == {}
+
+
+def test_segment_manifest_roundtrip(tmp_path):
+    """A manifest is reused only while script, segment md files and wavs are unchanged"""
+    from genpod.cli import (
+        load_segment_manifest,
+        segment_manifest_key,
+        write_segment_manifest,
+    )
+    config = {"min_chars": 50, "max_chars": 200}
+    script = tmp_path / "script.md"
+    script.write_text("# 标题\n\n正文")
+    md_dir = tmp_path / "segments_md"
+    md_dir.mkdir()
+    (md_dir / "segment_001_aaaa.md").write_text("正文")
+    segments_dir = tmp_path / "segments"
+    segments_dir.mkdir()
+    (segments_dir / "segment_001_aaaa.wav").write_bytes(b"RIFF")
+    manifest = segments_dir / ".manifest.json"
+
+    key = segment_manifest_key(script, md_dir, 2222, config)
+    write_segment_manifest(manifest, key, [str(segments_dir / "segment_001_aaaa.wav")])
+
+    assert load_segment_manifest(manifest, key, segments_dir) == [str(segments_dir / "segment_001_aaaa.wav")]
+    assert load_segment_manifest(manifest, segment_manifest_key(script, md_dir, 3333, config), segments_dir) is None
+
+    (md_dir / "segment_001_aaaa.md").write_text("用户修改过的正文")
+    assert load_segment_manifest(manifest, segment_manifest_key(script, md_dir, 2222, config), segments_dir) is None
+
+    (segments_dir / "segment_001_aaaa.wav").unlink()
+    assert load_segment_manifest(manifest, key, segments_dir) is None
+
+
+def test_parse_check_argv_fast_path():
+    """`genpod check` is parsed by hand; anything unusual falls back to argparse"""
+    from genpod.cli import _parse_check_argv
+    assert _parse_check_argv(["check", "ep1"]) == ("ep1", None, False)
+    assert _parse_check_argv(["check", "-v", "ep1", "-w", "ws"]) == ("ep1", "ws", True)
+    assert _parse_check_argv(["check", "ep1", "--workdir=ws", "--verbose"]) == ("ep1", "ws", True)
+    assert _parse_check_argv(["build", "ep1"]) is None
+    assert _parse_check_argv(["check"]) is None
+    assert _parse_check_argv(["check", "-h"]) is None
+    assert _parse_check_argv(["check", "ep1", "ep2"]) is None
+    assert _parse_check_argv(["check", "ep1", "-w"]) is None
+
+
+def test_load_config_dedups_local_and_episode_config(tmp_path, monkeypatch):
+    """Running inside the episode dir (even reached via a symlink) parses its genpod.toml once"""
+    from genpod import cli
+    episode_dir = tmp_path / "episode"
+    episode_dir.mkdir()
+    (episode_dir / "genpod.toml").write_text("voice_seed = 1234\n")
+    (tmp_path / "link").symlink_to(episode_dir)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.chdir(episode_dir)
+    cli._load_config_cached.cache_clear()
+
+    with patch.object(cli, "_load_toml", wraps=cli._load_toml) as mock_load:
+        config = cli.load_config(tmp_path / "link")
+
+    assert mock_load.call_count == 1
+    assert config["voice_seed"] == 1234
+    assert config["__project_root__"] == str(episode_dir.resolve())
+
+
+def test_link_or_copy(tmp_path):
+    """Cache hits share the inode; overwriting a linked file never writes through to the cache"""
+    from genpod.cli import link_or_copy
+    src = tmp_path / "cache.wav"
+    src.write_bytes(b"RIFF1")
+    link_or_copy(src, tmp_path / "segment_001.wav")
+    assert (tmp_path / "segment_001.wav").stat().st_ino == src.stat().st_ino
+
+    (tmp_path / "other.wav").write_bytes(b"RIFF2")
+    link_or_copy(tmp_path / "other.wav", tmp_path / "segment_001.wav")
+    assert (tmp_path / "segment_001.wav").read_bytes() == b"RIFF2"
+    assert src.read_bytes() == b"RIFF1"
+
+
+def test_orphan_segment_files():
+    """Only segments numbered past the end of the script are orphans"""
+    from genpod.cli import orphan_segment_files
+    index = {"001": ["segment_001_aa.wav"], "003": ["segment_003_bb.wav", "segment_003_cc.wav"], "x": ["segment_x_dd.wav"]}
+    assert orphan_segment_files(index, 3) == []
+    assert sorted(orphan_segment_files(index, 2)) == ["segment_003_bb.wav", "segment_003_cc.wav"]
+
+
+def test_generate_rss_items(tmp_path, monkeypatch):
+    """Each episode dir with audio becomes an item; metadata is picked from the directory listing"""
+    import shutil
+    import xml.etree.ElementTree as ET
+
+    from genpod import cli
+    shutil.copyfile(cli.get_template_path("genpod.toml"), tmp_path / "genpod.toml")
+    (tmp_path / "docs").mkdir()
+    ep1 = tmp_path / "episodes" / "20260101"
+    ep2 = tmp_path / "episodes" / "20260102"
+    ep1.mkdir(parents=True)
+    ep2.mkdir(parents=True)
+    (tmp_path / "episodes" / "empty").mkdir()
+    (ep1 / "20260101_final.wav").write_bytes(b"RIFFxxxx")
+    (ep1 / "title.md").write_text("Title <&> 1", encoding="utf-8")
+    (ep1 / "shownotes.md").write_text("Notes <b>x</b> & more", encoding="utf-8")
+    (ep2 / "a.mp3").write_bytes(b"ID3")
+    (ep2 / "20260102_script.md").write_text("正文", encoding="utf-8")
+    (ep2 / "cover.png").write_bytes(b"")
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.chdir(tmp_path)
+
+    cli.generate_rss(".")
+
+    channel = ET.parse(tmp_path / "docs" / "rss" / "feed.xml").getroot().find("channel")
+    items = channel.findall("item")
+    assert [item.findtext("guid") for item in items] == ["20260102", "20260101"]
+    assert items[1].findtext("title") == "Title <&> 1"
+    assert items[1].findtext("description") == "Notes <b>x</b> & more"
+    assert items[1].find("enclosure").attrib == {
+        "url": "https://yourname.github.io/my-podcast/audio/20260101_final.wav", "length": "8", "type": "audio/wav"}
+    assert items[0].findtext("description") == "正文"
+    assert items[0].find("enclosure").get("type") == "audio/mpeg"
+    assert items[0].find("{http://www.itunes.com/dtds/podcast-1.0.dtd}image").get("href").endswith("/images/20260102/cover.png")
+
+
+def test_wav_duration_from_header(tmp_path):
+    """PCM WAV durations come from the header; unreadable files return None"""
+    import wave
+
+    from genpod.cli import _wav_duration
+    with wave.open(str(tmp_path / "a.wav"), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(24000)
+        w.writeframes(b"\0\0" * 24000 * 3)
+    (tmp_path / "bad.wav").write_bytes(b"RIFFxxxx")
+    assert _wav_duration(tmp_path / "a.wav") == 3
+    assert _wav_duration(tmp_path / "bad.wav") is None
+
+
+def test_read_texts_keeps_order(tmp_path):
+    """Concurrent reads come back stripped and in input order"""
+    from genpod.cli import read_texts
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"segment_{i:03d}.md"
+        path.write_text(f"  段落 {i}\n", encoding="utf-8")
+        paths.append(path)
+    assert read_texts(paths) == [f"段落 {i}" for i in range(20)]
+    assert read_texts(paths[:1]) == ["段落 0"]
+
+
+def test_load_config_precedence(tmp_path, monkeypatch):
+    """Project config beats global config, which beats the defaults"""
+    from genpod import cli
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / ".genpod.toml").write_text("voice_seed = 1\nmax_chars = 99\n")
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "genpod.toml").write_text("voice_seed = 2\n")
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.chdir(project)
+
+    config = cli.load_config(project)
+
+    assert (config["voice_seed"], config["max_chars"], config["min_chars"]) == (2, 99, 50)
+
+
+def test_plan_segment_audio(tmp_path):
+    """Up-to-date wavs are skipped, stale ones of the same index removed, force always queues"""
+    import logging
+
+    from genpod.cli import compute_hash, index_segment_files, plan_segment_audio
+    log = logging.getLogger("test")
+    seg_hash = compute_hash("正文", "2222")
+    (tmp_path / f"segment_001_{seg_hash}.wav").write_bytes(b"RIFF")
+    (tmp_path / "segment_001_000000000000.wav").write_bytes(b"RIFF")
+
+    index = index_segment_files(tmp_path, ".wav")
+    assert plan_segment_audio(tmp_path, index, 1, "正文", seg_hash, "2222", False, log) == (f"segment_001_{seg_hash}.wav", False, [])
+    assert not (tmp_path / "segment_001_000000000000.wav").exists()
+
+    index = index_segment_files(tmp_path, ".wav")
+    assert plan_segment_audio(tmp_path, index, 1, "正文", seg_hash, "2222", True, log)[1] is True
+    assert plan_segment_audio(tmp_path, index, 2, "新段落", "abc", "2222", False, log) == ("segment_002_abc.wav", True, [])
+
+
+def test_plan_segment_audio_keeps_old_audio_until_replaced(tmp_path):
+    """Wavs of an edited or forced segment are only returned as stale, not deleted before generation"""
+    import logging
+
+    from genpod.cli import (
+        compute_hash,
+        index_segment_files,
+        plan_segment_audio,
+        remove_stale_audio,
+    )
+    log = logging.getLogger("test")
+    old = tmp_path / "segment_001_000000000000.wav"
+    old.write_bytes(b"RIFF")
+    seg_hash = compute_hash("新正文", "2222")
+
+    index = index_segment_files(tmp_path, ".wav")
+    _, needs_generation, stale = plan_segment_audio(tmp_path, index, 1, "新正文", seg_hash, "2222", True, log)
+    assert needs_generation and stale == [old]
+    assert old.exists()
+
+    remove_stale_audio(stale, log)
+    assert not old.exists()
+
+
+def test_generate_podcast_import_is_light():
+    """Importing generate_podcast does not pull in torch, ChatTTS or pydub"""
+    import os
+    import subprocess
+    code = (
+        "import sys; import genpod.generate_podcast; "
+        "print(sorted({'torch', 'ChatTTS', 'pydub'} & set(sys.modules)))"
+    )
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent / "src"))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_check_script_restores_edited_segment_md(tmp_path, monkeypatch):
+    """check rewrites a segment md whose content no longer matches, but leaves matching ones alone"""
+    from genpod import cli
+    (tmp_path / "genpod.toml").write_text("voice_seed = 1234\n")
+    episode_dir = tmp_path / "input" / "20260101"
+    episode_dir.mkdir(parents=True)
+    (episode_dir / "script.md").write_text("你好世界", encoding="utf-8")
+    monkeypatch.chdir(episode_dir)
+    cli._load_config_cached.cache_clear()
+
+    cli.check_script("20260101", workdir=str(tmp_path))
+    (segment_md,) = (tmp_path / "output" / "20260101" / "segments_md").glob("segment_001_*.md")
+    assert segment_md.read_text(encoding="utf-8") == "你好世界。"
+
+    segment_md.write_text("手动改过的内容", encoding="utf-8")
+    cli.check_script("20260101", workdir=str(tmp_path))
+    assert segment_md.read_text(encoding="utf-8") == "你好世界。"
+
+    mtime = segment_md.stat().st_mtime_ns
+    cli.check_script("20260101", workdir=str(tmp_path))
+    assert segment_md.stat().st_mtime_ns == mtime
+    # The processed-script cache lives under the project root, not the cwd
+    assert list((tmp_path / ".cache" / "processed").glob("*.json"))
+    assert not (tmp_path / "input" / "20260101" / ".cache").exists()
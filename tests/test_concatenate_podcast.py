@@ -0,0 +1,173 @@
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import numpy as np
+import soundfile as sf
+
+from genpod.concatenate_podcast import concatenate_segments
+
+
+def test_concatenate_wav_segments_with_pauses(tmp_path):
+    """WAV segments are joined in order with 500ms of silence between them"""
+    first = np.full(2400, 1000, dtype=np.int16)
+    second = np.full(4800, -1000, dtype=np.int16)
+    sf.write(tmp_path / "segment_001.wav", first, 24000, subtype="PCM_16")
+    sf.write(tmp_path / "segment_002.wav", second, 24000, subtype="PCM_16")
+
+    output = tmp_path / "dry.wav"
+    concatenate_segments(
+        [str(tmp_path / "segment_001.wav"), str(tmp_path / "missing.wav"), str(tmp_path / "segment_002.wav")],
+        str(output)
+    )
+
+    data, sr = sf.read(output, dtype="int16")
+    assert sr == 24000
+    assert len(data) == 2400 + 12000 + 4800
+    assert (data[:2400] == 1000).all()
+    assert (data[2400:14400] == 0).all()
+    assert (data[14400:] == -1000).all()
+
+
+def test_concatenate_wav_segments_streams_in_blocks(tmp_path):
+    """WAV output is written block by block, never via a whole-episode array"""
+    from genpod import concatenate_podcast
+    # Float WAVs (torchaudio's default) are converted to PCM_16 on the way through
+    sf.write(tmp_path / "segment_001.wav", np.full((3000, 1), 0.5, dtype=np.float32), 24000, subtype="FLOAT")
+    sf.write(tmp_path / "segment_002.wav", np.full((1000, 1), -0.5, dtype=np.float32), 24000, subtype="FLOAT")
+
+    output = tmp_path / "dry.wav"
+    concatenate_podcast._stream_wav_segments(
+        [str(tmp_path / "segment_001.wav"), str(tmp_path / "segment_002.wav")], str(output), 24000, 1, blocksize=512
+    )
+    concatenate_segments([str(tmp_path / "segment_001.wav"), str(tmp_path / "segment_002.wav")], str(tmp_path / "dry2.wav"))
+
+    data, sr = sf.read(output, dtype="int16")
+    assert sr == 24000 and sf.info(output).subtype == "PCM_16"
+    assert len(data) == 3000 + 12000 + 1000
+    assert (abs(data[:3000] - 16384) <= 1).all() and (abs(data[15000:] + 16384) <= 1).all()
+    assert (sf.read(tmp_path / "dry2.wav", dtype="int16")[0] == data).all()
+
+
+def test_concatenate_mixed_rate_segments_via_pydub(tmp_path):
+    """Segments with different sample rates fall back to pydub, unified to the first segment's format"""
+    sf.write(tmp_path / "segment_001.wav", np.full(2400, 1000, dtype=np.int16), 24000, subtype="PCM_16")
+    sf.write(tmp_path / "segment_002.wav", np.full(1600, 1000, dtype=np.int16), 16000, subtype="PCM_16")
+
+    output = tmp_path / "dry.wav"
+    concatenate_segments([str(tmp_path / "segment_001.wav"), str(tmp_path / "segment_002.wav")], str(output))
+
+    data, sr = sf.read(output, dtype="int16")
+    assert sr == 24000
+    assert abs(len(data) - (2400 + 12000 + 2400)) <= 2
+    assert (data[2400:14400] == 0).all()
+
+
+def test_ffmpeg_concat_filter_graph(tmp_path, monkeypatch):
+    """Inputs are interleaved with generated silence in a single ffmpeg invocation"""
+    from genpod import concatenate_podcast
+    calls = []
+    monkeypatch.setattr(concatenate_podcast.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(concatenate_podcast.subprocess, "run", lambda cmd, **kw: calls.append(cmd))
+
+    assert concatenate_podcast._ffmpeg_concat(["w.mp3", "dry.wav", "o.mp3"], tmp_path / "out.mp3", sample_rate=24000, channels=1)
+    cmd = calls[0]
+    assert cmd.count("-i") == 3
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "[a0][p1][a1][p2][a2]concat=n=5" in graph
+    assert cmd[-3:] == ["-b:a", "192k", str(tmp_path / "out.mp3")]
+
+    monkeypatch.setattr(concatenate_podcast.shutil, "which", lambda name: None)
+    assert concatenate_podcast._ffmpeg_concat(["a.wav"], tmp_path / "out.wav") is False
+
+
+def test_concatenate_segments_to_mp3_uses_ffmpeg(tmp_path, monkeypatch):
+    """MP3 output without lameenc goes through one ffmpeg process at the segments' own rate and layout"""
+    from genpod import concatenate_podcast
+    calls = []
+    monkeypatch.setattr(concatenate_podcast.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(concatenate_podcast.subprocess, "run", lambda cmd, **kw: calls.append(cmd))
+    monkeypatch.setitem(sys.modules, "lameenc", None)
+    for name in ("segment_001.wav", "segment_002.wav"):
+        sf.write(tmp_path / name, np.zeros(2400, dtype=np.int16), 24000, subtype="PCM_16")
+
+    concatenate_segments([str(tmp_path / "segment_001.wav"), str(tmp_path / "segment_002.wav")], str(tmp_path / "dry.mp3"))
+
+    graph = calls[0][calls[0].index("-filter_complex") + 1]
+    assert "sample_rates=24000:channel_layouts=mono" in graph
+    assert "[a0][p1][a1]concat=n=3" in graph
+
+
+def test_write_mp3_lameenc_encodes_in_process(tmp_path, monkeypatch):
+    """MP3 is encoded in-process when lameenc is installed, and reports False otherwise"""
+    from unittest.mock import MagicMock
+
+    from genpod import concatenate_podcast
+    pcm = np.zeros((2400, 1), dtype=np.int16)
+
+    monkeypatch.setitem(sys.modules, "lameenc", None)
+    assert concatenate_podcast._write_mp3_lameenc(pcm, 24000, tmp_path / "none.mp3") is False
+
+    lameenc = MagicMock()
+    lameenc.Encoder.return_value.encode.return_value = b"frames"
+    lameenc.Encoder.return_value.flush.return_value = b"tail"
+    monkeypatch.setitem(sys.modules, "lameenc", lameenc)
+    assert concatenate_podcast._write_mp3_lameenc(pcm, 24000, tmp_path / "dry.mp3")
+    assert (tmp_path / "dry.mp3").read_bytes() == b"framestail"
+    lameenc.Encoder.return_value.set_channels.assert_called_with(1)
+
+
+def test_concatenate_segments_to_mp3_streams_through_lameenc(tmp_path, monkeypatch):
+    """With lameenc, WAV segments are encoded to MP3 block by block in-process, pauses included"""
+    from unittest.mock import MagicMock
+
+    from genpod import concatenate_podcast
+    lameenc = MagicMock()
+    encoder = lameenc.Encoder.return_value
+    encoder.encode.side_effect = lambda pcm: b"x" * len(pcm)
+    encoder.flush.return_value = b""
+    monkeypatch.setitem(sys.modules, "lameenc", lameenc)
+    monkeypatch.setattr(concatenate_podcast.subprocess, "run", None)
+    sf.write(tmp_path / "segment_001.wav", np.zeros(2400, dtype=np.int16), 24000, subtype="PCM_16")
+    sf.write(tmp_path / "segment_002.wav", np.full(1000, 0.5, dtype=np.float32), 24000, subtype="FLOAT")
+
+    concatenate_segments([str(tmp_path / "segment_001.wav"), str(tmp_path / "segment_002.wav")], str(tmp_path / "dry.mp3"))
+
+    encoder.set_channels.assert_called_with(1)
+    encoder.set_in_sample_rate.assert_called_with(24000)
+    # int16 bytes of both segments and the 500ms pause between them
+    assert (tmp_path / "dry.mp3").stat().st_size == 2 * (2400 + 12000 + 1000)
+
+
+def test_ffmpeg_concat_keeps_input_format(tmp_path, monkeypatch):
+    """Without explicit params the highest input rate and channel count are used, not 44.1kHz stereo"""
+    from genpod import concatenate_podcast
+    calls = []
+    monkeypatch.setattr(concatenate_podcast.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(concatenate_podcast.subprocess, "run", lambda cmd, **kw: calls.append(cmd))
+    sf.write(tmp_path / "a.wav", np.zeros(2400, dtype=np.int16), 24000, subtype="PCM_16")
+    sf.write(tmp_path / "b.wav", np.zeros(1600, dtype=np.int16), 16000, subtype="PCM_16")
+
+    concatenate_podcast._ffmpeg_concat([tmp_path / "a.wav", tmp_path / "b.wav"], tmp_path / "out.mp3")
+
+    graph = calls[0][calls[0].index("-filter_complex") + 1]
+    assert "sample_rates=24000:channel_layouts=mono" in graph
+
+
+def test_ffmpeg_concat_reports_stderr(tmp_path, monkeypatch):
+    """A failing ffmpeg surfaces its stderr instead of a bare exit status"""
+    import subprocess
+
+    import pytest
+
+    from genpod import concatenate_podcast
+
+    def fail(cmd, **kw):
+        raise subprocess.CalledProcessError(1, cmd, stderr="Invalid data found when processing input\n")
+
+    monkeypatch.setattr(concatenate_podcast.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(concatenate_podcast.subprocess, "run", fail)
+    with pytest.raises(RuntimeError, match="Invalid data found"):
+        concatenate_podcast._ffmpeg_concat(["a.mp3"], tmp_path / "out.mp3", sample_rate=24000, channels=1)
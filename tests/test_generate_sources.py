@@ -0,0 +1,48 @@
+import importlib
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Ensure src is in path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from genpod import generate_sources
+
+
+def test_generate_voices_falls_back_to_per_clip_generation():
+    """A failing GPU batch is retried clip by clip; one bad clip does not drop the others"""
+    jobs = [("welcome", "welcome_1", "你好", "w1.wav"), ("outro", "outro_1", "坏文本", "o1.wav")]
+
+    def fake_batch(tasks, seed, logger=None, batch_size=8, return_audio=False):
+        raise RuntimeError("CUDA error")
+
+    def fake_audio(text, seed, output_file, logger=None):
+        if text == "坏文本":
+            raise RuntimeError("CUDA error")
+
+    # Patch the module object the lazy import will see (other tests re-import generate_podcast)
+    generate_podcast = importlib.import_module("genpod.generate_podcast")
+    with patch.object(generate_podcast, "batched_inference_available", return_value=True), \
+         patch.object(generate_podcast, "generate_audio_batch", side_effect=fake_batch) as mock_batch, \
+         patch.object(generate_podcast, "generate_audio", side_effect=fake_audio) as mock_audio, \
+         patch.object(generate_sources.AudioSegment, "from_file", side_effect=lambda f: f"audio:{f}"):
+        voices = generate_sources._generate_voices(jobs, "2222")
+
+    assert voices == {"w1.wav": "audio:w1.wav"}
+    assert mock_batch.call_count == 1
+    assert mock_audio.call_count == 2
+
+
+def test_generate_voices_renders_clips_one_by_one_on_cpu():
+    """Without CUDA nothing is batched: each clip goes through generate_audio (split_text kept)"""
+    jobs = [("welcome", "welcome_1", "你好", "w1.wav"), ("outro", "outro_1", "再见", "o1.wav")]
+    generate_podcast = importlib.import_module("genpod.generate_podcast")
+    with patch.object(generate_podcast, "batched_inference_available", return_value=False), \
+         patch.object(generate_podcast, "generate_audio_batch") as mock_batch, \
+         patch.object(generate_podcast, "generate_audio") as mock_audio, \
+         patch.object(generate_sources.AudioSegment, "from_file", side_effect=lambda f: f"audio:{f}"):
+        voices = generate_sources._generate_voices(jobs, "2222")
+
+    mock_batch.assert_not_called()
+    assert [c.args[:3] for c in mock_audio.call_args_list] == [("你好", "2222", "w1.wav"), ("再见", "2222", "o1.wav")]
+    assert voices == {"w1.wav": "audio:w1.wav", "o1.wav": "audio:o1.wav"}
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import numpy as np
+from pydub import AudioSegment
+
+from genpod.mix_podcast import fade_segment, load_bgm_cached, loop_segment
+
+
+def _tone(ms=1000, frame_rate=8000, channels=2):
+    n = frame_rate * ms // 1000
+    samples = np.full(n * channels, 10000, dtype=np.int16)
+    return AudioSegment(samples.tobytes(), frame_rate=frame_rate, sample_width=2, channels=channels)
+
+
+def test_fade_segment_envelope():
+    """Fades ramp from silence at the edges and leave the middle untouched"""
+    faded = fade_segment(_tone(), fade_in=200, fade_out=300)
+    samples = np.array(faded.get_array_of_samples()).reshape(-1, 2)
+
+    assert len(faded) == 1000
+    assert (samples[0] == 0).all()
+    assert (samples[4000] == 10000).all()
+    assert abs(int(samples[800, 0]) - 5000) <= 1   # half-way through fade in
+    assert abs(samples[-1, 0]) < 10
+    # Close to pydub's own linear fade
+    reference = np.array(_tone().fade_in(200).fade_out(300).get_array_of_samples())
+    assert np.abs(samples.ravel().astype(int) - reference).max() < 200
+
+
+def test_loop_segment_repeats_and_trims():
+    """Short BGM is repeated to the exact target length, matching pydub's += then slice"""
+    bgm = _tone(ms=300) + AudioSegment.silent(duration=100, frame_rate=8000).set_channels(2)
+    looped = loop_segment(bgm, 1000)
+
+    reference = bgm
+    while len(reference) < 1000:
+        reference += bgm
+    assert len(looped) == 1000
+    assert looped.raw_data == reference[:1000].raw_data
+
+
+def test_load_bgm_cached_memoizes_in_process(tmp_path, monkeypatch):
+    """The same BGM and volume are decoded once per process; nothing is written to disk"""
+    from genpod import mix_podcast
+    monkeypatch.chdir(tmp_path)
+    bgm_file = tmp_path / "bgm.wav"
+    _tone(ms=200).export(bgm_file, format="wav")
+
+    first = load_bgm_cached(bgm_file, 18)
+    assert first.raw_data == (AudioSegment.from_file(bgm_file) - 18).raw_data
+
+    decoded = []
+    monkeypatch.setattr(mix_podcast.AudioSegment, "from_file", classmethod(lambda cls, f: decoded.append(f)))
+    assert load_bgm_cached(bgm_file, 18) is first
+    assert not decoded
+    assert list(tmp_path.iterdir()) == [bgm_file]
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from genpod.text_aligner import align_text
+
+
+def test_align_identical_text():
+    """Identical texts pass through unchanged"""
+    assert align_text("今天天气很好", "今天天气很好") == "今天天气很好"
+
+
+def test_align_inserts_ref_tags():
+    """Whitelisted tags from the refined text are injected at the aligned position"""
+    assert align_text("今天天气很好", "今天[break_4]天气很好[laugh_0]") == "今天[break_4]天气很好[laugh_0]"
+
+
+def test_align_drops_hallucinated_chars():
+    """Extra characters invented by the refiner are removed"""
+    assert align_text("今天天气很好", "今天那个天气很好") == "今天天气很好"
+
+
+def test_align_restores_deleted_chars():
+    """Characters dropped by the refiner are restored from the normalized text"""
+    assert align_text("今天天气很好", "今天很好[break_6]") == "今天天气很好[break_6]"
+
+
+def test_align_substitution_trusts_norm():
+    """Mutated characters are replaced by the normalized ones"""
+    assert align_text("我们去北京", "我门去北[break_4]京") == "我们去北[break_4]京"
+
+
+def test_align_filters_non_whitelisted_tags():
+    """Tags outside the whitelist (e.g. speaker tags) are dropped"""
+    assert align_text("你好世界", "你好[speaker_1]世界") == "你好世界"
+
+
+def test_align_keeps_manual_tags_without_duplicates():
+    """Manual tags in the normalized text are kept and not duplicated by ref tags"""
+    assert align_text("你好[break_6]世界", "你好[break_6]世界") == "你好[break_6]世界"
+    assert align_text("你好[oral_2]世界", "你好世界") == "你好[oral_2]世界"
+
+
+def test_align_empty_inputs():
+    """Empty inputs do not break the aligner"""
+    assert align_text("", "") == ""
+    assert align_text("你好", "") == "你好"
+    assert align_text("", "你好[break_4]") == "[break_4]"
+
+
+def test_align_edit_between_long_shared_context():
+    """An edit in the middle of long identical context is aligned locally"""
+    context = "我们今天聊一聊播客制作" * 50
+    norm = context + "天气很好" + context
+    ref = context + "天气[break_4]真好" + context
+    assert align_text(norm, ref) == context + "天气[break_4]很好" + context
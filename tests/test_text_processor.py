@@ -0,0 +1,124 @@
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from unittest.mock import patch
+
+from genpod import text_processor
+from genpod.text_processor import (
+    clean_text,
+    filter_markdown_metadata,
+    merge_paragraphs,
+    number_to_chinese,
+    process_markdown_file,
+)
+
+
+def test_clean_text_one_sentence_per_line():
+    """Commas become sentence breaks, one sentence per line, blanks dropped"""
+    assert clean_text("今天天气很好，我们出去玩, 好吗。。 ") == "今天天气很好。\n我们出去玩。\n好吗。"
+
+
+def test_clean_text_normalizes_legacy_tags():
+    """[uv_break]/[laugh] are rewritten to the tags ChatTTS expects"""
+    assert clean_text("好[uv_break]的[laugh]") == "好[break_6]的[laugh_0]。"
+
+
+def test_clean_text_keeps_inner_spaces_and_normalizes_names():
+    """Spaces inside a sentence are kept; Nvidia spellings are normalized"""
+    assert clean_text("GPT 5 来了，N.vidia 和 NVIDIA") == "GPT 五 来了。\n英伟达 和 英伟达。"
+
+
+def test_number_to_chinese_readings():
+    """Small numbers read in full, 4-digit numbers digit by digit (years)"""
+    cases = {"0": "零", "10": "十", "15": "十五", "25": "二十五", "105": "一百零五",
+             "999": "九百九十九", "007": "七", "2026": "二零二六", "12345": "一二三四五",
+             "12345678901234567890": "一二三四五六七八九零一二三四五六七八九零"}
+    for num, expected in cases.items():
+        assert number_to_chinese(num) == expected
+
+
+def test_number_to_chinese_units_decimals_and_tags():
+    """Decimals keep their fraction before a unit; digits inside [tags] are untouched"""
+    assert number_to_chinese("融资2.5万美元，增长3.14倍") == "融资二点五万美元，增长三点一四倍"
+    assert number_to_chinese("好[break_6]的[laugh_0]25万") == "好[break_6]的[laugh_0]二十五万"
+    # Only control tags are skipped: citations and markdown links are still converted
+    assert number_to_chinese("参考文献[1]，见[2024年报告](url)") == "参考文献[一]，见[二零二四年报告](url)"
+    assert number_to_chinese("[注 3 条\n第5段]") == "[注 三 条\n第五段]"
+
+
+def test_filter_markdown_metadata_drops_headings_and_tts_block():
+    """Headings and the TTS suggestion block (with its list items) are removed"""
+    content = (
+        "# 标题\n"
+        "第一段\n"
+        "\n"
+        "**[TTS Setting Suggestion]**\n"
+        "\n"
+        "* **Role**: host\n"
+        "* **Speed**: 5\n"
+        "第二段\n"
+        "* 普通列表"
+    )
+    assert filter_markdown_metadata(content) == "第一段\n\n第二段\n* 普通列表"
+
+
+def test_process_markdown_file_reuses_disk_cache(tmp_path):
+    """A second run (fresh process cache) reads the result from disk; edits invalidate it"""
+    script = tmp_path / "script.md"
+    script.write_text("# 标题\n\n第一段，有2个句子\n\n第二段", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    
+    first = process_markdown_file(str(script), cache_dir=cache_dir)
+    assert first == ["第一段。\n有二个句子。\n第二段。"]
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    
+    text_processor._process_markdown_cached.cache_clear()
+    with patch.object(text_processor, "_process_markdown", side_effect=AssertionError("not cached")):
+        assert process_markdown_file(str(script), cache_dir=cache_dir) == first
+    
+    script.write_text("新内容", encoding="utf-8")
+    assert process_markdown_file(str(script), cache_dir=cache_dir) == ["新内容。"]
+    # The edited script overwrites its entry instead of leaving an orphan
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_process_markdown_file_without_cache_dir_stays_in_memory(tmp_path, monkeypatch):
+    """Library callers that pass no cache_dir get no files written anywhere"""
+    monkeypatch.chdir(tmp_path)
+    script = tmp_path / "script.md"
+    script.write_text("正文", encoding="utf-8")
+    assert process_markdown_file(str(script)) == ["正文。"]
+    assert list(tmp_path.iterdir()) == [script]
+
+
+def test_processed_cache_is_capped(tmp_path, monkeypatch):
+    """The disk cache keeps at most _PROCESSED_CACHE_MAX entries, dropping the oldest"""
+    monkeypatch.setattr(text_processor, "_PROCESSED_CACHE_MAX", 2)
+    cache_dir = tmp_path / "cache"
+    for i in range(3):
+        script = tmp_path / f"{i}.md"
+        script.write_text(f"第{i}段", encoding="utf-8")
+        process_markdown_file(str(script), cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_merge_paragraphs_greedy_with_short_tail():
+    """Paragraphs are packed greedily up to max_chars; a short tail joins the last chunk"""
+    paragraphs = ["一" * 40, "二" * 40, "三" * 40, "四" * 5]
+    assert merge_paragraphs(paragraphs, min_chars=10, max_chars=90) == [
+        "一" * 40 + "\n" + "二" * 40,
+        "三" * 40 + "\n" + "四" * 5,
+    ]
+
+
+def test_merge_paragraphs_splits_long_paragraph_at_punctuation():
+    """Over-long paragraphs are cut after the preferred punctuation, never inside ……"""
+    assert merge_paragraphs(["一二三四五六七八……九十一二三"], min_chars=0, max_chars=10) == [
+        "一二三四五六七八……", "九十一二三"
+    ]
+    assert merge_paragraphs(["一二三四，五六七。八九十一二"], min_chars=0, max_chars=10) == [
+        "一二三四，五六七。", "八九十一二"
+    ]